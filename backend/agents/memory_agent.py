@@ -1,12 +1,12 @@
-from llm.orchestrator import LLMOrchestrator
+from exports.container import container
 from tools.memory_tools import ( get_recent_memories, get_memories_by_date_range, search_memories_with_recency )
 from exports.types import LLMProvider
 from langchain.agents import create_agent
 from typing import Dict
 
 class MemoryAgent:
-    def __init__(self, provider: LLMProvider = LLMProvider.GEMINI, system_prompt: str | None = None, user_patterns: Dict | None = None):
-        self.llm_orchestrator = LLMOrchestrator()
+    def __init__(self, provider: LLMProvider | None = None, system_prompt: str | None = None, user_patterns: Dict | None = None):
+        self.llm_orchestrator = container.llm_orchestrator()
         self.provider = provider
         self.tools = [
                 get_recent_memories,
@@ -30,7 +30,7 @@ class MemoryAgent:
                     self.system_prompt,
                     user_patterns
                     )
-        llm = self.llm_orchestrator.get_agent_model(provider=self.provider)
+        llm, self.callbacks = self.llm_orchestrator.get_agent_model(provider=self.provider)
         self.agent = create_agent(
                 model=llm,
                 tools=self.tools,
@@ -41,7 +41,7 @@ class MemoryAgent:
         full_query = f"User ID: {user_id}\nQUERY: {user_query}"
         result = await self.agent.ainvoke({
             "messages": [{"role": "user", "content": full_query}]
-            })
+            }, config={"callbacks": self.callbacks})
         return result["messages"][-1].content
 
     def _enhance_prompt_with_patterns(self, base_prompt: str, patterns: Dict) -> str:
@@ -6,10 +6,7 @@ from agents import MemoryAgent
 from db.models.user import Conversation, Message, User
 from api.controllers.auth import get_current_user
 from exports.types import ConversationCreate, MessageCreate
-from llm.orchestrator import LLMOrchestrator
-from llm.prompts import MEMORY_ANSWER_PROMPT
-from memory.memory_manager import MemoryManager
-from memory.procedural_mem import ProceduralMemory
+from exports.container import container
 import json
 
 def get_user_conversations(request: Request, db: Session):
@@ -80,7 +77,7 @@ async def _maybe_update_patterns(user_obj: User, current_conversation_id: int, d
                 Conversation.user_id == user_obj.id
             ).order_by(Conversation.updated_at.desc()).limit(5).all()
 
-            procedural = ProceduralMemory()
+            procedural = container.procedural_memory()
             new_patterns = await procedural.analyze_from_raw_conversations(
                 recent_conversations,
                 current_conversation_id
@@ -118,9 +115,7 @@ async def send_message(request: Request, conversation_id: int, data: MessageCrea
     memory_agent = MemoryAgent()
     memory_txt = await memory_agent.query(query_with_context, user_id)
     patterns = await _maybe_update_patterns(user_obj, conversation_id, db)
-    prompt = f"""{MEMORY_ANSWER_PROMPT}
-
-    {memory_txt}
+    prompt = f"""{memory_txt}
 
     {patterns}
 
@@ -131,8 +126,8 @@ async def send_message(request: Request, conversation_id: int, data: MessageCrea
 
     Provide a helpful, personalized response based on the memories and conversation context.
     """
-    llm_orchestrator = LLMOrchestrator()
-    assistant_content = await llm_orchestrator.ai_invoke(prompt)
+    llm_orchestrator = container.llm_orchestrator()
+    assistant_content = await llm_orchestrator.ai_invoke(prompt, task="final_answer", system="memory_answer")
 
     assistant_message = Message(
             role="assistant",
@@ -144,14 +139,13 @@ async def send_message(request: Request, conversation_id: int, data: MessageCrea
     db.commit()
     db.refresh(assistant_message)
     try:
-        memory_manager = MemoryManager()
         message_for_extraction = [
                 {"role": "user", "content": data.content},
                 {"role": "assistant", "content": assistant_content}
                 ]
-        await memory_manager.add_conversation(message_for_extraction, user_id)
+        await container.memory_jobs().enqueue(user_id, "add_conversation", {"messages": message_for_extraction})
     except Exception as e:
-        print(f"Memory Extraction Failed: {str(e)}")
+        print(f"Queueing Memory Extraction Failed: {str(e)}")
 
 
     return {
@@ -214,9 +208,7 @@ async def send_message_stream(request: Request, conversation_id: int, data: Mess
         memory_agent = MemoryAgent()
         memory_txt = await memory_agent.query(query_with_context, user_id)
         patterns = await _maybe_update_patterns(user_obj, conversation_id, db)
-        prompt = f"""{MEMORY_ANSWER_PROMPT}
-
-        {memory_txt}
+        prompt = f"""{memory_txt}
 
         {patterns}
 
@@ -228,10 +220,10 @@ async def send_message_stream(request: Request, conversation_id: int, data: Mess
         Provide a helpful, personalized response based on the memories and conversation context.
         """
 
-        llm_orchestrator = LLMOrchestrator()
+        llm_orchestrator = container.llm_orchestrator()
         full_response = ""
 
-        async for chunk in llm_orchestrator.ai_stream(prompt):
+        async for chunk in llm_orchestrator.ai_stream(prompt, task="final_answer", system="memory_answer"):
             full_response += chunk
             yield f"data: {json.dumps({'type': 'chunk', 'data': chunk})}\n\n"
 
@@ -248,14 +240,13 @@ async def send_message_stream(request: Request, conversation_id: int, data: Mess
         yield f"data: {json.dumps({'type': 'done', 'data': {'id': assistant_message.id, 'created_at': assistant_message.created_at.isoformat()}})}\n\n"
 
         try:
-            memory_manager = MemoryManager()
             message_for_extraction = [
                 {"role": "user", "content": data.content},
                 {"role": "assistant", "content": full_response}
             ]
-            await memory_manager.add_conversation(message_for_extraction, user_id)
+            await container.memory_jobs().enqueue(user_id, "add_conversation", {"messages": message_for_extraction})
         except Exception as e:
-            print(f"Memory Extraction Failed: {str(e)}")
+            print(f"Queueing Memory Extraction Failed: {str(e)}")
 
         await _maybe_update_patterns(user_obj, conversation_id, db)
 
@@ -4,13 +4,22 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 import uvicorn
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from api.routes.auth import router as auth_router
 from api.routes.memory import router as memory_router
 from api.routes.conversations import router as conversations_router
+from api.routes.metrics import router as metrics_router
+from exports.container import container
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await container.startup()
+    yield
+    await container.shutdown()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
         CORSMiddleware,
@@ -23,6 +32,7 @@ app.add_middleware(
 app.include_router(auth_router, prefix="/api/auth", tags=["auth"])
 app.include_router(memory_router, prefix="/api/memory", tags=["memory"])
 app.include_router(conversations_router, prefix="/api/conversations", tags=["conversations"])
+app.include_router(metrics_router, prefix="/api/metrics", tags=["metrics"])
 
 if __name__ == "__main__":
     uvicorn.run("api.main:app", host="127.0.0.1", port=8000, reload=True)
@@ -1,6 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+import json
+import uuid
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from api.controllers.auth import get_current_user_id
 from memory.procedural_mem import ProceduralMemory
+from exports.container import get_memory_store
 from storage.memory_store import MemoryStore
 
 router = APIRouter()
@@ -11,16 +15,41 @@ router = APIRouter()
 #     patterns = await procedural.get_comprehensive_patterns(user_id)
 #     return patterns
 
+def _parse_cursor(cursor: str) -> str | int:
+    """Cursors are point ids: an unsigned integer or a UUID; anything else is the client's mistake"""
+    if cursor.isascii() and cursor.isdigit():
+        return int(cursor)
+    try:
+        return str(uuid.UUID(cursor))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @router.get("/all")
-async def get_all_memories(user_id: str = Depends(get_current_user_id)):
-    stored_memories = MemoryStore()
-    user_memories = stored_memories.user_memories(user_id)
-    return {"memories": [mem.model_dump() for mem in user_memories]}
+async def get_all_memories(
+        cursor: str | None = None,
+        limit: int | None = Query(default=None, ge=1, le=1000),
+        user_id: str = Depends(get_current_user_id),
+        stored_memories: MemoryStore = Depends(get_memory_store)
+        ):
+    if cursor is None and limit is None:
+        user_memories = await stored_memories.auser_memories(user_id)
+        return {"memories": [mem.model_dump() for mem in user_memories], "next_cursor": None}
+    offset = _parse_cursor(cursor) if cursor is not None else None
+    user_memories, next_cursor = await stored_memories.auser_memories_page(user_id, cursor=offset, limit=limit)
+    return {"memories": [mem.model_dump() for mem in user_memories], "next_cursor": next_cursor}
+
+@router.get("/all/stream")
+async def stream_all_memories(user_id: str = Depends(get_current_user_id), stored_memories: MemoryStore = Depends(get_memory_store)):
+
+    async def ndjson_generator():
+        async for memory in stored_memories.aiter_user_memories(user_id):
+            yield json.dumps(memory.model_dump(mode="json")) + "\n"
+
+    return StreamingResponse(ndjson_generator(), media_type="application/x-ndjson")
 
 @router.delete("/{memory_id}")
-async def delete_memory(memory_id: str, user_id: str = Depends(get_current_user_id)):
-    store = MemoryStore()
-    deleted = store.delete_user_memory(memory_id, user_id)
+async def delete_memory(memory_id: str, user_id: str = Depends(get_current_user_id), store: MemoryStore = Depends(get_memory_store)):
+    deleted = await store.adelete_user_memory(memory_id, user_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="Memory not found or not authorized")
     return { "message": "Memory deleted"}
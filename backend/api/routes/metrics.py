@@ -0,0 +1,35 @@
+from fastapi import APIRouter
+from exports.container import container
+from llm.client_pool import llm_client_pool
+from llm.context_cache import gemini_context_cache
+from llm.fake import fake_llm_stats
+from llm.gateway import provider_gateway
+from llm.hedging import hedge_stats
+from llm.prompt_registry import prompt_registry
+from llm.response_cache import llm_response_cache
+from llm.routing import model_router
+from llm.structured import structured_output_stats
+from update.arbiter import arbitration_stats
+from utils.embedding_backends import fake_embedding_stats
+from utils.embedding_batcher import batcher_stats
+from utils.embedding_cache import embedding_cache
+
+router = APIRouter()
+
+@router.get("")
+def get_metrics():
+    return {
+            "embedding_cache": embedding_cache.stats(),
+            "embedding_batcher": batcher_stats(),
+            "update_arbitration": arbitration_stats(),
+            "memory_jobs": container.memory_jobs().stats(),
+            "llm_client_pool": llm_client_pool.stats(),
+            "llm_routing": model_router.stats(),
+            "llm_response_cache": llm_response_cache.stats(),
+            "llm_gateway": provider_gateway.stats(),
+            "llm_hedging": hedge_stats.stats(),
+            "llm_prompts": prompt_registry.stats(),
+            "llm_context_cache": gemini_context_cache.stats(),
+            "llm_structured_output": structured_output_stats(),
+            "fake_providers": {"llm": fake_llm_stats(), "embeddings": fake_embedding_stats()}
+            }
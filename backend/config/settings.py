@@ -5,6 +5,9 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", extra="allow")
 
     QDRANT_URL: str = ""
+    QDRANT_POOL_SIZE: int = 32
+    MEMORY_SCROLL_PAGE_SIZE: int = 256
+    MEMORY_DETERMINISTIC_IDS: bool = False
     OPENAI_API_KEY: SecretStr | None = None
     GROQ_API_KEY: SecretStr | None = None
     GEMINI_API_KEY: SecretStr | None = None
@@ -14,5 +17,65 @@ class Settings(BaseSettings):
     DB_PORT: int = 5454
     DB_NAME: str = ""
     JWT_SECRET: str = ""
+    EMBEDDING_BACKEND: str = "gemini"
+    EMBEDDING_MODEL: str = ""
+    EMBEDDING_DIMENSIONS: int = 768
+    VECTOR_BACKEND: str = "qdrant"
+    NUMPY_STORE_PATH: str = ""
+    NUMPY_STORE_COMPACT_MIN_OPS: int = 1000
+    VECTOR_DIMENSIONS: int = 0
+    VECTOR_QUANTIZATION: str = "none"
+    VECTOR_ON_DISK: bool = False
+    VECTOR_OVERSAMPLING: float = 2.0
+    VECTOR_RESCORE: bool = True
+    EMBEDDING_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    EMBEDDING_CACHE_DIR: str = ""
+    EMBEDDING_CACHE_DTYPE: str = "float32"
+    EMBEDDING_FAKE_MODE: str = "synthetic"
+    EMBEDDING_FAKE_CASSETTE: str = "cassettes/embeddings.jsonl"
+    EMBEDDING_FAKE_RECORD_BACKEND: str = "gemini"
+    EMBEDDING_FAKE_LATENCY_MS: float = 20.0
+    EMBEDDING_FAKE_LATENCY_SIGMA: float = 0.3
+    EMBEDDING_FAKE_ERROR_RATE: float = 0.0
+    EMBEDDING_BATCH_SIZE: int = 100
+    EMBEDDING_MICROBATCH_ENABLED: bool = True
+    EMBEDDING_MICROBATCH_MAX_SIZE: int = 32
+    EMBEDDING_MICROBATCH_WAIT_MS: float = 5.0
+    MEMORY_JOB_WORKERS: int = 4
+    MEMORY_JOB_MAX_ATTEMPTS: int = 5
+    MEMORY_JOB_BACKOFF_SECONDS: float = 2.0
+    MEMORY_JOB_POLL_SECONDS: float = 1.0
+    MEMORY_JOB_DRAIN_SECONDS: float = 30.0
+    MEMORY_JOB_LEASE_SECONDS: float = 300.0
+    MEMORY_COALESCE_WINDOW_SECONDS: float = 3.0
+    MEMORY_COALESCE_MAX_TURNS: int = 5
+    LLM_CLIENT_POOL_SIZE: int = 16
+    LLM_WARMUP_MODELS: str = "gemini:gemini-2.5-flash"
+    LLM_ROUTING_RULES: dict = {}
+    LLM_CACHE_MAX_ENTRIES: int = 2048
+    LLM_CACHE_TTL_SECONDS: float = 24 * 60 * 60
+    LLM_CACHE_DIR: str = ""
+    LLM_PROVIDER_LIMITS: dict = {}
+    LLM_MAX_RETRIES: int = 3
+    LLM_RETRY_BASE_SECONDS: float = 0.5
+    LLM_RETRY_MAX_SECONDS: float = 8.0
+    LLM_BREAKER_FAILURES: int = 5
+    LLM_BREAKER_RESET_SECONDS: float = 30.0
+    LLM_CONTEXT_CACHE_ENABLED: bool = True
+    LLM_CONTEXT_CACHE_TTL_SECONDS: float = 60 * 60
+    LLM_CONTEXT_CACHE_RETRY_SECONDS: float = 10 * 60
+    LLM_FAKE_MODE: str = ""
+    LLM_FAKE_CASSETTE: str = "cassettes/llm.jsonl"
+    LLM_FAKE_PROFILES: dict = {}
+    LLM_FAKE_REPLAY_TIMING: bool = True
+    LLM_HEDGE_TASKS: str = "final_answer"
+    LLM_HEDGE_MAX_ATTEMPTS: int = 2
+    LLM_HEDGE_QUANTILE: float = 0.95
+    LLM_HEDGE_MIN_SAMPLES: int = 20
+    LLM_HEDGE_DEFAULT_DELAY_MS: float = 2000.0
+    LLM_HEDGE_MIN_DELAY_MS: float = 250.0
+    UPDATE_ARBITRATION_ENABLED: bool = True
+    UPDATE_NONE_THRESHOLD: float = 0.95
+    UPDATE_ADD_THRESHOLD: float = 0.8
 
 settings = Settings()
@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import List
-from sqlalchemy import String, ForeignKey
+from sqlalchemy import String, ForeignKey, Index
 from sqlalchemy.orm import DeclarativeBase, relationship, mapped_column, Mapped
 
 class Base(DeclarativeBase):
@@ -33,3 +33,18 @@ class Message(Base):
     created_at: Mapped[datetime] = mapped_column(default=datetime.now)
     conversation_id: Mapped[int] = mapped_column(ForeignKey("Conversations.id"))
     conversation: Mapped[Conversation] = relationship(back_populates="messages")
+
+class MemoryJob(Base):
+    """Outbox row for background memory ingestion; committed before the worker pool picks it up"""
+    __tablename__ = "MemoryJobs"
+    __table_args__ = (Index("ix_memory_jobs_status_user", "status", "user_id", "id"),)
+    id: Mapped[int] = mapped_column(primary_key = True, autoincrement = True)
+    user_id: Mapped[str]
+    kind: Mapped[str]
+    payload_json: Mapped[str]
+    status: Mapped[str] = mapped_column(default="pending")
+    attempts: Mapped[int] = mapped_column(default=0)
+    available_at: Mapped[datetime] = mapped_column(default=datetime.now)
+    last_error: Mapped[str | None] = mapped_column(nullable=True)
+    created_at: Mapped[datetime] = mapped_column(default=datetime.now)
+    updated_at: Mapped[datetime] = mapped_column(default=datetime.now, onupdate=datetime.now)
@@ -0,0 +1,131 @@
+import asyncio
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List
+from config.settings import settings
+from exports.qdrant_client import async_client
+from llm.client_pool import llm_client_pool
+from llm.context_cache import gemini_context_cache
+from llm.orchestrator import LLMOrchestrator
+from llm.prompt_registry import prompt_registry
+from memory.episodic_mem import EpisodicMemory
+from memory.jobs import MemoryJobQueue
+from memory.memory_manager import MemoryManager
+from memory.procedural_mem import ProceduralMemory
+from storage.memory_store import MemoryStore
+from update.dedup import MemoryDeduplicator
+from update.updater import MemoryUpdater
+from utils.embeddings import EmbeddingGenerator
+from utils.extractor import MemoryExtractor
+
+
+class Container:
+    """Process-wide shared services; built lazily, bootstrapped once from the FastAPI lifespan"""
+    def __init__(self):
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    def _get(self, name: str, factory: Callable[[], Any]):
+        instance = self._instances.get(name)
+        if instance is None:
+            with self._lock:
+                instance = self._instances.get(name)
+                if instance is None:
+                    instance = factory()
+                    self._instances[name] = instance
+        return instance
+
+    def embeddings(self) -> EmbeddingGenerator:
+        return self._get("embeddings", EmbeddingGenerator)
+
+    def llm_orchestrator(self) -> LLMOrchestrator:
+        return self._get("llm_orchestrator", LLMOrchestrator)
+
+    def memory_store(self) -> MemoryStore:
+        return self._get("memory_store", lambda: MemoryStore(embed=self.embeddings()))
+
+    def episodic_memory(self) -> EpisodicMemory:
+        return self._get("episodic_memory", lambda: EpisodicMemory(memory_store=self.memory_store()))
+
+    def procedural_memory(self) -> ProceduralMemory:
+        return self._get("procedural_memory", lambda: ProceduralMemory(
+            memory_store=self.memory_store(),
+            llm_orchestrator=self.llm_orchestrator()
+            ))
+
+    def deduplicator(self) -> MemoryDeduplicator:
+        return self._get("deduplicator", lambda: MemoryDeduplicator(memory_store=self.memory_store()))
+
+    def updater(self) -> MemoryUpdater:
+        return self._get("updater", lambda: MemoryUpdater(
+            llm_orchestrator=self.llm_orchestrator(),
+            deduplicator=self.deduplicator(),
+            memory_store=self.memory_store()
+            ))
+
+    def extractor(self) -> MemoryExtractor:
+        return self._get("extractor", lambda: MemoryExtractor(llm_orchestrator=self.llm_orchestrator()))
+
+    def memory_manager(self) -> MemoryManager:
+        return self._get("memory_manager", lambda: MemoryManager(
+            extractor=self.extractor(),
+            updater=self.updater()
+            ))
+
+    def memory_jobs(self) -> MemoryJobQueue:
+        return self._get("memory_jobs", self._build_memory_jobs)
+
+    def _build_memory_jobs(self) -> MemoryJobQueue:
+        # sql_init connects and creates tables on import, so only pull it in once the queue is needed
+        from exports.sql_init import session
+
+        async def add_conversation(user_id: str, payloads: List[dict]):
+            # coalesced turns are extracted as one transcript and land as one update plan
+            messages = [message for payload in payloads for message in payload["messages"]]
+            await self.memory_manager().add_conversation(messages, user_id)
+
+        return MemoryJobQueue(session, {"add_conversation": add_conversation})
+
+    async def startup(self):
+        # the only collection bootstrap of the process; every request reuses the ready store
+        await self.memory_store().async_vector_store.ensure_collection()
+        llm_client_pool.warmup()
+        # tokenizer loading may touch disk or network, keep it off the event loop
+        await asyncio.to_thread(prompt_registry.compile)
+        await self.memory_jobs().start()
+
+    async def shutdown(self):
+        await self.memory_jobs().stop(settings.MEMORY_JOB_DRAIN_SECONDS)
+        await gemini_context_cache.aclear()
+        await async_client.close()
+
+    def override(self, name: str, instance: Any):
+        """Replace a service (e.g. with a fake in tests); dependents built afterwards pick it up"""
+        with self._lock:
+            self._instances[name] = instance
+
+    @contextmanager
+    def overridden(self, **instances: Any):
+        with self._lock:
+            previous = dict(self._instances)
+            self._instances.update(instances)
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._instances = previous
+
+    def reset(self):
+        with self._lock:
+            self._instances.clear()
+
+
+container = Container()
+
+
+def get_memory_store() -> MemoryStore:
+    return container.memory_store()
+
+
+def get_memory_manager() -> MemoryManager:
+    return container.memory_manager()
@@ -1,29 +1,11 @@
-import re, json
+import json
 from pydantic import ValidationError
 from exports.types import MemoryExtractionOutput
-from typing import Dict, List, Union, Any
+from typing import Dict, Iterator, List, Union, Any
 
 def parse_extracted_response(llm_response: str) -> MemoryExtractionOutput:
-    json_response = None
-    markdown_match = re.search(
-            r"```json\s*(\{.*?\})\s*```",
-            llm_response,
-            re.DOTALL
-            )
-    if markdown_match:
-        json_response = markdown_match.group(1)
-    else:
-        raw_match = re.search(
-                r"(\{.*\})",
-                llm_response,
-                re.DOTALL
-                )
-        if raw_match:
-            json_response = raw_match.group(1)
-    if not json_response:
-        raise ValueError("No json object found in llm response")
+    parsed = extract_json(llm_response)
     try:
-        parsed = json.loads(json_response)
         return MemoryExtractionOutput.model_validate(parsed)
     except ValidationError as e:
         raise ValueError(f"Json does not match the MemoryExtractionOutput schema: {str(e)}")
@@ -44,3 +26,83 @@ def normalize_llm_response(
                 if isinstance(content, str):
                     parts.append(content)
         return "\n".join(parts)
+
+
+def extract_json(response: str, default: Dict | None = None) -> Dict:
+    """First JSON object in an LLM response, fenced or not.
+
+    Decodes from each `{` in turn instead of a greedy `{.*}` match, so trailing prose or a second
+    object cannot turn a valid answer into a parse error.
+    """
+    default = {} if default is None else default
+    if not response or not response.strip():
+        return default
+    decoder = json.JSONDecoder()
+    start = response.find("{")
+    while start != -1:
+        try:
+            parsed, _ = decoder.raw_decode(response, start)
+            if isinstance(parsed, dict):
+                return parsed
+        except json.JSONDecodeError:
+            pass
+        start = response.find("{", start + 1)
+    raise ValueError("No json object found in llm response")
+
+
+class JsonArrayItemParser:
+    """Incremental parser yielding the objects of one top-level array (e.g. `{"memory": [...]}`) as
+    each one closes, while the rest of the response is still streaming.
+
+    Anything outside the outermost object (markdown fences, prose) is ignored. An element that fails
+    to decode is counted in `malformed` and skipped; it does not affect its neighbours.
+    """
+    def __init__(self, key: str):
+        self.key = key
+        self.malformed = 0
+        self._buffer = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string = None
+        self._array_key = None
+        self._item_start = None
+
+    def feed(self, chunk: str) -> Iterator[Dict]:
+        self._buffer += chunk
+        buffer = self._buffer
+        while self._pos < len(buffer):
+            char = buffer[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1:
+                        self._last_string = buffer[self._string_start:self._pos]
+            elif not self._stack:
+                if char == "{":
+                    self._stack.append("{")
+            elif char == '"':
+                self._in_string = True
+                self._string_start = self._pos + 1
+            elif char in "{[":
+                if char == "[" and len(self._stack) == 1:
+                    self._array_key = self._last_string
+                elif char == "{" and self._stack == ["{", "["] and self._array_key == self.key:
+                    self._item_start = self._pos
+                self._stack.append(char)
+            elif char in "}]":
+                self._stack.pop()
+                if char == "}" and self._item_start is not None and self._stack == ["{", "["]:
+                    item = buffer[self._item_start:self._pos + 1]
+                    self._item_start = None
+                    try:
+                        yield json.loads(item)
+                    except json.JSONDecodeError:
+                        self.malformed += 1
+            self._pos += 1
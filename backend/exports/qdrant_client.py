@@ -1,4 +1,5 @@
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient, QdrantClient
 from config.settings import settings
 
 client = QdrantClient(settings.QDRANT_URL)
+async_client = AsyncQdrantClient(settings.QDRANT_URL, pool_size=settings.QDRANT_POOL_SIZE)
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Literal, Optional
 from pydantic import BaseModel, Field, EmailStr
 from enum import Enum
 
@@ -53,6 +53,29 @@ class MemoryExtractionWithTypes(BaseModel):
     class Config:
         extra = "ignore"
 
+class MemoryUpdateItem(BaseModel):
+    """One memory operation decided by the update LLM"""
+    id: Optional[str] = None
+    text: str = ""
+    event: Literal["ADD", "UPDATE", "DELETE", "NONE"]
+    old_memory: Optional[str] = None
+
+class MemoryUpdateOutput(BaseModel):
+    """Output format from the LLM memory update"""
+    memory: List[MemoryUpdateItem] = Field(default_factory=list)
+
+class CommunicationPreferences(BaseModel):
+    message_length: str = "medium"
+    technical_depth: str = "intermediate"
+    explanation_style: str = "detailed"
+    tone: str = "friendly"
+    asks_followups: bool = True
+
+class ConversationStylePatterns(BaseModel):
+    """Output format from the raw conversation style analysis"""
+    communication_preferences: CommunicationPreferences = Field(default_factory=CommunicationPreferences)
+    response_guidelines: List[str] = Field(default_factory=list)
+
 class MemoryType(Enum):
     SEMANTIC = "semantic"
     EPISODIC = "episodic"
@@ -69,10 +92,22 @@ class MemorySearchResult(Memory):
     score: float
     boosted_score: float = 0.0
 
+class VectorOperationOutcome(BaseModel):
+    """Result of one point write inside a batch; acknowledged writes are confirmed later"""
+    point_id: str
+    action: str
+    status: str
+    operation_id: int | None = None
+    error: str | None = None
+
 class LLMProvider(Enum):
     OPENAI = "openai"
     GEMINI = "gemini"
     GROQ = "groq"
+    FAKE = "fake"
+
+class FakeModel(Enum):
+    SYNTHETIC = "synthetic"
 
 class OpenAIModel(Enum):
     GPT_4O = "gpt-4o"
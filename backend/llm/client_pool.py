@@ -0,0 +1,82 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+from config.settings import settings
+from exports.types import LLMProvider
+from llm.providers import DEFAULT_MODELS, LLMClient
+
+PoolKey = Tuple[str, str | None, float, bool]
+
+
+class LLMClientPool:
+    """Bounded LRU of LLMClients keyed by (provider, model, temperature, streaming).
+
+    Each chat model owns its HTTP client, so reusing the instance reuses its keep-alive connections.
+    """
+    def __init__(self, max_size: int | None = None):
+        self.max_size = max_size or settings.LLM_CLIENT_POOL_SIZE
+        self._clients: "OrderedDict[PoolKey, LLMClient]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, provider: LLMProvider, model: str | None = None, temperature: float = 0.2, streaming: bool = True) -> LLMClient:
+        model = model or DEFAULT_MODELS.get(provider)
+        key = (provider.value, model, temperature, streaming)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                self.hits += 1
+                return client
+            self.misses += 1
+        # built outside the lock: constructing a chat model can be slow and must not stall other lookups
+        client = LLMClient(provider=provider, model=model, temperature=temperature, streaming=streaming)
+        with self._lock:
+            existing = self._clients.get(key)
+            if existing is not None:
+                return existing
+            self._clients[key] = client
+            while len(self._clients) > self.max_size:
+                self._clients.popitem(last=False)
+                self.evictions += 1
+        return client
+
+    def warmup(self, specs: List[Tuple[LLMProvider, str | None]] | None = None) -> int:
+        """Build clients ahead of the first request; failures (e.g. a missing API key) are skipped"""
+        warmed = 0
+        for provider, model in specs if specs is not None else parse_warmup_spec(settings.LLM_WARMUP_MODELS):
+            try:
+                self.get(provider, model)
+                warmed += 1
+            except Exception as e:
+                print(f"Error while warming up {provider.value}:{model}: {str(e)}")
+        return warmed
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                    "size": len(self._clients),
+                    "max_size": self.max_size,
+                    "hits": self.hits,
+                    "misses": self.misses,
+                    "evictions": self.evictions,
+                    "clients": [f"{provider}:{model}" for provider, model, _, _ in self._clients]
+                    }
+
+
+def parse_warmup_spec(spec: str) -> List[Tuple[LLMProvider, str | None]]:
+    """"gemini:gemini-2.5-flash,groq" -> [(GEMINI, "gemini-2.5-flash"), (GROQ, None)]"""
+    specs = []
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        provider, _, model = entry.partition(":")
+        specs.append((LLMProvider(provider), model or None))
+    return specs
+
+
+llm_client_pool = LLMClientPool()
@@ -0,0 +1,102 @@
+import asyncio
+import time
+from typing import Dict, Tuple
+from config.settings import settings
+from llm.prompt_registry import CompiledPrompt
+from llm.routing import OFFLINE_FAKE_MODES
+
+# Gemini refuses cached contents below these sizes; others fall back to plain system messages
+GEMINI_MIN_CACHE_TOKENS = {
+        "gemini-2.5-flash": 1024,
+        "gemini-2.5-pro": 4096
+        }
+
+
+class GeminiContextCache:
+    """Explicit Gemini cached contents holding a compiled system prompt, one per (model, prompt digest).
+
+    Entries are refreshed shortly before their TTL runs out. A failed creation is not retried for a
+    while, and callers then send the prefix inline as a normal system message.
+    """
+    def __init__(self, ttl_seconds: float | None = None, enabled: bool | None = None):
+        self.ttl_seconds = ttl_seconds or settings.LLM_CONTEXT_CACHE_TTL_SECONDS
+        self.enabled = settings.LLM_CONTEXT_CACHE_ENABLED if enabled is None else enabled
+        self._entries: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        self._retry_after: Dict[Tuple[str, str], float] = {}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self._prompts: Dict[str, CompiledPrompt] = {}
+        self._client = None
+        self.counters = {"created": 0, "reused": 0, "too_small": 0, "errors": 0}
+
+    def _genai(self):
+        if self._client is None:
+            from google import genai
+            self._client = genai.Client(api_key=settings.GEMINI_API_KEY.get_secret_value())
+        return self._client
+
+    def _live(self, key: Tuple[str, str], now: float) -> str | None:
+        entry = self._entries.get(key)
+        # leave a minute of headroom so a request never lands on a cache that expires mid-flight
+        if entry is not None and entry[1] - now > 60:
+            return entry[0]
+        return None
+
+    async def lookup(self, model: str, prompt: CompiledPrompt) -> str | None:
+        if not self.enabled or not settings.GEMINI_API_KEY or settings.LLM_FAKE_MODE in OFFLINE_FAKE_MODES:
+            return None
+        if prompt.tokens < GEMINI_MIN_CACHE_TOKENS.get(model, 1024):
+            self.counters["too_small"] += 1
+            return None
+        key = (model, prompt.digest)
+        now = time.time()
+        name = self._live(key, now)
+        if name is not None:
+            self.counters["reused"] += 1
+            return name
+        if self._retry_after.get(key, 0.0) > now:
+            return None
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            name = self._live(key, time.time())
+            if name is not None:
+                self.counters["reused"] += 1
+                return name
+            try:
+                from google.genai import types
+                cached = await self._genai().aio.caches.create(
+                        model=model,
+                        config=types.CreateCachedContentConfig(
+                            system_instruction=prompt.text,
+                            display_name=f"memora-{prompt.name}",
+                            ttl=f"{int(self.ttl_seconds)}s"
+                            )
+                        )
+            except Exception as e:
+                self.counters["errors"] += 1
+                self._retry_after[key] = time.time() + settings.LLM_CONTEXT_CACHE_RETRY_SECONDS
+                print(f"Error while creating Gemini context cache for {prompt.name}: {str(e)}")
+                return None
+            self._entries[key] = (cached.name, time.time() + self.ttl_seconds)
+            self._prompts[cached.name] = prompt
+            self.counters["created"] += 1
+            return cached.name
+
+    def prompt_for(self, name: str) -> CompiledPrompt | None:
+        """The system prompt held by a cached content this process created"""
+        return self._prompts.get(name)
+
+    async def aclear(self):
+        """Deletes the caches this process created instead of paying for their storage until the TTL"""
+        entries, self._entries = self._entries, {}
+        self._prompts = {}
+        for name, _ in entries.values():
+            try:
+                await self._genai().aio.caches.delete(name=name)
+            except Exception as e:
+                print(f"Error while deleting Gemini context cache {name}: {str(e)}")
+
+    def stats(self) -> Dict:
+        return {**self.counters, "live": len(self._entries)}
+
+
+gemini_context_cache = GeminiContextCache()
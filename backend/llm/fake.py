@@ -0,0 +1,219 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import BaseModel, Field
+from config.settings import settings
+from llm.context_cache import gemini_context_cache
+from llm.routing import OFFLINE_FAKE_MODES, estimate_tokens
+from utils.cassette import get_cassette, request_key, sample_latency_ms
+
+_WORDS = (
+        "memories help the assistant keep context across conversations so every answer "
+        "stays consistent with what the user shared before and what they care about now"
+        ).split()
+
+_counters = {"synthetic": 0, "replay_hits": 0, "replay_misses": 0, "recorded": 0, "injected_errors": 0}
+_lock = threading.Lock()
+
+
+def _count(outcome: str):
+    with _lock:
+        _counters[outcome] += 1
+
+
+def fake_llm_stats() -> Dict:
+    with _lock:
+        return dict(_counters)
+
+
+class FakeProviderError(Exception):
+    """Injected failure; carries an HTTP status so the gateway treats it like the real thing"""
+    def __init__(self, status_code: int):
+        super().__init__(f"Injected provider error ({status_code})")
+        self.status_code = status_code
+
+
+class SyntheticProfile(BaseModel):
+    """Latency and output shape of a synthetic model; time to first token is log-normal around `ttft_ms`"""
+    ttft_ms: float = 400.0
+    ttft_sigma: float = 0.4
+    tokens_per_second: float = 80.0
+    output_tokens: int = 150
+    error_rate: float = 0.0
+    error_status: int = 503
+
+
+def synthetic_profile(provider: str) -> SyntheticProfile:
+    """LLM_FAKE_PROFILES: {"default": {...}, "<provider>": {...}}; provider entries override the default"""
+    profiles = settings.LLM_FAKE_PROFILES
+    return SyntheticProfile.model_validate({**profiles.get("default", {}), **profiles.get(provider, {})})
+
+
+# call kwargs that change the answer (structured output); transport details such as cached_content do not
+KEYED_KWARGS = ("response_format", "response_mime_type", "response_json_schema")
+
+
+def messages_key(provider: str, model: str, messages: List[BaseMessage], kwargs: Dict) -> str:
+    """Cassette key for one call: provider, model, structured-output kwargs and the full rendered prompt.
+
+    A Gemini call served from a context cache only carries the dynamic message; its system prefix is
+    put back in front so the key matches the inline SystemMessage form that replay sends.
+    """
+    cached_content = kwargs.get("cached_content")
+    if cached_content:
+        prompt = gemini_context_cache.prompt_for(cached_content)
+        if prompt is not None:
+            messages = [SystemMessage(content=prompt.text), *messages]
+    return request_key({
+        "provider": provider,
+        "model": model,
+        "kwargs": {key: kwargs[key] for key in KEYED_KWARGS if key in kwargs},
+        "messages": [(message.type, message.content) for message in messages]
+        })
+
+
+def _json_mode(kwargs: Dict) -> bool:
+    return "response_format" in kwargs or "response_mime_type" in kwargs
+
+
+class FakeChatModel(BaseChatModel):
+    """Offline chat model: replays a cassette keyed by prompt hash, or synthesizes text with the
+    configured latency, token rate and error rate. Replay misses fall back to synthetic output.
+    """
+    provider_name: str
+    model_name: str
+    mode: str = "synthetic"
+    profile: SyntheticProfile = Field(default_factory=SyntheticProfile)
+    cassette_path: str = ""
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def bind_tools(self, tools, **kwargs):
+        # never calls tools: agents get a direct answer
+        return self
+
+    def _plan(self, messages: List[BaseMessage], kwargs: Dict):
+        """(content, stream chunks, ttft seconds, seconds per chunk); raises an injected error when drawn"""
+        if self.mode == "replay":
+            entry = get_cassette(self.cassette_path).get(messages_key(self.provider_name, self.model_name, messages, kwargs))
+            if entry is not None:
+                _count("replay_hits")
+                chunks = entry.get("chunks") or [entry["content"] if isinstance(entry["content"], str) else ""]
+                pace = 0.0
+                if settings.LLM_FAKE_REPLAY_TIMING and len(chunks) > 1:
+                    pace = max(0.0, entry.get("duration_ms", 0.0) - entry.get("ttft_ms", 0.0)) / 1000 / (len(chunks) - 1)
+                ttft = entry.get("ttft_ms", 0.0) / 1000 if settings.LLM_FAKE_REPLAY_TIMING else 0.0
+                return entry["content"], chunks, ttft, pace
+            _count("replay_misses")
+        _count("synthetic")
+        ttft = sample_latency_ms(self.profile.ttft_ms, self.profile.ttft_sigma) / 1000
+        if random.random() < self.profile.error_rate:
+            _count("injected_errors")
+            raise FakeProviderError(self.profile.error_status)
+        if _json_mode(kwargs):
+            chunks = ["{}"]
+        else:
+            chunks = [f"{_WORDS[i % len(_WORDS)]} " for i in range(self.profile.output_tokens)]
+        pace = 1 / self.profile.tokens_per_second if self.profile.tokens_per_second > 0 else 0.0
+        return "".join(chunks), chunks, ttft, pace
+
+    def _message(self, messages: List[BaseMessage], content) -> AIMessage:
+        input_tokens = sum(estimate_tokens(str(message.content)) for message in messages)
+        output_tokens = estimate_tokens(content) if isinstance(content, str) else 0
+        return AIMessage(
+                content=content,
+                usage_metadata={"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+                )
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        content, chunks, ttft, pace = self._plan(messages, kwargs)
+        time.sleep(ttft + pace * max(0, len(chunks) - 1))
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages, content))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        content, chunks, ttft, pace = self._plan(messages, kwargs)
+        await asyncio.sleep(ttft + pace * max(0, len(chunks) - 1))
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages, content))])
+
+    def _stream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        _, chunks, ttft, pace = self._plan(messages, kwargs)
+        time.sleep(ttft)
+        for i, chunk in enumerate(chunks):
+            if i:
+                time.sleep(pace)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=chunk))
+
+    async def _astream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        _, chunks, ttft, pace = self._plan(messages, kwargs)
+        await asyncio.sleep(ttft)
+        for i, chunk in enumerate(chunks):
+            if i:
+                await asyncio.sleep(pace)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=chunk))
+
+
+class RecordingChatModel(BaseChatModel):
+    """Passes calls through to a real chat model and appends each request/response pair to the cassette"""
+    delegate: BaseChatModel
+    provider_name: str
+    model_name: str
+    cassette_path: str
+
+    @property
+    def _llm_type(self) -> str:
+        return "recording"
+
+    def _record(self, messages: List[BaseMessage], kwargs: Dict, content, chunks: List[str], started: float, first_at: float | None):
+        now = time.perf_counter()
+        get_cassette(self.cassette_path).record({
+            "key": messages_key(self.provider_name, self.model_name, messages, kwargs),
+            "provider": self.provider_name,
+            "model": self.model_name,
+            "content": content,
+            "chunks": chunks,
+            "ttft_ms": ((first_at or now) - started) * 1000,
+            "duration_ms": (now - started) * 1000
+            })
+        _count("recorded")
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        started = time.perf_counter()
+        result = self.delegate._generate(messages, stop=stop, **kwargs)
+        self._record(messages, kwargs, result.generations[0].message.content, [], started, None)
+        return result
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        started = time.perf_counter()
+        result = await self.delegate._agenerate(messages, stop=stop, **kwargs)
+        self._record(messages, kwargs, result.generations[0].message.content, [], started, None)
+        return result
+
+    async def _astream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        started = time.perf_counter()
+        first_at = None
+        chunks: List[str] = []
+        async for chunk in self.delegate._astream(messages, stop=stop, **kwargs):
+            if first_at is None:
+                first_at = time.perf_counter()
+            if isinstance(chunk.message.content, str):
+                chunks.append(chunk.message.content)
+            yield chunk
+        self._record(messages, kwargs, "".join(chunks), chunks, started, first_at)
+
+
+def build_fake_model(provider: str, model: str) -> FakeChatModel:
+    mode = settings.LLM_FAKE_MODE if settings.LLM_FAKE_MODE in OFFLINE_FAKE_MODES else "synthetic"
+    return FakeChatModel(
+            provider_name=provider,
+            model_name=model,
+            mode=mode,
+            profile=synthetic_profile(provider),
+            cassette_path=settings.LLM_FAKE_CASSETTE
+            )
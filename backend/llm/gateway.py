@@ -0,0 +1,260 @@
+import asyncio
+import random
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, TypeVar
+from pydantic import BaseModel
+from config.settings import settings
+from exports.types import LLMProvider
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+RETRYABLE_NAMES = ("RateLimit", "ResourceExhausted", "ServiceUnavailable", "InternalServerError", "Timeout", "APIConnectionError", "DeadlineExceeded")
+
+
+class ProviderLimits(BaseModel):
+    max_concurrency: int = 8
+    requests_per_minute: int = 500
+    tokens_per_minute: int = 500_000
+
+
+DEFAULT_LIMITS: Dict[LLMProvider, ProviderLimits] = {
+        LLMProvider.GEMINI: ProviderLimits(max_concurrency=16, requests_per_minute=1000, tokens_per_minute=1_000_000),
+        LLMProvider.GROQ: ProviderLimits(max_concurrency=8, requests_per_minute=30, tokens_per_minute=12_000),
+        LLMProvider.OPENAI: ProviderLimits(max_concurrency=16, requests_per_minute=500, tokens_per_minute=200_000)
+        }
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the provider while its breaker is open"""
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    for attribute in ("status_code", "code", "status"):
+        value = getattr(error, attribute, None)
+        if isinstance(value, int) and value in RETRYABLE_STATUS:
+            return True
+    response = getattr(error, "response", None)
+    if isinstance(getattr(response, "status_code", None), int) and response.status_code in RETRYABLE_STATUS:
+        return True
+    return any(name in type(error).__name__ for name in RETRYABLE_NAMES)
+
+
+class TokenBucket:
+    """Refills continuously at capacity per minute; waiters sleep for exactly their deficit"""
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.waited_seconds = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0):
+        # a request larger than the whole bucket would never fit; let it through at a full bucket
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                delay = (amount - self.tokens) / self.rate
+                self.waited_seconds += delay
+                await asyncio.sleep(delay)
+
+
+class CircuitBreaker:
+    """closed -> open after `failure_threshold` consecutive failures; one trial call after `reset_seconds`.
+
+    The trial always resolves the half-open state: success closes, a retryable failure re-opens, and
+    anything else (a non-retryable error, cancellation) hands the trial to the next caller.
+    """
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+
+    def allow(self) -> bool:
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self.state = "half_open"
+            return True
+        return self.state == "closed"
+
+    def success(self):
+        self.state = "closed"
+        self.failures = 0
+
+    def failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.trips += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        # the trial ended without telling us anything about the provider; keep opened_at so the next call is the new trial
+        if self.state == "half_open":
+            self.state = "open"
+
+
+class ProviderGate:
+    def __init__(self, provider: LLMProvider, limits: ProviderLimits):
+        self.provider = provider
+        self.limits = limits
+        self.semaphore = asyncio.Semaphore(limits.max_concurrency)
+        self.requests = TokenBucket(limits.requests_per_minute)
+        self.tokens = TokenBucket(limits.tokens_per_minute)
+        self.breaker = CircuitBreaker(settings.LLM_BREAKER_FAILURES, settings.LLM_BREAKER_RESET_SECONDS)
+        self.in_flight = 0
+        self.waiting = 0
+        self.counters = {"calls": 0, "retries": 0, "failures": 0, "rejected": 0}
+
+    def stats(self) -> Dict:
+        return {
+                **self.counters,
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "breaker": self.breaker.state,
+                "breaker_trips": self.breaker.trips,
+                "rate_limited_seconds": round(self.requests.waited_seconds + self.tokens.waited_seconds, 3),
+                "limits": self.limits.model_dump()
+                }
+
+
+class ProviderGateway:
+    """Per-provider admission control around every LLM call: concurrency cap, RPM/TPM buckets,
+    jittered exponential retries for retryable errors and a circuit breaker that fails fast.
+    """
+    def __init__(self, limits: Dict[LLMProvider, ProviderLimits] | None = None):
+        self.limits = dict(DEFAULT_LIMITS)
+        self.limits.update({LLMProvider(name): ProviderLimits.model_validate(value) for name, value in settings.LLM_PROVIDER_LIMITS.items()})
+        self.limits.update(limits or {})
+        self._gates: Dict[LLMProvider, ProviderGate] = {}
+
+    def gate(self, provider: LLMProvider) -> ProviderGate:
+        # created lazily so the asyncio primitives bind to the running loop
+        gate = self._gates.get(provider)
+        if gate is None:
+            gate = ProviderGate(provider, self.limits.get(provider, ProviderLimits()))
+            self._gates[provider] = gate
+        return gate
+
+    def _admit(self, gate: ProviderGate) -> bool:
+        """Whether this call is the breaker's half-open trial"""
+        if not gate.breaker.allow():
+            gate.counters["rejected"] += 1
+            raise CircuitOpenError(f"{gate.provider.value} circuit is open after {gate.breaker.failures} consecutive failures")
+        return gate.breaker.state == "half_open"
+
+    async def _backoff(self, gate: ProviderGate, attempt: int):
+        gate.counters["retries"] += 1
+        delay = min(settings.LLM_RETRY_MAX_SECONDS, settings.LLM_RETRY_BASE_SECONDS * (2 ** attempt))
+        await asyncio.sleep(random.uniform(0, delay))
+
+    async def _enter(self, gate: ProviderGate, tokens: int, trial: bool):
+        gate.waiting += 1
+        try:
+            await gate.semaphore.acquire()
+        except BaseException:
+            if trial:
+                gate.breaker.release()
+            raise
+        finally:
+            gate.waiting -= 1
+        try:
+            await gate.requests.acquire(1)
+            await gate.tokens.acquire(tokens)
+        except BaseException:
+            gate.semaphore.release()
+            if trial:
+                gate.breaker.release()
+            raise
+        gate.in_flight += 1
+
+    def _exit(self, gate: ProviderGate, trial: bool):
+        gate.in_flight -= 1
+        gate.semaphore.release()
+        if trial:
+            gate.breaker.release()
+
+    async def call(self, provider: LLMProvider, tokens: int, attempt_fn: Callable[[], Awaitable[T]]) -> T:
+        gate = self.gate(provider)
+        attempt = 0
+        while True:
+            trial = self._admit(gate)
+            gate.counters["calls"] += 1
+            await self._enter(gate, tokens, trial)
+            try:
+                result = await attempt_fn()
+            except Exception as e:
+                retryable = is_retryable(e)
+                if retryable:
+                    gate.breaker.failure()
+                if retryable and attempt < settings.LLM_MAX_RETRIES:
+                    self._exit(gate, trial)
+                    await self._backoff(gate, attempt)
+                    attempt += 1
+                    continue
+                gate.counters["failures"] += 1
+                self._exit(gate, trial)
+                raise
+            except BaseException:
+                self._exit(gate, trial)
+                raise
+            gate.breaker.success()
+            self._exit(gate, trial)
+            return result
+
+    async def stream(self, provider: LLMProvider, tokens: int, stream_fn: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """Holds one slot for the whole stream; retries only before the first chunk reached the caller"""
+        gate = self.gate(provider)
+        attempt = 0
+        while True:
+            trial = self._admit(gate)
+            gate.counters["calls"] += 1
+            await self._enter(gate, tokens, trial)
+            started = False
+            try:
+                async for chunk in stream_fn():
+                    if not started:
+                        # a first chunk proves the provider is up, even if the consumer stops reading early
+                        gate.breaker.success()
+                        started = True
+                    yield chunk
+            except Exception as e:
+                retryable = is_retryable(e)
+                if retryable:
+                    gate.breaker.failure()
+                if not started and retryable and attempt < settings.LLM_MAX_RETRIES:
+                    self._exit(gate, trial)
+                    await self._backoff(gate, attempt)
+                    attempt += 1
+                    continue
+                gate.counters["failures"] += 1
+                self._exit(gate, trial)
+                raise
+            except BaseException:
+                # cancelled or closed by the consumer mid-stream: not the provider's fault
+                self._exit(gate, trial)
+                raise
+            gate.breaker.success()
+            self._exit(gate, trial)
+            return
+
+    def stats(self) -> Dict:
+        return {provider.value: gate.stats() for provider, gate in self._gates.items()}
+
+
+provider_gateway = ProviderGateway()
@@ -0,0 +1,119 @@
+import asyncio
+import threading
+from typing import AsyncIterator, Callable, Dict, List, Tuple
+
+Attempt = Tuple[str, Callable[[], AsyncIterator]]
+
+
+class HedgeStats:
+    """Per-task counts of hedges fired, failovers and which attempt produced the answer"""
+    def __init__(self):
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._winners: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def count(self, task: str, outcome: str):
+        with self._lock:
+            counters = self._counters.setdefault(task, {"requests": 0, "hedged": 0, "failovers": 0, "secondary_wins": 0, "exhausted": 0})
+            counters[outcome] += 1
+
+    def winner(self, task: str, label: str):
+        with self._lock:
+            winners = self._winners.setdefault(task, {})
+            winners[label] = winners.get(label, 0) + 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                    task: {
+                        **counters,
+                        "hedge_rate": counters["hedged"] / counters["requests"] if counters["requests"] else 0.0,
+                        "winners": dict(self._winners.get(task, {}))
+                        }
+                    for task, counters in self._counters.items()
+                    }
+
+
+hedge_stats = HedgeStats()
+
+
+async def _pump(index: int, factory: Callable[[], AsyncIterator], queue: asyncio.Queue):
+    try:
+        async for chunk in factory():
+            await queue.put((index, "chunk", chunk))
+        await queue.put((index, "done", None))
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        await queue.put((index, "error", e))
+
+
+async def hedged_stream(attempts: List[Attempt], delay_seconds: float, task: str, stats: HedgeStats = hedge_stats) -> AsyncIterator:
+    """Streams from the first attempt that produces output.
+
+    The next attempt is launched once when the running ones have not produced a first chunk within
+    `delay_seconds` (a hedge), and whenever an attempt fails before its first chunk (a failover, which
+    also covers an open circuit since that fails immediately). Losers are cancelled as soon as a
+    winner emits, so only one attempt's chunks ever reach the caller.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    tasks: List[asyncio.Task] = []
+
+    def launch():
+        index = len(tasks)
+        tasks.append(asyncio.create_task(_pump(index, attempts[index][1], queue)))
+
+    stats.count(task, "requests")
+    launch()
+    hedged = False
+    failed = 0
+    first_error: Exception | None = None
+    try:
+        while True:
+            timeout = delay_seconds if not hedged and len(tasks) < len(attempts) else None
+            try:
+                index, kind, value = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                hedged = True
+                stats.count(task, "hedged")
+                launch()
+                continue
+            if kind != "error":
+                break
+            failed += 1
+            first_error = first_error or value
+            if len(tasks) < len(attempts):
+                stats.count(task, "failovers")
+                launch()
+            elif failed == len(tasks):
+                stats.count(task, "exhausted")
+                raise first_error
+
+        winner = index
+        for i, running in enumerate(tasks):
+            if i != winner:
+                running.cancel()
+        stats.winner(task, attempts[winner][0])
+        if winner != 0:
+            stats.count(task, "secondary_wins")
+        while kind != "done":
+            if kind == "error":
+                raise value
+            yield value
+            index, kind, value = await queue.get()
+            while index != winner:
+                index, kind, value = await queue.get()
+    finally:
+        for running in tasks:
+            if not running.done():
+                running.cancel()
+
+
+async def hedged_call(attempts: List[Attempt], delay_seconds: float, task: str, stats: HedgeStats = hedge_stats):
+    """Single-result form of `hedged_stream`; each attempt factory yields exactly one value"""
+    stream = hedged_stream(attempts, delay_seconds, task, stats)
+    try:
+        async for value in stream:
+            return value
+    finally:
+        await stream.aclose()
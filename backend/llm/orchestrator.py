@@ -1,41 +1,207 @@
+import threading
+import time
+from typing import Any, Dict, Type
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import HumanMessage
+from pydantic import BaseModel
+from config.settings import settings
 from exports.types import GeminiModel, GroqModel, LLMProvider, OpenAIModel
-from llm.providers import LLMClient
+from llm.client_pool import llm_client_pool
+from llm.context_cache import GeminiContextCache, gemini_context_cache
+from llm.gateway import ProviderGateway, provider_gateway
+from llm.hedging import hedged_call, hedged_stream
+from llm.prompt_registry import PromptRegistry, prompt_registry
+from llm.providers import DEFAULT_MODELS
+from llm.response_cache import llm_response_cache, response_cache_key
+from llm.routing import LatencyTracker, ModelRouter, estimate_tokens, latency_key, model_router
+from llm.structured import structured_output_kwargs
+
+
+class LatencyCallback(BaseCallbackHandler):
+    """Feeds the routing tracker from chat model calls made outside the orchestrator, e.g. by agents"""
+    run_inline = True
+
+    def __init__(self, tracker: LatencyTracker, key: str):
+        self.tracker = tracker
+        self.key = key
+        self._started: Dict[UUID, float] = {}
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any):
+        with self._lock:
+            self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any):
+        with self._lock:
+            started = self._started.pop(run_id, None)
+        if started is not None:
+            self.tracker.observe(self.key, (time.perf_counter() - started) * 1000)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        with self._lock:
+            self._started.pop(run_id, None)
+        self.tracker.error(self.key)
 
 
 class LLMOrchestrator:
-    def __init__(self, default_provider: LLMProvider = LLMProvider.GEMINI, default_model: dict[LLMProvider, str] | None = None):
+    def __init__(self, default_provider: LLMProvider = LLMProvider.GEMINI, default_model: dict[LLMProvider, str] | None = None, router: ModelRouter | None = None, gateway: ProviderGateway | None = None, prompts: PromptRegistry | None = None, context_cache: GeminiContextCache | None = None):
         self.default_provider = default_provider
         self.default_model = default_model or {
                 LLMProvider.GEMINI: GeminiModel.FLASH.value,
                 LLMProvider.GROQ: GroqModel.LLAMA_70B.value,
                 LLMProvider.OPENAI: OpenAIModel.GPT_4O_MINI.value
                 }
+        self.router = router or model_router
+        self.gateway = gateway or provider_gateway
+        self.prompts = prompts or prompt_registry
+        self.context_cache = context_cache or gemini_context_cache
+        self.hedge_tasks = {task.strip() for task in settings.LLM_HEDGE_TASKS.split(",") if task.strip()}
+
+    def _model_selection(self, text: str, task: str | None = None, kind: str = "total"):
+        return self.router.route(task, text, kind)
+
+    def _token_estimate(self, prompt: str, task: str | None, system: str | None = None) -> int:
+        # TPM budgets count the answer too, so reserve the task's expected output up front
+        rule = self.router.rules.get(task or "default", self.router.rules["default"])
+        prefix_tokens = self.prompts.get(system).tokens if system else 0
+        return prefix_tokens + estimate_tokens(prompt) + rule.expected_output_tokens
+
+    async def _model_input(self, prompt: str, system: str | None, provider: LLMProvider, model_name: str, schema: Type[BaseModel] | None = None):
+        """Chat model input plus call kwargs; a registered `system` prefix goes out as its own, cacheable message"""
+        kwargs = structured_output_kwargs(provider, schema) if schema is not None else {}
+        if system is None:
+            return prompt, kwargs
+        if provider == LLMProvider.GEMINI:
+            cached_content = await self.context_cache.lookup(model_name, self.prompts.get(system))
+            if cached_content is not None:
+                return [HumanMessage(content=prompt)], {**kwargs, "cached_content": cached_content}
+        # OpenAI and Groq reuse identical prefixes on their own; the system message only has to lead and stay byte-stable
+        return self.prompts.messages(system, prompt), kwargs
+
+    def _resolve(self, prompt: str, provider, model_name, task: str | None, kind: str = "total"):
+        if provider is None:
+            return self._model_selection(prompt, task, kind)
+        return provider, model_name or self.default_model.get(provider) or DEFAULT_MODELS[provider]
+
+    def _targets(self, prompt: str, provider, model_name, task: str | None, kind: str = "total"):
+        """Primary first, then alternates on other providers when the task hedges; an explicit provider never hedges"""
+        primary = self._resolve(prompt, provider, model_name, task, kind)
+        if provider is not None or task not in self.hedge_tasks:
+            return [primary]
+        alternates = self.router.alternates(task, prompt, primary[0], kind)
+        return [primary, *alternates][:max(1, settings.LLM_HEDGE_MAX_ATTEMPTS)]
 
-    def _model_selection(self, text: str):
-        return LLMProvider.GEMINI, GeminiModel.FLASH.value
+    def _hedge_delay(self, provider: LLMProvider, model_name: str, kind: str = "total") -> float:
+        # hedge once the primary is slower than its own recent p95 of the same kind (time to first token for
+        # streams, full response for plain calls); until it has enough samples use a fixed delay
+        p95 = self.router.tracker.quantile(latency_key(f"{provider.value}:{model_name}", kind), settings.LLM_HEDGE_QUANTILE, settings.LLM_HEDGE_MIN_SAMPLES)
+        return max(settings.LLM_HEDGE_MIN_DELAY_MS, p95 if p95 is not None else settings.LLM_HEDGE_DEFAULT_DELAY_MS) / 1000
 
-    async def ai_invoke(self, prompt: str, provider = None, model_name = None):
-        if provider is None or model_name is None:
-            auto_provider, auto_model = self._model_selection(prompt)
-            provider = provider or auto_provider
-            model_name = model_name or auto_model
-        client = LLMClient(provider=provider, model=model_name)
-        response = await client.model.ainvoke(prompt)
+    async def _invoke_once(self, prompt: str, provider: LLMProvider, model_name: str, task: str | None, system: str | None = None, schema: Type[BaseModel] | None = None):
+        client = llm_client_pool.get(provider, model_name)
+        key = latency_key(f"{provider.value}:{model_name}", "total")
+        model_input, kwargs = await self._model_input(prompt, system, provider, model_name, schema)
+
+        async def attempt():
+            started = time.perf_counter()
+            try:
+                response = await client.model.ainvoke(model_input, **kwargs)
+            except Exception:
+                self.router.tracker.error(key)
+                raise
+            self.router.tracker.observe(key, (time.perf_counter() - started) * 1000)
+            return response
+
+        response = await self.gateway.call(provider, self._token_estimate(prompt, task, system), attempt)
+        if system is not None:
+            self.prompts.record_usage(system, getattr(response, "usage_metadata", None))
         return response.content
 
-    async def ai_stream(self, prompt: str, provider = None, model_name = None):
-        if provider is None or model_name is None:
-            auto_provider, auto_model = self._model_selection(prompt)
-            provider = provider or auto_provider
-            model_name = model_name or auto_model
-        client = LLMClient(provider=provider, model=model_name)
-        async for chunk in client.stream(prompt):
+    def _invoke_attempt(self, prompt: str, provider: LLMProvider, model_name: str, task: str | None, system: str | None, schema: Type[BaseModel] | None):
+        async def run():
+            yield await self._invoke_once(prompt, provider, model_name, task, system, schema)
+
+        return f"{provider.value}:{model_name}", run
+
+    def _stream_attempt(self, prompt: str, provider: LLMProvider, model_name: str, task: str | None, system: str | None, schema: Type[BaseModel] | None):
+        client = llm_client_pool.get(provider, model_name)
+        key = latency_key(f"{provider.value}:{model_name}", "ttft")
+
+        async def attempt():
+            model_input, kwargs = await self._model_input(prompt, system, provider, model_name, schema)
+            started = time.perf_counter()
+            first = True
+            try:
+                async for chunk in client.stream(model_input, **kwargs):
+                    if first:
+                        # for streams the user-facing latency is time to first token
+                        self.router.tracker.observe(key, (time.perf_counter() - started) * 1000)
+                        first = False
+                    yield chunk
+            except Exception:
+                self.router.tracker.error(key)
+                raise
+
+        def run():
+            return self.gateway.stream(provider, self._token_estimate(prompt, task, system), attempt)
+
+        return f"{provider.value}:{model_name}", run
+
+    def _cache_key(self, text: str, provider: LLMProvider, model_name: str, schema: Type[BaseModel] | None):
+        client = llm_client_pool.get(provider, model_name)
+        # a schema-constrained answer differs from a free-form one for the same prompt
+        keyed = f"{schema.__name__}\n{text}" if schema is not None else text
+        return response_cache_key(provider.value, model_name, client.temperature, keyed)
+
+    async def ai_invoke(self, prompt: str, provider = None, model_name = None, task: str | None = None, cache: bool = False, system: str | None = None, schema: Type[BaseModel] | None = None):
+        """`cache` opts a call site into the exact-match response cache; leave it off for user-facing answers.
+        `system` names a registered static prefix that `prompt` follows; `schema` asks the provider for JSON matching it.
+        """
+        text = self.prompts.render(system, prompt) if system else prompt
+        targets = self._targets(text, provider, model_name, task)
+        provider, model_name = targets[0]
+        cache_key = None
+        if cache:
+            cache_key = self._cache_key(text, provider, model_name, schema)
+            cached = llm_response_cache.get(cache_key, task or "default")
+            if cached is not None:
+                return cached
+        if len(targets) == 1:
+            content = await self._invoke_once(prompt, provider, model_name, task, system, schema)
+        else:
+            attempts = [self._invoke_attempt(prompt, target, target_model, task, system, schema) for target, target_model in targets]
+            content = await hedged_call(attempts, self._hedge_delay(provider, model_name, "total"), task)
+        if cache_key is not None and content:
+            llm_response_cache.set(cache_key, content)
+        return content
+
+    async def ai_stream(self, prompt: str, provider = None, model_name = None, task: str | None = None, system: str | None = None, schema: Type[BaseModel] | None = None, cache: bool = False):
+        text = self.prompts.render(system, prompt) if system else prompt
+        targets = self._targets(text, provider, model_name, task, "ttft")
+        primary, primary_model = targets[0]
+        cache_key = None
+        if cache:
+            cache_key = self._cache_key(text, primary, primary_model, schema)
+            cached = llm_response_cache.get(cache_key, task or "default")
+            if cached is not None:
+                yield cached
+                return
+        attempts = [self._stream_attempt(prompt, target, target_model, task, system, schema) for target, target_model in targets]
+        if len(attempts) == 1:
+            chunks = attempts[0][1]()
+        else:
+            chunks = hedged_stream(attempts, self._hedge_delay(primary, primary_model, "ttft"), task)
+        streamed = []
+        async for chunk in chunks:
+            streamed.append(chunk)
             yield chunk
+        if cache_key is not None and streamed:
+            llm_response_cache.set(cache_key, "".join(streamed))
 
-    def get_agent_model(self, provider: LLMProvider | None = None, model_name: str | None = None):
-        if provider is None:
-            provider = self.default_provider
-        if model_name is None:
-            model_name = self.default_model[provider]
-        client = LLMClient(provider=provider, model=model_name)
-        return client.get_chat_model()
+    def get_agent_model(self, provider: LLMProvider | None = None, model_name: str | None = None, task: str | None = "agent"):
+        """Chat model for an agent plus the callbacks to run it with, so each of its model calls feeds routing"""
+        provider, model_name = self._resolve("", provider, model_name, task)
+        client = llm_client_pool.get(provider, model_name)
+        callback = LatencyCallback(self.router.tracker, latency_key(f"{provider.value}:{model_name}", "total"))
+        return client.get_chat_model(), [callback]
@@ -0,0 +1,106 @@
+import hashlib
+import threading
+from typing import Dict, List
+from langchain_core.messages import HumanMessage, SystemMessage
+from pydantic import BaseModel
+from llm import prompts
+from llm.routing import estimate_tokens
+
+STATIC_PROMPTS: Dict[str, str] = {
+        "memory_answer": prompts.MEMORY_ANSWER_PROMPT,
+        "memory_extraction": prompts.MEMORY_EXTRACTION_WITH_TYPES_PROMPT,
+        "memory_update": prompts.DEFAULT_UPDATE_MEMORY_PROMPT,
+        "raw_conversation_style": prompts.RAW_CONVERSATION_STYLE_PROMPT,
+        "pattern_detection": prompts.PATTERN_DETECTION_PROMPT,
+        "preference_analysis": prompts.PREFERENCE_ANALYSIS_PROMPT,
+        "conversation_style_analysis": prompts.CONVERSATION_STYLE_ANALYSIS_PROMPT
+        }
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """o200k token count when tiktoken (installed with langchain-openai) can load its encoding, else the routing estimate"""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            print(f"Error while loading tokenizer, falling back to estimates: {str(e)}")
+            _encoding = False
+    return len(_encoding.encode(text)) if _encoding else estimate_tokens(text)
+
+
+class CompiledPrompt(BaseModel):
+    name: str
+    text: str
+    digest: str
+    tokens: int
+
+
+class PromptRegistry:
+    """Static instruction prefixes, compiled once: hashed, token-counted and sent as their own system message.
+
+    Keeping the prefix byte-identical and ahead of the per-request data is what lets providers reuse it
+    (explicit cached content on Gemini, automatic prefix caching on OpenAI and Groq).
+    """
+    def __init__(self, sources: Dict[str, str] | None = None):
+        self.sources = dict(sources or STATIC_PROMPTS)
+        self._compiled: Dict[str, CompiledPrompt] = {}
+        self._usage: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _compile(self, name: str) -> CompiledPrompt:
+        text = self.sources[name].strip()
+        return CompiledPrompt(
+                name=name,
+                text=text,
+                digest=hashlib.sha256(text.encode("utf-8")).hexdigest(),
+                tokens=count_tokens(text)
+                )
+
+    def compile(self) -> int:
+        for name in self.sources:
+            self.get(name)
+        return len(self._compiled)
+
+    def get(self, name: str) -> CompiledPrompt:
+        compiled = self._compiled.get(name)
+        if compiled is None:
+            compiled = self._compile(name)
+            with self._lock:
+                self._compiled.setdefault(name, compiled)
+        return compiled
+
+    def render(self, name: str, dynamic: str) -> str:
+        """Single-string form for routing, token estimates and response-cache keys"""
+        return f"{self.get(name).text}\n\n{dynamic}"
+
+    def messages(self, name: str, dynamic: str) -> List:
+        return [SystemMessage(content=self.get(name).text), HumanMessage(content=dynamic)]
+
+    def record_usage(self, name: str, usage: Dict | None):
+        """Tracks how much of each prefix the provider actually served from its cache"""
+        if not usage:
+            return
+        details = usage.get("input_token_details") or {}
+        with self._lock:
+            counters = self._usage.setdefault(name, {"calls": 0, "input_tokens": 0, "cached_input_tokens": 0})
+            counters["calls"] += 1
+            counters["input_tokens"] += usage.get("input_tokens", 0) or 0
+            counters["cached_input_tokens"] += details.get("cache_read", 0) or 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                    name: {
+                        "prefix_tokens": compiled.tokens,
+                        "digest": compiled.digest[:12],
+                        **self._usage.get(name, {})
+                        }
+                    for name, compiled in self._compiled.items()
+                    }
+
+
+prompt_registry = PromptRegistry()
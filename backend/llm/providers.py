@@ -2,46 +2,70 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_openai import ChatOpenAI
 from langchain_groq import ChatGroq
 from config.settings import settings
-from exports.types import GeminiModel, GroqModel, LLMProvider, OpenAIModel
+from exports.types import FakeModel, GeminiModel, GroqModel, LLMProvider, OpenAIModel
+from llm.fake import RecordingChatModel, build_fake_model
+from llm.routing import OFFLINE_FAKE_MODES
+
+DEFAULT_MODELS = {
+        LLMProvider.GEMINI: GeminiModel.FLASH.value,
+        LLMProvider.GROQ: GroqModel.LLAMA_70B.value,
+        LLMProvider.OPENAI: OpenAIModel.GPT_4O_MINI.value,
+        LLMProvider.FAKE: FakeModel.SYNTHETIC.value
+        }
 
 class LLMClient():
-    def __init__(self, provider: LLMProvider, model: str | None = None):
+    def __init__(self, provider: LLMProvider, model: str | None = None, temperature: float = 0.2, streaming: bool = True):
         self.provider = provider
         self.model_name = model
+        self.temperature = temperature
+        self.streaming = streaming
         self.model = self._initialize_model()
 
     def _initialize_model(self):
+        model = self.model_name or DEFAULT_MODELS[self.provider]
+        # LLM_FAKE_MODE=synthetic|replay swaps every provider for an offline model; routing and limits stay per provider
+        if self.provider == LLMProvider.FAKE or settings.LLM_FAKE_MODE in OFFLINE_FAKE_MODES:
+            return build_fake_model(self.provider.value, model)
+        provider_model = self._provider_model()
+        if settings.LLM_FAKE_MODE == "record":
+            return RecordingChatModel(delegate=provider_model, provider_name=self.provider.value, model_name=model, cassette_path=settings.LLM_FAKE_CASSETTE)
+        return provider_model
+
+    def _provider_model(self):
         if self.provider == LLMProvider.GEMINI:
-            model = self.model_name or GeminiModel.FLASH.value
+            model = self.model_name or DEFAULT_MODELS[LLMProvider.GEMINI]
             return ChatGoogleGenerativeAI(
                     model=model,
                     google_api_key=settings.GEMINI_API_KEY,
-                    temperature=0.2,
-                    streaming=True
+                    temperature=self.temperature,
+                    streaming=self.streaming
                     )
         elif self.provider == LLMProvider.GROQ:
-            model = self.model_name or GroqModel.LLAMA_70B.value
+            model = self.model_name or DEFAULT_MODELS[LLMProvider.GROQ]
             return ChatGroq(
                     model=model,
                     api_key=settings.GROQ_API_KEY,
-                    temperature=0.2,
-                    streaming=True
+                    temperature=self.temperature,
+                    streaming=self.streaming
                     )
         elif self.provider == LLMProvider.OPENAI:
-            model = self.model_name or OpenAIModel.GPT_4O_MINI.value
+            model = self.model_name or DEFAULT_MODELS[LLMProvider.OPENAI]
             return ChatOpenAI(
                     model=model,
                     api_key=settings.OPENAI_API_KEY,
-                    temperature=0.2,
-                    streaming=True
+                    temperature=self.temperature,
+                    streaming=self.streaming
                     )
         else:
             raise ValueError(f"Unsupported Provider: {self.provider}")
 
-    async def stream(self, prompt: str):
-        async for chunk in self.model.astream(prompt):
+    async def stream(self, prompt, **kwargs):
+        async for chunk in self.model.astream(prompt, **kwargs):
             if chunk.content and isinstance(chunk.content, str):
                 yield chunk.content
     
     def get_chat_model(self):
+        # agents need tool binding, which only the real model implements
+        if isinstance(self.model, RecordingChatModel):
+            return self.model.delegate
         return self.model
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from config.settings import settings
+
+_MISSING = object()
+
+
+def response_cache_key(provider: str, model: str, temperature: float, prompt: str) -> str:
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    return f"{provider}:{model}:{temperature}:{digest}"
+
+
+class LRUResponseCache:
+    """In-process LRU of LLM responses with a per-entry TTL"""
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, expires_at: float | None = None):
+        with self._lock:
+            self._entries[key] = (expires_at or time.time() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SqliteResponseCache:
+    """Persistent tier: one row per response, expired rows are ignored and pruned on write"""
+    def __init__(self, directory: str, ttl_seconds: float):
+        os.makedirs(directory, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(directory, "llm_responses.sqlite"), check_same_thread=False)
+        self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+        self._db.commit()
+
+    def get(self, key: str):
+        with self._lock:
+            found = self._db.execute(
+                    "SELECT value, expires_at FROM responses WHERE key = ? AND expires_at >= ?", (key, time.time())
+                    ).fetchone()
+        if not found:
+            return _MISSING, 0.0
+        return json.loads(found[0]), found[1]
+
+    def set(self, key: str, value: Any):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), now + self.ttl_seconds)
+                    )
+            self._db.execute("DELETE FROM responses WHERE expires_at < ?", (now,))
+            self._db.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+class LLMResponseCache:
+    """Two-tier exact-match cache of LLM responses, with hit rates tracked per call site"""
+    def __init__(self, max_entries: int, ttl_seconds: float, directory: str = ""):
+        self.memory = LRUResponseCache(max_entries, ttl_seconds)
+        self.disk = SqliteResponseCache(directory, ttl_seconds) if directory else None
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, site: str, outcome: str):
+        with self._lock:
+            counters = self._counters.setdefault(site, {"hits": 0, "disk_hits": 0, "misses": 0})
+            counters[outcome] += 1
+
+    def get(self, key: str, site: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is not _MISSING:
+            self._count(site, "hits")
+            return value
+        if self.disk is not None:
+            value, expires_at = self.disk.get(key)
+            if value is not _MISSING:
+                self._count(site, "hits")
+                self._count(site, "disk_hits")
+                self.memory.set(key, value, expires_at)
+                return value
+        self._count(site, "misses")
+        return None
+
+    def set(self, key: str, value: Any):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, value)
+            except Exception as e:
+                print(f"Error while persisting LLM response: {str(e)}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            sites = {
+                    site: {**counters, "hit_rate": counters["hits"] / (counters["hits"] + counters["misses"]) if counters["hits"] + counters["misses"] else 0.0}
+                    for site, counters in self._counters.items()
+                    }
+        return {
+                "sites": sites,
+                "memory_entries": len(self.memory),
+                "disk_entries": len(self.disk) if self.disk is not None else 0
+                }
+
+
+llm_response_cache = LLMResponseCache(
+        max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+        directory=settings.LLM_CACHE_DIR
+        )
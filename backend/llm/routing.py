@@ -0,0 +1,233 @@
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Tuple
+from pydantic import BaseModel
+from config.settings import settings
+from exports.types import FakeModel, GeminiModel, GroqModel, LLMProvider, OpenAIModel
+from utils.metrics import LATENCY_MS_BUCKETS, Histogram
+
+
+class ModelProfile(BaseModel):
+    """Static facts used for routing; prices are USD per million tokens"""
+    provider: LLMProvider
+    model: str
+    input_price: float
+    output_price: float
+    context_tokens: int
+
+
+MODEL_CATALOG: Dict[str, ModelProfile] = {
+        f"{profile.provider.value}:{profile.model}": profile for profile in [
+            ModelProfile(provider=LLMProvider.GEMINI, model=GeminiModel.FLASH.value, input_price=0.30, output_price=2.50, context_tokens=1_048_576),
+            ModelProfile(provider=LLMProvider.GEMINI, model=GeminiModel.PRO.value, input_price=1.25, output_price=10.00, context_tokens=1_048_576),
+            ModelProfile(provider=LLMProvider.GROQ, model=GroqModel.LLAMA_70B.value, input_price=0.59, output_price=0.79, context_tokens=131_072),
+            ModelProfile(provider=LLMProvider.GROQ, model=GroqModel.MIXTRAL.value, input_price=0.24, output_price=0.24, context_tokens=32_768),
+            ModelProfile(provider=LLMProvider.OPENAI, model=OpenAIModel.GPT_4O_MINI.value, input_price=0.15, output_price=0.60, context_tokens=128_000),
+            ModelProfile(provider=LLMProvider.OPENAI, model=OpenAIModel.GPT_4O.value, input_price=2.50, output_price=10.00, context_tokens=128_000),
+            ModelProfile(provider=LLMProvider.OPENAI, model=OpenAIModel.GPT_5.value, input_price=1.25, output_price=10.00, context_tokens=400_000),
+            ModelProfile(provider=LLMProvider.FAKE, model=FakeModel.SYNTHETIC.value, input_price=0.0, output_price=0.0, context_tokens=1_048_576)
+            ]
+        }
+
+
+class TaskRule(BaseModel):
+    """Candidates a task may use, its latency SLO and the typical answer size for cost estimates"""
+    candidates: List[str]
+    slo_ms: float
+    expected_output_tokens: int = 500
+
+
+DEFAULT_RULES: Dict[str, TaskRule] = {
+        # untagged calls keep the historical choice
+        "default": TaskRule(candidates=["gemini:gemini-2.5-flash"], slo_ms=10000),
+        "extraction": TaskRule(
+            candidates=["openai:gpt-4o-mini", "gemini:gemini-2.5-flash", "groq:llama-3.3-70b-versatile"],
+            slo_ms=20000, expected_output_tokens=300
+            ),
+        "memory_update": TaskRule(
+            candidates=["openai:gpt-4o-mini", "gemini:gemini-2.5-flash", "groq:llama-3.3-70b-versatile"],
+            slo_ms=20000, expected_output_tokens=500
+            ),
+        "pattern_analysis": TaskRule(
+            candidates=["gemini:gemini-2.5-flash", "openai:gpt-4o-mini", "gemini:gemini-2.5-pro"],
+            slo_ms=60000, expected_output_tokens=800
+            ),
+        "agent": TaskRule(
+            candidates=["gemini:gemini-2.5-flash", "openai:gpt-4o-mini", "groq:llama-3.3-70b-versatile"],
+            slo_ms=4000, expected_output_tokens=200
+            ),
+        "final_answer": TaskRule(
+            candidates=["gemini:gemini-2.5-flash", "groq:llama-3.3-70b-versatile", "openai:gpt-4o-mini"],
+            slo_ms=3000, expected_output_tokens=500
+            )
+        }
+
+API_KEYS = {
+        LLMProvider.GEMINI: lambda: settings.GEMINI_API_KEY,
+        LLMProvider.GROQ: lambda: settings.GROQ_API_KEY,
+        LLMProvider.OPENAI: lambda: settings.OPENAI_API_KEY,
+        LLMProvider.FAKE: lambda: "fake"
+        }
+
+# LLM_FAKE_MODE values that never reach a real provider, so no API keys are needed
+OFFLINE_FAKE_MODES = ("synthetic", "replay")
+
+
+def latency_key(key: str, kind: str = "total") -> str:
+    # "total" (a plain call's full response time) and "ttft" (a stream's time to first token) are different distributions
+    return f"{key}/{kind}"
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token across the supported tokenizers; routing only needs the magnitude
+    return max(1, len(text) // 4)
+
+
+class LatencyTracker:
+    """Per-model, per-kind latency (see `latency_key`): an EWMA for routing (tracks the recent past) plus a histogram for metrics"""
+    def __init__(self, alpha: float = 0.2):
+        self.alpha = alpha
+        self._ewma: Dict[str, float] = {}
+        self._histograms: Dict[str, Histogram] = {}
+        self._errors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, key: str, latency_ms: float):
+        with self._lock:
+            previous = self._ewma.get(key)
+            self._ewma[key] = latency_ms if previous is None else self.alpha * latency_ms + (1 - self.alpha) * previous
+            histogram = self._histograms.setdefault(key, Histogram(LATENCY_MS_BUCKETS))
+        histogram.observe(latency_ms)
+
+    def quantile(self, key: str, q: float, min_samples: int = 1) -> float | None:
+        with self._lock:
+            histogram = self._histograms.get(key)
+        if histogram is None or histogram.count < min_samples:
+            return None
+        return histogram.quantile(q)
+
+    def error(self, key: str):
+        with self._lock:
+            self._errors[key] = self._errors.get(key, 0) + 1
+
+    def latency(self, key: str) -> float | None:
+        with self._lock:
+            return self._ewma.get(key)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            keys = set(self._histograms) | set(self._errors)
+            return {
+                    key: {
+                        "ewma_ms": self._ewma.get(key),
+                        "errors": self._errors.get(key, 0),
+                        **(self._histograms[key].snapshot() if key in self._histograms else {})
+                        }
+                    for key in keys
+                    }
+
+
+class ModelRouter:
+    """Picks the cheapest configured candidate whose observed latency meets the task's SLO.
+
+    Models without samples yet are assumed to meet it, so every candidate gets measured. When none
+    meets the SLO the fastest observed one wins. `kind` picks which latency is compared: full response
+    time for plain calls, time to first token for streams.
+    """
+    def __init__(self, rules: Dict[str, TaskRule] | None = None, tracker: LatencyTracker | None = None, history: int = 200):
+        self.rules = dict(DEFAULT_RULES)
+        self.rules.update({task: TaskRule.model_validate(rule) for task, rule in settings.LLM_ROUTING_RULES.items()})
+        self.rules.update(rules or {})
+        self.tracker = tracker or LatencyTracker()
+        self.decisions: deque = deque(maxlen=history)
+
+    def _available(self, key: str) -> bool:
+        profile = MODEL_CATALOG.get(key)
+        if profile is None:
+            return False
+        return settings.LLM_FAKE_MODE in OFFLINE_FAKE_MODES or API_KEYS[profile.provider]() is not None
+
+    def route(self, task: str | None, prompt: str, kind: str = "total") -> Tuple[LLMProvider, str]:
+        task = task if task in self.rules else "default"
+        rule = self.rules[task]
+        prompt_tokens = estimate_tokens(prompt)
+        candidates = [
+                MODEL_CATALOG[key] for key in rule.candidates
+                if self._available(key) and MODEL_CATALOG[key].context_tokens >= prompt_tokens + rule.expected_output_tokens
+                ]
+        if not candidates:
+            # nothing usable is configured; fall back to the rule's first choice and let the call surface the error
+            first = rule.candidates[0]
+            provider, _, model = first.partition(":")
+            self._record(task, prompt_tokens, first, "fallback", None, None, rule.candidates[1:])
+            return LLMProvider(provider), model
+
+        def cost(profile: ModelProfile) -> float:
+            return (prompt_tokens * profile.input_price + rule.expected_output_tokens * profile.output_price) / 1_000_000
+
+        ranked = sorted(candidates, key=cost)
+        keys = [f"{profile.provider.value}:{profile.model}" for profile in ranked]
+        for profile in ranked:
+            key = f"{profile.provider.value}:{profile.model}"
+            latency = self.tracker.latency(latency_key(key, kind))
+            if latency is None or latency <= rule.slo_ms:
+                self._record(
+                        task, prompt_tokens, key, "within_slo" if latency is not None else "unmeasured", latency, cost(profile),
+                        [other for other in keys if other != key]
+                        )
+                return profile.provider, profile.model
+        fastest = min(ranked, key=lambda profile: self.tracker.latency(latency_key(f"{profile.provider.value}:{profile.model}", kind)) or 0.0)
+        key = f"{fastest.provider.value}:{fastest.model}"
+        self._record(
+                task, prompt_tokens, key, "fastest", self.tracker.latency(latency_key(key, kind)), cost(fastest),
+                [other for other in keys if other != key]
+                )
+        return fastest.provider, fastest.model
+
+    def alternates(self, task: str | None, prompt: str, primary: LLMProvider, kind: str = "total") -> List[Tuple[LLMProvider, str]]:
+        """Usable candidates on other providers, one per provider, fastest observed first; used to hedge and fail over"""
+        rule = self.rules[task if task in self.rules else "default"]
+        prompt_tokens = estimate_tokens(prompt)
+        seen = {primary}
+        alternates = []
+        for key in rule.candidates:
+            profile = MODEL_CATALOG.get(key)
+            if profile is None or profile.provider in seen or not self._available(key):
+                continue
+            if profile.context_tokens < prompt_tokens + rule.expected_output_tokens:
+                continue
+            seen.add(profile.provider)
+            alternates.append(profile)
+        alternates.sort(key=lambda profile: self.tracker.latency(latency_key(f"{profile.provider.value}:{profile.model}", kind)) or rule.slo_ms)
+        return [(profile.provider, profile.model) for profile in alternates]
+
+    def _record(
+            self, task: str, prompt_tokens: int, choice: str, reason: str, latency_ms: float | None, cost_usd: float | None,
+            alternates: List[str]
+            ):
+        print(f"Routed '{task}' ({prompt_tokens} tokens) to {choice}: {reason}; alternates: {', '.join(alternates) or 'none'}")
+        self.decisions.append({
+            "at": time.time(),
+            "task": task,
+            "prompt_tokens": prompt_tokens,
+            "choice": choice,
+            "reason": reason,
+            "ewma_ms": latency_ms,
+            "estimated_cost_usd": cost_usd,
+            "alternates": alternates
+            })
+
+    def stats(self) -> Dict:
+        counts: Dict[str, Dict[str, int]] = {}
+        for decision in list(self.decisions):
+            per_task = counts.setdefault(decision["task"], {})
+            per_task[decision["choice"]] = per_task.get(decision["choice"], 0) + 1
+        return {
+                "latency": self.tracker.stats(),
+                "recent_choices": counts,
+                "last_decisions": list(self.decisions)[-10:]
+                }
+
+
+model_router = ModelRouter()
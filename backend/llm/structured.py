@@ -0,0 +1,74 @@
+import threading
+from typing import AsyncIterator, Dict, List, Type, TypeVar
+from pydantic import BaseModel, ValidationError
+from exports.parser import JsonArrayItemParser
+from exports.types import LLMProvider
+
+Item = TypeVar("Item", bound=BaseModel)
+
+_counters: Dict[str, Dict[str, int]] = {}
+_lock = threading.Lock()
+
+
+def _count(key: str, items: int, malformed: int):
+    with _lock:
+        counters = _counters.setdefault(key, {"responses": 0, "items": 0, "malformed": 0})
+        counters["responses"] += 1
+        counters["items"] += items
+        counters["malformed"] += malformed
+
+
+def structured_output_stats() -> Dict:
+    with _lock:
+        return {key: dict(counters) for key, counters in _counters.items()}
+
+
+def structured_output_kwargs(provider: LLMProvider, schema: Type[BaseModel]) -> Dict:
+    """Per-call kwargs asking the provider to constrain its answer to `schema`.
+
+    Groq only guarantees syntactically valid JSON on most models, so items are still validated
+    on our side for every provider.
+    """
+    json_schema = schema.model_json_schema()
+    if provider == LLMProvider.OPENAI:
+        return {"response_format": {"type": "json_schema", "json_schema": {"name": schema.__name__, "schema": json_schema}}}
+    if provider == LLMProvider.GEMINI:
+        return {"response_mime_type": "application/json", "response_json_schema": json_schema}
+    if provider == LLMProvider.GROQ:
+        return {"response_format": {"type": "json_object"}}
+    return {}
+
+
+async def stream_items(chunks: AsyncIterator[str], key: str, item_model: Type[Item]) -> AsyncIterator[Item]:
+    """Validated elements of the `key` array, each yielded as soon as its closing brace streams in"""
+    parser = JsonArrayItemParser(key)
+    items = 0
+    try:
+        async for chunk in chunks:
+            for raw in parser.feed(chunk):
+                try:
+                    item = item_model.model_validate(raw)
+                except ValidationError:
+                    parser.malformed += 1
+                    continue
+                items += 1
+                yield item
+    finally:
+        _count(key, items, parser.malformed)
+        if parser.malformed:
+            print(f"Skipped {parser.malformed} malformed '{key}' item(s) in LLM response")
+
+
+def parse_items(response: str, key: str, item_model: Type[Item]) -> List[Item]:
+    """Non-streaming form of `stream_items` for a complete response"""
+    parser = JsonArrayItemParser(key)
+    items = []
+    for raw in parser.feed(response):
+        try:
+            items.append(item_model.model_validate(raw))
+        except ValidationError:
+            parser.malformed += 1
+    _count(key, len(items), parser.malformed)
+    if parser.malformed:
+        print(f"Skipped {parser.malformed} malformed '{key}' item(s) in LLM response")
+    return items
@@ -1,29 +1,28 @@
 from datetime import datetime, timedelta
-from qdrant_client.models import Filter, FieldCondition, MatchValue, DatetimeRange
+from qdrant_client.models import Filter, FieldCondition, MatchValue, Range
+from typing import List
+from exports.types import MemorySearchResult
 from storage.memory_store import MemoryStore
 
 
 class EpisodicMemory:
-    def __init__(self):
-        self.memory_store = MemoryStore()
+    def __init__(self, memory_store: MemoryStore | None = None):
+        self.memory_store = memory_store or MemoryStore()
 
-    def get_recent_memory(self, user_id: str, days: int = 7):
+    def _recent_filter(self, user_id: str, days: int) -> Filter:
         cutoff = datetime.now() - timedelta(days=days)
-        filter_ = Filter(must=[
+        return Filter(must=[
             FieldCondition(key="user_id", match=MatchValue(value=user_id)),
-            FieldCondition(key="timestamp", range=DatetimeRange(gte=cutoff))
+            FieldCondition(key="timestamp_epoch", range=Range(gte=int(cutoff.timestamp())))
             ])
-        return self.memory_store.custom_search_with_filters(filter_)
 
-    def get_by_date_range(self, user_id: str, start: datetime, end: datetime):
-        filter_ = Filter(must=[
+    def _date_range_filter(self, user_id: str, start: datetime, end: datetime) -> Filter:
+        return Filter(must=[
             FieldCondition(key="user_id", match=MatchValue(value=user_id)),
-            FieldCondition(key="timestamp", range=DatetimeRange(gte=start, lte=end))
+            FieldCondition(key="timestamp_epoch", range=Range(gte=int(start.timestamp()), lte=int(end.timestamp())))
             ])
-        return self.memory_store.custom_search_with_filters(filter_)
 
-    def search_with_recency_score(self, user_id: str, query: str, boost_factor: float = 0.1):
-        results = self.memory_store.search_memories_with_scores(query=query, user_id=user_id)
+    def _apply_recency_boost(self, results: List[MemorySearchResult], boost_factor: float):
         now = datetime.now()
         for result in results:
             age = (now - result.timestamp).days
@@ -31,3 +30,23 @@ class EpisodicMemory:
             result.boosted_score = result.score * recency_factor
         results.sort(key=lambda x: x.boosted_score, reverse=True)
         return results[:10]
+
+    def get_recent_memory(self, user_id: str, days: int = 7):
+        return self.memory_store.custom_search_with_filters(self._recent_filter(user_id, days))
+
+    def get_by_date_range(self, user_id: str, start: datetime, end: datetime):
+        return self.memory_store.custom_search_with_filters(self._date_range_filter(user_id, start, end))
+
+    def search_with_recency_score(self, user_id: str, query: str, boost_factor: float = 0.1):
+        results = self.memory_store.search_memories_with_scores(query=query, user_id=user_id)
+        return self._apply_recency_boost(results, boost_factor)
+
+    async def aget_recent_memory(self, user_id: str, days: int = 7):
+        return await self.memory_store.acustom_search_with_filters(self._recent_filter(user_id, days))
+
+    async def aget_by_date_range(self, user_id: str, start: datetime, end: datetime):
+        return await self.memory_store.acustom_search_with_filters(self._date_range_filter(user_id, start, end))
+
+    async def asearch_with_recency_score(self, user_id: str, query: str, boost_factor: float = 0.1):
+        results = await self.memory_store.asearch_memories_with_scores(query=query, user_id=user_id)
+        return self._apply_recency_boost(results, boost_factor)
@@ -0,0 +1,268 @@
+import asyncio
+import json
+import random
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Set
+from pydantic import BaseModel
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.orm import sessionmaker
+from config.settings import settings
+from db.models.user import MemoryJob
+
+JobHandler = Callable[[str, List[dict]], Awaitable[object]]
+UNFINISHED = ("pending", "running")
+
+
+class ClaimedJob(BaseModel):
+    """A user's run of consecutive same-kind jobs, handled as one unit"""
+    id: int
+    ids: List[int]
+    user_id: str
+    kind: str
+    payloads: List[dict]
+    attempts: int
+
+
+class MemoryJobQueue:
+    """Durable outbox of memory ingestion jobs drained by an in-process asyncio worker pool.
+
+    Rows are committed before anything runs, so a crash loses nothing. Only a user's oldest
+    unfinished job is ever claimable, which keeps each user's jobs in enqueue order. A claim is a
+    lease: `running` rows whose lease expired (crashed or drained process) are claimed again.
+
+    Each user is effectively a serialized actor with a debounce: their jobs become claimable once no
+    new one arrived for `coalesce_window` seconds (or `coalesce_max_jobs` are waiting), and the whole
+    run of consecutive same-kind jobs is handed to the handler at once.
+    """
+    def __init__(
+            self,
+            session_factory: sessionmaker,
+            handlers: Dict[str, JobHandler],
+            workers: int | None = None,
+            max_attempts: int | None = None,
+            backoff_seconds: float | None = None,
+            poll_seconds: float | None = None,
+            lease_seconds: float | None = None,
+            coalesce_window: float | None = None,
+            coalesce_max_jobs: int | None = None
+            ):
+        self.session_factory = session_factory
+        self.handlers = handlers
+        self.workers = workers or settings.MEMORY_JOB_WORKERS
+        self.max_attempts = max_attempts or settings.MEMORY_JOB_MAX_ATTEMPTS
+        self.backoff_seconds = backoff_seconds if backoff_seconds is not None else settings.MEMORY_JOB_BACKOFF_SECONDS
+        self.poll_seconds = poll_seconds or settings.MEMORY_JOB_POLL_SECONDS
+        self.lease_seconds = lease_seconds or settings.MEMORY_JOB_LEASE_SECONDS
+        self.coalesce_window = coalesce_window if coalesce_window is not None else settings.MEMORY_COALESCE_WINDOW_SECONDS
+        self.coalesce_max_jobs = coalesce_max_jobs or settings.MEMORY_COALESCE_MAX_TURNS
+        self._queue: asyncio.Queue | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._dispatcher: asyncio.Task | None = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self._active_users: Set[str] = set()
+        self._inflight: Dict[int, ClaimedJob] = {}
+        self._stopping = False
+        self.counters = {"enqueued": 0, "completed": 0, "retried": 0, "failed": 0, "batches": 0, "coalesced": 0, "worker_errors": 0}
+
+    def _insert(self, user_id: str, kind: str, payload: dict) -> int:
+        with self.session_factory() as db:
+            job = MemoryJob(user_id=user_id, kind=kind, payload_json=json.dumps(payload))
+            db.add(job)
+            db.commit()
+            return job.id
+
+    def _claim(self, busy_users: Set[str], limit: int) -> List[ClaimedJob]:
+        now = datetime.now()
+        per_user = (
+                select(
+                    func.min(MemoryJob.id).label("first_id"),
+                    func.max(MemoryJob.created_at).label("last_at"),
+                    func.count().label("waiting")
+                    )
+                .where(MemoryJob.status.in_(UNFINISHED))
+                .group_by(MemoryJob.user_id)
+                .subquery()
+                )
+        query = (
+                select(MemoryJob)
+                .join(per_user, MemoryJob.id == per_user.c.first_id)
+                .where(
+                    MemoryJob.available_at <= now,
+                    or_(per_user.c.last_at <= now - timedelta(seconds=self.coalesce_window), per_user.c.waiting >= self.coalesce_max_jobs)
+                    )
+                )
+        if busy_users:
+            query = query.where(MemoryJob.user_id.not_in(busy_users))
+        lease_until = now + timedelta(seconds=self.lease_seconds)
+        claimed = []
+        with self.session_factory() as db:
+            for first in db.execute(query.order_by(MemoryJob.id).limit(limit)).scalars().all():
+                followers = db.execute(
+                        select(MemoryJob)
+                        .where(
+                            MemoryJob.user_id == first.user_id,
+                            MemoryJob.id > first.id,
+                            MemoryJob.status.in_(UNFINISHED)
+                            )
+                        .order_by(MemoryJob.id)
+                        .limit(self.coalesce_max_jobs - 1)
+                        ).scalars().all()
+                run = []
+                attempts = 0
+                for job in [first, *followers]:
+                    # a run stops at the first job that cannot join it, so order is never skipped over
+                    if job.kind != first.kind or job.available_at > now:
+                        break
+                    # an expired lease means the last run never reported back (it may have killed its
+                    # process), so reclaiming counts as an attempt; otherwise such a job would loop forever
+                    job_attempts = job.attempts + 1 if job.status == "running" else job.attempts
+                    exhausted = job_attempts >= self.max_attempts
+                    values = {"attempts": job_attempts}
+                    if exhausted:
+                        values.update(status="failed", last_error="Lease expired before the job finished")
+                    else:
+                        values.update(status="running", available_at=lease_until)
+                    # conditional update: another process that claimed the row first wins
+                    result = db.execute(
+                            update(MemoryJob)
+                            .where(MemoryJob.id == job.id, MemoryJob.status == job.status, MemoryJob.available_at == job.available_at)
+                            .values(**values)
+                            )
+                    if result.rowcount != 1:
+                        break
+                    if exhausted:
+                        self.counters["failed"] += 1
+                        break
+                    run.append(job)
+                    attempts = max(attempts, job_attempts)
+                if run:
+                    claimed.append(ClaimedJob(
+                        id=run[0].id,
+                        ids=[job.id for job in run],
+                        user_id=first.user_id,
+                        kind=first.kind,
+                        payloads=[json.loads(job.payload_json) for job in run],
+                        attempts=attempts
+                        ))
+            db.commit()
+        return claimed
+
+    def _finish(self, job: ClaimedJob):
+        with self.session_factory() as db:
+            db.execute(update(MemoryJob).where(MemoryJob.id.in_(job.ids)).values(status="done", last_error=None))
+            db.commit()
+
+    def _fail(self, job: ClaimedJob, error: str) -> bool:
+        attempts = job.attempts + 1
+        retry = attempts < self.max_attempts
+        values = {"attempts": attempts, "last_error": error[:2000], "status": "pending" if retry else "failed"}
+        if retry:
+            delay = self.backoff_seconds * (2 ** (attempts - 1)) * random.uniform(0.5, 1.5)
+            values["available_at"] = datetime.now() + timedelta(seconds=delay)
+        with self.session_factory() as db:
+            db.execute(update(MemoryJob).where(MemoryJob.id.in_(job.ids)).values(**values))
+            db.commit()
+        return retry
+
+    def _release(self, job_ids: List[int]):
+        """Hand interrupted jobs straight back instead of waiting out their lease"""
+        with self.session_factory() as db:
+            db.execute(
+                    update(MemoryJob)
+                    .where(MemoryJob.id.in_(job_ids), MemoryJob.status == "running")
+                    .values(status="pending", available_at=datetime.now())
+                    )
+            db.commit()
+
+    async def enqueue(self, user_id: str, kind: str, payload: dict) -> int:
+        if kind not in self.handlers:
+            raise ValueError(f"No handler registered for memory job kind {kind}")
+        job_id = await asyncio.to_thread(self._insert, user_id, kind, payload)
+        self.counters["enqueued"] += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    async def start(self):
+        if self._dispatcher is not None:
+            return
+        self._stopping = False
+        self._queue = asyncio.Queue()
+        self._wakeup = asyncio.Event()
+        self._dispatcher = asyncio.create_task(self._dispatch())
+        self._worker_tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def _dispatch(self):
+        assert self._queue is not None and self._wakeup is not None
+        while not self._stopping:
+            self._wakeup.clear()
+            free = self.workers - len(self._active_users)
+            if free > 0:
+                try:
+                    jobs = await asyncio.to_thread(self._claim, set(self._active_users), free)
+                except Exception as e:
+                    print(f"Error while claiming memory jobs: {str(e)}")
+                    jobs = []
+                for job in jobs:
+                    self._active_users.add(job.user_id)
+                    self._queue.put_nowait(job)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _work(self):
+        assert self._queue is not None and self._wakeup is not None
+        while True:
+            job = await self._queue.get()
+            self._inflight[job.id] = job
+            try:
+                await self._run(job)
+            except Exception as e:
+                # recording the outcome failed (e.g. the database blipped); the lease hands the job back later
+                self.counters["worker_errors"] += 1
+                print(f"Error while recording memory job {job.id} ({job.kind}): {str(e)}")
+            finally:
+                self._inflight.pop(job.id, None)
+                self._active_users.discard(job.user_id)
+                self._queue.task_done()
+                self._wakeup.set()
+
+    async def _run(self, job: ClaimedJob):
+        try:
+            await self.handlers[job.kind](job.user_id, job.payloads)
+        except Exception as e:
+            print(f"Memory job {job.id} ({job.kind}) failed: {str(e)}")
+            retry = await asyncio.to_thread(self._fail, job, str(e))
+            self.counters["retried" if retry else "failed"] += 1
+            return
+        await asyncio.to_thread(self._finish, job)
+        self.counters["completed"] += len(job.ids)
+        self.counters["batches"] += 1
+        self.counters["coalesced"] += len(job.ids) - 1
+
+    async def stop(self, timeout: float | None = None):
+        """Stop claiming, let in-flight jobs finish for up to `timeout`, then release the rest"""
+        if self._dispatcher is None or self._queue is None or self._wakeup is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._dispatcher
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"Memory job drain timed out with {len(self._inflight)} jobs in flight")
+        interrupted = [job_id for job in self._inflight.values() for job_id in job.ids]
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        # anything still queued was claimed but never started
+        while not self._queue.empty():
+            interrupted.extend(self._queue.get_nowait().ids)
+        if interrupted:
+            await asyncio.to_thread(self._release, interrupted)
+        self._dispatcher = None
+        self._worker_tasks = []
+
+    def stats(self) -> dict:
+        return {**self.counters, "in_flight": len(self._inflight), "workers": self.workers}
@@ -4,9 +4,9 @@ from utils.extractor import MemoryExtractor
 from typing import List, Dict
 
 class MemoryManager:
-    def __init__(self):
-        self.extractor = MemoryExtractor()
-        self.updater = MemoryUpdater()
+    def __init__(self, extractor: MemoryExtractor | None = None, updater: MemoryUpdater | None = None):
+        self.extractor = extractor or MemoryExtractor()
+        self.updater = updater or MemoryUpdater()
 
     async def add_conversation(self, messages: List[Dict[str, str]], user_id: str):
         new_memories = await self.extractor.extract_from_conversation(messages, user_id)
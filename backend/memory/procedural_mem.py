@@ -1,15 +1,14 @@
 from llm.orchestrator import LLMOrchestrator
-from llm.prompts import PATTERN_DETECTION_PROMPT, PREFERENCE_ANALYSIS_PROMPT, CONVERSATION_STYLE_ANALYSIS_PROMPT, RAW_CONVERSATION_STYLE_PROMPT
+from llm.prompts import PATTERN_DETECTION_PROMPT, PREFERENCE_ANALYSIS_PROMPT, CONVERSATION_STYLE_ANALYSIS_PROMPT
 from storage.memory_store import MemoryStore
-from exports.parser import normalize_llm_response
+from exports.parser import extract_json, normalize_llm_response
 from typing import List, Dict, Any
-from exports.types import MemoryType
-import json, re
+from exports.types import ConversationStylePatterns, MemoryType
 
 class ProceduralMemory:
-    def __init__(self):
-        self.memory_store = MemoryStore()
-        self.llm_orchestrator = LLMOrchestrator()
+    def __init__(self, memory_store: MemoryStore | None = None, llm_orchestrator: LLMOrchestrator | None = None):
+        self.memory_store = memory_store or MemoryStore()
+        self.llm_orchestrator = llm_orchestrator or LLMOrchestrator()
 
     def _format_memories_for_analysis(self, memories: List):
         formatted = []
@@ -124,17 +123,6 @@ class ProceduralMemory:
                 formatted.append(f"{role}: {msg.content}")
         return "\n".join(formatted)
 
-    def _extract_json_from_response(self, response: str) -> dict:
-        if not response or not response.strip():
-            return {}
-        markdown_match = re.search(r"```(?:json)?\s*(\{.*?\})\s*```", response, re.DOTALL)
-        if markdown_match:
-            return json.loads(markdown_match.group(1))
-        raw_match = re.search(r"(\{.*\})", response, re.DOTALL)
-        if raw_match:
-            return json.loads(raw_match.group(1))
-        return {}
-
     async def analyze_from_raw_conversations(self, conversations: List, current_conversation_id: int) -> Dict:
         if not conversations:
             return {
@@ -152,13 +140,11 @@ class ProceduralMemory:
             }
 
         formatted_conversations = self._format_raw_conversations(conversations)
-        full_prompt = f"{RAW_CONVERSATION_STYLE_PROMPT}\n{formatted_conversations}"
-
-        llm_response = await self.llm_orchestrator.ai_invoke(full_prompt)
+        llm_response = await self.llm_orchestrator.ai_invoke(formatted_conversations, task="pattern_analysis", cache=True, system="raw_conversation_style", schema=ConversationStylePatterns)
         normalized_response = normalize_llm_response(llm_response)
 
         try:
-            patterns = self._extract_json_from_response(normalized_response)
+            patterns = extract_json(normalized_response)
             return {
                 "analyzed_up_to_conversation_id": current_conversation_id,
                 "patterns": patterns
@@ -1,115 +1,240 @@
 from datetime import datetime
 import uuid
-from exports.types import Memory, MemorySearchResult, MemoryType
+from config.settings import settings
+from exports.types import Memory, MemorySearchResult, MemoryType, VectorOperationOutcome
+from utils.content_hash import content_hash, deterministic_point_id
 from utils.embeddings import EmbeddingGenerator
-from storage.vector_store import VectorStore
-from qdrant_client.models import FieldCondition, Filter, MatchValue, Condition, ScoredPoint
-from typing import List, Optional, cast
+from storage.vector_store import create_async_vector_store, create_vector_store
+from qdrant_client.models import FieldCondition, Filter, MatchAny, MatchValue, Condition, ScoredPoint
+from typing import AsyncIterator, Iterator, List, Optional, cast
 
 class MemoryStore:
-    def __init__(self, collection_name: str = "memories"):
-        self.vector_store = VectorStore()
-        self.embed = EmbeddingGenerator()
+    def __init__(self, collection_name: str = "memories", embed: EmbeddingGenerator | None = None):
+        self.collection_name = collection_name
+        self._vector_store = None
+        self.async_vector_store = create_async_vector_store(collection_name)
+        self.embed = embed or EmbeddingGenerator()
 
-    def store_memory(self, memory: Memory):
-        try:
-            embed_content = self.embed.generate_embeddings(memory.content)
-            point_id = str(uuid.uuid4())
-            payload = {
+    @property
+    def vector_store(self):
+        # created on first sync use, so async callers never pay its blocking bootstrap
+        if self._vector_store is None:
+            self._vector_store = create_vector_store(self.collection_name)
+        return self._vector_store
+
+    def _build_payload(self, memory: Memory) -> dict:
+        return {
                 "user_id": memory.user_id,
                 "memory_type": memory.memory_type.value,
                 "content": memory.content,
-                "timestamp": memory.timestamp.isoformat()
+                "timestamp": memory.timestamp.isoformat(),
+                "timestamp_epoch": int(memory.timestamp.timestamp()),
+                "content_hash": content_hash(memory.content)
                 }
-            self.vector_store.add_vector(
-                    point_id=point_id,
-                    vector=embed_content,
-                    payload=payload
+
+    def new_point_id(self, user_id: str, content: str) -> str:
+        """With MEMORY_DETERMINISTIC_IDS the id is derived from (user_id, content hash), making upserts idempotent"""
+        if settings.MEMORY_DETERMINISTIC_IDS:
+            return deterministic_point_id(user_id, content_hash(content))
+        return str(uuid.uuid4())
+
+    def _hashes_by_user(self, memories: List[Memory]) -> dict[str, list[str]]:
+        hashes: dict[str, set[str]] = {}
+        for memory in memories:
+            hashes.setdefault(memory.user_id, set()).add(content_hash(memory.content))
+        return {user_id: sorted(user_hashes) for user_id, user_hashes in hashes.items()}
+
+    def _hash_filter(self, user_id: str, hashes: List[str]) -> Filter:
+        return Filter(must=[
+            FieldCondition(key="user_id", match=MatchValue(value=user_id)),
+            FieldCondition(key="content_hash", match=MatchAny(any=hashes))
+            ])
+
+    def _existing_ids(self, memories: List[Memory]) -> dict[tuple[str, str], str]:
+        found: dict[tuple[str, str], str] = {}
+        for user_id, hashes in self._hashes_by_user(memories).items():
+            cursor = None
+            while True:
+                points, cursor = self.vector_store.scroll_page(self._hash_filter(user_id, hashes), limit=len(hashes), offset=cursor)
+                for point in points:
+                    found.setdefault((user_id, (point.payload or {})["content_hash"]), str(point.id))
+                if cursor is None:
+                    break
+        return found
+
+    async def _aexisting_ids(self, memories: List[Memory]) -> dict[tuple[str, str], str]:
+        found: dict[tuple[str, str], str] = {}
+        for user_id, hashes in self._hashes_by_user(memories).items():
+            cursor = None
+            while True:
+                points, cursor = await self.async_vector_store.scroll_page(self._hash_filter(user_id, hashes), limit=len(hashes), offset=cursor)
+                for point in points:
+                    found.setdefault((user_id, (point.payload or {})["content_hash"]), str(point.id))
+                if cursor is None:
+                    break
+        return found
+
+    def _assign_ids(self, memories: List[Memory], found: dict[tuple[str, str], str]):
+        """Point id per memory plus the indexes that actually need embedding; exact repeats reuse the stored id"""
+        point_ids: List[str] = []
+        fresh: List[int] = []
+        for index, memory in enumerate(memories):
+            key = (memory.user_id, content_hash(memory.content))
+            if key not in found:
+                found[key] = self.new_point_id(memory.user_id, memory.content)
+                fresh.append(index)
+            point_ids.append(found[key])
+        return point_ids, fresh
+
+    def _drop_duplicates(self, upserts: List[Memory], delete_ids: List[str], found: dict[tuple[str, str], str]):
+        """Upserts that still need writing, the deletes to run and skipped outcomes for exact repeats.
+
+        A rewrite of a point to the content it already holds only changes the timestamp, so it is not
+        written. A write whose content is already stored under another id (or earlier in the batch)
+        collapses onto that copy: its own id is deleted, so an UPDATE never leaves the old, contradicted
+        content behind. Points deleted in the same batch do not count as stored.
+        """
+        deleted = set(delete_ids)
+        delete_ids = list(delete_ids)
+        kept: List[Memory] = []
+        skipped: List[VectorOperationOutcome] = []
+        for memory in upserts:
+            key = (memory.user_id, content_hash(memory.content))
+            existing = found.get(key)
+            if existing is not None and existing not in deleted:
+                skipped.append(VectorOperationOutcome(point_id=existing, action="upsert", status="skipped"))
+                if existing != memory.id and memory.id not in deleted:
+                    deleted.add(memory.id)
+                    delete_ids.append(memory.id)
+                continue
+            found[key] = memory.id
+            kept.append(memory)
+        return kept, delete_ids, skipped
+
+    def _user_filter(self, user_id: str, memory_type: Optional[MemoryType] = None) -> Filter:
+        must_conditions: list[Condition] = [
+                FieldCondition(
+                    key="user_id",
+                    match=MatchValue(value=user_id)
+                    )
+                ]
+        if memory_type:
+            must_conditions.append(
+                    FieldCondition(
+                        key="memory_type",
+                        match=MatchValue(value=memory_type.value)
+                        )
                     )
-            return point_id
+        return Filter(must=must_conditions)
+
+    def _to_memory(self, point) -> Memory:
+        payload = point.payload or {}
+        return Memory(
+                id=str(point.id),
+                content=payload["content"],
+                memory_type=MemoryType(payload["memory_type"]),
+                metadata=payload.get("metadata", {}),
+                user_id=payload["user_id"],
+                timestamp=datetime.fromisoformat(payload["timestamp"])
+                )
+
+    def _to_search_result(self, point: ScoredPoint) -> MemorySearchResult:
+        payload = point.payload or {}
+        return MemorySearchResult(
+                id=str(point.id),
+                content=payload["content"],
+                memory_type=MemoryType(payload["memory_type"]),
+                metadata=payload.get("metadata", {}),
+                score=point.score,
+                user_id=payload["user_id"],
+                timestamp=datetime.fromisoformat(payload["timestamp"])
+                )
+
+    def store_memory(self, memory: Memory):
+        try:
+            point_ids, fresh = self._assign_ids([memory], self._existing_ids([memory]))
+            if fresh:
+                embed_content = self.embed.generate_embeddings(memory.content)
+                payload = self._build_payload(memory)
+                self.vector_store.add_vector(
+                        point_id=point_ids[0],
+                        vector=embed_content,
+                        payload=payload
+                        )
+            return point_ids[0]
         except Exception as e:
             print(f"Error while storing memory: {str(e)}")
 
-    def search_memories(self, query: str, user_id: str, memory_type: Optional[MemoryType] = None, limit: int = 5):
+    def store_memories(self, memories: List[Memory]) -> List[str]:
+        if not memories:
+            return []
         try:
-            embed_query = self.embed.generate_embeddings(query)
-            must_conditions: list[Condition] = [
-                    FieldCondition(
-                        key="user_id",
-                        match=MatchValue(value=user_id)
-                        )
-                    ]
-            if memory_type:
-                must_conditions.append(
-                        FieldCondition(
-                            key="memory_type",
-                            match=MatchValue(value=memory_type.value)
+            point_ids, fresh = self._assign_ids(memories, self._existing_ids(memories))
+            if fresh:
+                vectors = self.embed.generate_embeddings_batch([memories[i].content for i in fresh])
+                self.vector_store.add_vectors(
+                        point_ids=[point_ids[i] for i in fresh],
+                        vectors=vectors,
+                        payloads=[self._build_payload(memories[i]) for i in fresh]
                         )
+            return point_ids
+        except Exception as e:
+            print(f"Error while storing memories: {str(e)}")
+            return []
+
+    def apply_memory_updates(self, upserts: List[Memory], delete_ids: List[str], wait: bool = True) -> List[VectorOperationOutcome]:
+        """Write a whole update plan in one request; upserts keep their ids so rewrites replace in place"""
+        try:
+            upserts, delete_ids, skipped = self._drop_duplicates(upserts, delete_ids, self._existing_ids(upserts) if upserts else {})
+            vectors = self.embed.generate_embeddings_batch([memory.content for memory in upserts]) if upserts else []
+            return skipped + self.vector_store.apply_batch(
+                    point_ids=[memory.id for memory in upserts],
+                    vectors=vectors,
+                    payloads=[self._build_payload(memory) for memory in upserts],
+                    delete_ids=delete_ids,
+                    wait=wait
                     )
-            filter_ = Filter(must=must_conditions)
+        except Exception as e:
+            print(f"Error while applying memory updates: {str(e)}")
+            return []
+
+    def confirm_memory_updates(self, outcomes: List[VectorOperationOutcome]) -> List[VectorOperationOutcome]:
+        return self.vector_store.confirm_batch(outcomes)
+
+    def search_memories(self, query: str, user_id: str, memory_type: Optional[MemoryType] = None, limit: int = 5):
+        try:
+            embed_query = self.embed.generate_embeddings(query)
             results = self.vector_store.search(
                     vector=embed_query,
-                    filter_=filter_,
+                    filter_=self._user_filter(user_id, memory_type),
                     limit=limit
                     )
-
-            memories: List[Memory] = []
-
-            for point in results:
-                point = cast(ScoredPoint, point)
-                payload = point.payload or {}
-                memories.append(
-                        Memory(
-                            id=str(point.id),
-                            content=payload["content"],
-                            memory_type=MemoryType(payload["memory_type"]),
-                            metadata=payload.get("metadata", {}),
-                            user_id=payload["user_id"],
-                            timestamp=datetime.fromisoformat(payload["timestamp"])
-                            )
-                        )
+            memories: List[Memory] = [self._to_memory(point) for point in results]
             return memories
         except Exception as e:
             print(f"Error while searching & storing in memory: {str(e)}")
             return []
 
-    def user_memories(self, user_id: str, memory_type: Optional[MemoryType] = None):
-        try:
-            must_conditions: list[Condition] = [
-                    FieldCondition(
-                        key="user_id",
-                        match=MatchValue(value=user_id)
-                        )
-                    ]
-            if memory_type:
-                must_conditions.append(
-                        FieldCondition(
-                            key="memory_type",
-                            match=MatchValue(value=memory_type.value)
-                            )
-                        )
+    def user_memories_page(self, user_id: str, memory_type: Optional[MemoryType] = None, cursor: Optional[str | int] = None, limit: Optional[int] = None):
+        points, next_cursor = self.vector_store.scroll_page(
+                filter_=self._user_filter(user_id, memory_type),
+                limit=limit or settings.MEMORY_SCROLL_PAGE_SIZE,
+                offset=cursor
+                )
+        memories: List[Memory] = [self._to_memory(point) for point in points]
+        return memories, next_cursor
 
-            filter_ = Filter(must=must_conditions)
-            results = self.vector_store.vector_scroll(
-                    filter_ = filter_,
-                    limit=50
-                    )
+    def iter_user_memories(self, user_id: str, memory_type: Optional[MemoryType] = None, page_size: Optional[int] = None) -> Iterator[Memory]:
+        cursor = None
+        while True:
+            memories, cursor = self.user_memories_page(user_id, memory_type, cursor, page_size)
+            yield from memories
+            if cursor is None:
+                return
 
-            memories: List[Memory] = []
-            for point in results:
-                point = cast(ScoredPoint, point)
-                payload = point.payload or {}
-                memories.append(
-                        Memory(
-                            id=str(point.id),
-                            content=payload["content"],
-                            user_id=payload["user_id"],
-                            memory_type=MemoryType(payload["memory_type"]),
-                            timestamp=datetime.fromisoformat(payload["timestamp"]),
-                            metadata=payload.get("metadata", {})
-                            )
-                        )
-            return memories
+    def user_memories(self, user_id: str, memory_type: Optional[MemoryType] = None):
+        try:
+            return list(self.iter_user_memories(user_id, memory_type))
         except Exception as e:
             print(f"Error while fetching user memories: {str(e)}")
             return []
@@ -131,66 +256,192 @@ class MemoryStore:
     def search_memories_with_scores(self, query: str, user_id: str, memory_type: Optional[MemoryType] = None, limit: int = 5):
         try:
             embed_query = self.embed.generate_embeddings(query)
-            must_conditions: list[Condition] = [
-                    FieldCondition(
-                        key="user_id",
-                        match=MatchValue(value=user_id)
-                        )
+        except Exception as e:
+            print(f"Error while searching & storing in memory: {str(e)}")
+            return []
+        return self.search_by_vector_with_scores(embed_query, user_id, memory_type, limit)
+
+    def search_by_vector_with_scores(self, vector: List[float], user_id: str, memory_type: Optional[MemoryType] = None, limit: int = 5):
+        try:
+            results = self.vector_store.search(
+                    vector=vector,
+                    filter_=self._user_filter(user_id, memory_type),
+                    limit=limit
+                    )
+            memories: List[MemorySearchResult] = [
+                    self._to_search_result(cast(ScoredPoint, point)) for point in results
                     ]
-            if memory_type:
-                must_conditions.append(
-                        FieldCondition(
-                            key="memory_type",
-                            match=MatchValue(value=memory_type.value)
+            return memories
+        except Exception as e:
+            print(f"Error while searching & storing in memory: {str(e)}")
+            return []
+
+    def search_by_vectors_with_scores(self, vectors: List[List[float]], user_id: str, memory_type: Optional[MemoryType] = None, limit: int = 5, score_threshold: Optional[float] = None):
+        """One result list per query vector, from a single batched search"""
+        try:
+            results = self.vector_store.search_batch(
+                    vectors=vectors,
+                    filter_=self._user_filter(user_id, memory_type),
+                    limit=limit,
+                    score_threshold=score_threshold
+                    )
+            return [[self._to_search_result(point) for point in points] for points in results]
+        except Exception as e:
+            print(f"Error while batch searching memory: {str(e)}")
+            return [[] for _ in vectors]
+
+    def custom_search_with_filters(self, filter_: Filter, limit: int = 10):
+        try:
+            results = self.vector_store.vector_scroll(filter_=filter_, limit=limit)
+            memories: list[Memory] = [self._to_memory(point) for point in results]
+            return memories
+        except Exception as e:
+            print(f"Error while custom searching: {str(e)}")
+            return []
+
+    async def astore_memory(self, memory: Memory):
+        try:
+            point_ids, fresh = self._assign_ids([memory], await self._aexisting_ids([memory]))
+            if fresh:
+                embed_content = await self.embed.agenerate_embeddings(memory.content)
+                await self.async_vector_store.add_vector(
+                        point_id=point_ids[0],
+                        vector=embed_content,
+                        payload=self._build_payload(memory)
+                        )
+            return point_ids[0]
+        except Exception as e:
+            print(f"Error while storing memory: {str(e)}")
+
+    async def astore_memories(self, memories: List[Memory]) -> List[str]:
+        if not memories:
+            return []
+        try:
+            point_ids, fresh = self._assign_ids(memories, await self._aexisting_ids(memories))
+            if fresh:
+                vectors = await self.embed.agenerate_embeddings_batch([memories[i].content for i in fresh])
+                await self.async_vector_store.add_vectors(
+                        point_ids=[point_ids[i] for i in fresh],
+                        vectors=vectors,
+                        payloads=[self._build_payload(memories[i]) for i in fresh]
                         )
+            return point_ids
+        except Exception as e:
+            print(f"Error while storing memories: {str(e)}")
+            return []
+
+    async def aapply_memory_updates(self, upserts: List[Memory], delete_ids: List[str], wait: bool = True) -> List[VectorOperationOutcome]:
+        try:
+            upserts, delete_ids, skipped = self._drop_duplicates(upserts, delete_ids, await self._aexisting_ids(upserts) if upserts else {})
+            vectors = await self.embed.agenerate_embeddings_batch([memory.content for memory in upserts]) if upserts else []
+            return skipped + await self.async_vector_store.apply_batch(
+                    point_ids=[memory.id for memory in upserts],
+                    vectors=vectors,
+                    payloads=[self._build_payload(memory) for memory in upserts],
+                    delete_ids=delete_ids,
+                    wait=wait
                     )
-            filter_ = Filter(must=must_conditions)
-            results = self.vector_store.search(
+        except Exception as e:
+            print(f"Error while applying memory updates: {str(e)}")
+            return []
+
+    async def aconfirm_memory_updates(self, outcomes: List[VectorOperationOutcome]) -> List[VectorOperationOutcome]:
+        return await self.async_vector_store.confirm_batch(outcomes)
+
+    async def asearch_memories(self, query: str, user_id: str, memory_type: Optional[MemoryType] = None, limit: int = 5):
+        try:
+            embed_query = await self.embed.agenerate_embeddings(query)
+            results = await self.async_vector_store.search(
                     vector=embed_query,
-                    filter_=filter_,
+                    filter_=self._user_filter(user_id, memory_type),
                     limit=limit
                     )
+            memories: List[Memory] = [self._to_memory(point) for point in results]
+            return memories
+        except Exception as e:
+            print(f"Error while searching & storing in memory: {str(e)}")
+            return []
 
-            memories: List[MemorySearchResult] = []
-
-            for point in results:
-                point = cast(ScoredPoint, point)
-                payload = point.payload or {}
-                memories.append(
-                        MemorySearchResult(
-                            id=str(point.id),
-                            content=payload["content"],
-                            memory_type=MemoryType(payload["memory_type"]),
-                            metadata=payload.get("metadata", {}),
-                            score=point.score,
-                            user_id=payload["user_id"],
-                            timestamp=datetime.fromisoformat(payload["timestamp"])
-                            )
-                        )
+    async def auser_memories_page(self, user_id: str, memory_type: Optional[MemoryType] = None, cursor: Optional[str | int] = None, limit: Optional[int] = None):
+        points, next_cursor = await self.async_vector_store.scroll_page(
+                filter_=self._user_filter(user_id, memory_type),
+                limit=limit or settings.MEMORY_SCROLL_PAGE_SIZE,
+                offset=cursor
+                )
+        memories: List[Memory] = [self._to_memory(point) for point in points]
+        return memories, next_cursor
+
+    async def aiter_user_memories(self, user_id: str, memory_type: Optional[MemoryType] = None, page_size: Optional[int] = None) -> AsyncIterator[Memory]:
+        cursor = None
+        while True:
+            memories, cursor = await self.auser_memories_page(user_id, memory_type, cursor, page_size)
+            for memory in memories:
+                yield memory
+            if cursor is None:
+                return
+
+    async def auser_memories(self, user_id: str, memory_type: Optional[MemoryType] = None):
+        try:
+            return [memory async for memory in self.aiter_user_memories(user_id, memory_type)]
+        except Exception as e:
+            print(f"Error while fetching user memories: {str(e)}")
+            return []
+
+    async def adelete_user_memory(self, memory_id: str, user_id: str):
+        try:
+            result = await self.async_vector_store.get_by_id(memory_id)
+            if not result:
+                return False
+            payload = result.payload or {}
+            if payload.get("user_id") != user_id:
+                return False
+            await self.async_vector_store.delete(memory_id)
+            return True
+        except Exception as e:
+            print(f"Error deleting Memory: {str(e)}")
+            return False
+
+    async def asearch_memories_with_scores(self, query: str, user_id: str, memory_type: Optional[MemoryType] = None, limit: int = 5):
+        try:
+            embed_query = await self.embed.agenerate_embeddings(query)
+        except Exception as e:
+            print(f"Error while searching & storing in memory: {str(e)}")
+            return []
+        return await self.asearch_by_vector_with_scores(embed_query, user_id, memory_type, limit)
+
+    async def asearch_by_vector_with_scores(self, vector: List[float], user_id: str, memory_type: Optional[MemoryType] = None, limit: int = 5):
+        try:
+            results = await self.async_vector_store.search(
+                    vector=vector,
+                    filter_=self._user_filter(user_id, memory_type),
+                    limit=limit
+                    )
+            memories: List[MemorySearchResult] = [
+                    self._to_search_result(cast(ScoredPoint, point)) for point in results
+                    ]
             return memories
         except Exception as e:
             print(f"Error while searching & storing in memory: {str(e)}")
             return []
 
-    def custom_search_with_filters(self, filter_: Filter, limit: int = 10):
+    async def asearch_by_vectors_with_scores(self, vectors: List[List[float]], user_id: str, memory_type: Optional[MemoryType] = None, limit: int = 5, score_threshold: Optional[float] = None):
         try:
-            results = self.vector_store.vector_scroll(filter_=filter_, limit=limit) 
-            memories: list[Memory] = []
-            for point in results:
-                point = cast(ScoredPoint, point)
-                payload = point.payload or {}
-                memories.append(
-                        Memory(
-                            id=str(point.id),
-                            content=payload["content"],
-                            memory_type=MemoryType(payload["memory_type"]),
-                            metadata=payload.get("metadata", {}),
-                            user_id=payload["user_id"],
-                            timestamp=datetime.fromisoformat(payload["timestamp"]),
-                            )
-                        )
+            results = await self.async_vector_store.search_batch(
+                    vectors=vectors,
+                    filter_=self._user_filter(user_id, memory_type),
+                    limit=limit,
+                    score_threshold=score_threshold
+                    )
+            return [[self._to_search_result(point) for point in points] for points in results]
+        except Exception as e:
+            print(f"Error while batch searching memory: {str(e)}")
+            return [[] for _ in vectors]
+
+    async def acustom_search_with_filters(self, filter_: Filter, limit: int = 10):
+        try:
+            results = await self.async_vector_store.vector_scroll(filter_=filter_, limit=limit)
+            memories: list[Memory] = [self._to_memory(point) for point in results]
             return memories
         except Exception as e:
             print(f"Error while custom searching: {str(e)}")
             return []
-
@@ -0,0 +1,58 @@
+from datetime import datetime
+from qdrant_client.models import Filter, IsEmptyCondition, PayloadField, SetPayload, SetPayloadOperation
+from storage.vector_store import VectorStore
+from utils.content_hash import content_hash
+
+
+def _backfill(collection_name: str, field: str, source: str, derive, batch_size: int) -> int:
+    """Set `field` from `source` on every point that lacks it, one batch_update_points per page"""
+    vector_store = VectorStore(collection_name)
+    missing = Filter(must=[IsEmptyCondition(is_empty=PayloadField(key=field))])
+    updated = 0
+    offset = None
+    while True:
+        points, offset = vector_store.client.scroll(
+                collection_name=collection_name,
+                scroll_filter=missing,
+                limit=batch_size,
+                offset=offset,
+                with_payload=[source],
+                with_vectors=False
+                )
+        operations = []
+        for point in points:
+            value = (point.payload or {}).get(source)
+            if not value:
+                continue
+            operations.append(SetPayloadOperation(set_payload=SetPayload(
+                payload={field: derive(value)},
+                points=[point.id]
+                )))
+        if operations:
+            vector_store.client.batch_update_points(
+                    collection_name=collection_name,
+                    update_operations=operations,
+                    wait=True
+                    )
+            updated += len(operations)
+        if offset is None:
+            break
+    return updated
+
+
+def backfill_timestamp_epoch(collection_name: str = "memories", batch_size: int = 256) -> int:
+    """One-shot migration: add timestamp_epoch to points written before it existed"""
+    return _backfill(
+            collection_name, "timestamp_epoch", "timestamp",
+            lambda timestamp: int(datetime.fromisoformat(timestamp).timestamp()), batch_size
+            )
+
+
+def backfill_content_hash(collection_name: str = "memories", batch_size: int = 256) -> int:
+    """One-shot migration: hash the content of points stored before exact-duplicate detection"""
+    return _backfill(collection_name, "content_hash", "content", content_hash, batch_size)
+
+
+if __name__ == "__main__":
+    print(f"Backfilled timestamp_epoch on {backfill_timestamp_epoch()} points")
+    print(f"Backfilled content_hash on {backfill_content_hash()} points")
@@ -0,0 +1,505 @@
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+import numpy as np
+from qdrant_client.models import (
+        DatetimeRange, FieldCondition, Filter, HasIdCondition, IsEmptyCondition, MatchAny,
+        MatchExcept, MatchValue, Range, Record, ScoredPoint
+        )
+from config.settings import settings
+from exports.types import VectorOperationOutcome
+from storage.profiles import StorageProfile
+from utils.embedding_backends import get_embedding_backend
+
+KEYWORD_COLUMNS = ("user_id", "memory_type", "content_hash")
+INTEGER_COLUMNS = ("timestamp_epoch",)
+_MISSING_INT = np.iinfo(np.int64).min
+
+
+class _KeywordColumn:
+    """Dictionary-encoded string column: one int32 code per row, -1 when absent"""
+    def __init__(self, capacity: int):
+        self.codes = np.full(capacity, -1, dtype=np.int32)
+        self.dictionary: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def encode(self, value) -> int:
+        if value is None:
+            return -1
+        value = str(value)
+        code = self.dictionary.get(value)
+        if code is None:
+            code = len(self.values)
+            self.dictionary[value] = code
+            self.values.append(value)
+        return code
+
+    def decode(self, code: int):
+        return self.values[code] if code >= 0 else None
+
+    def grow(self, capacity: int):
+        codes = np.full(capacity, -1, dtype=np.int32)
+        codes[:len(self.codes)] = self.codes
+        self.codes = codes
+
+
+class NumpyVectorStore:
+    """In-process VectorStore: one contiguous float32 matrix, per-user row indexes and columnar payloads.
+
+    Deletes clear the alive flag and put the row on a free list for the next new point. Vectors are
+    stored L2-normalised so cosine similarity is a single matrix-vector product over the candidate rows.
+
+    With a path, writes are appended to a journal (raw float32 rows plus a JSONL op log) on top of a
+    snapshot of the live rows. Once the journal outgrows the snapshot it is folded into a new snapshot
+    generation, so persistence costs amortised O(1) per written point instead of a full rewrite.
+    """
+    INITIAL_CAPACITY = 1024
+
+    def __init__(self, collection_name: str = "memories", vector_size: int | None = None, path: str | None = None):
+        self.collection_name = collection_name
+        self.vector_size = vector_size or get_embedding_backend().dimensions
+        self.profile = StorageProfile.from_settings(self.vector_size)
+        self.path = os.path.join(path, collection_name) if path else None
+        self._lock = threading.RLock()
+        self._count = 0
+        self._ids: List[str] = []
+        self._row_of: Dict[str, int] = {}
+        self._payloads: List[Dict[str, Any]] = []
+        self._user_rows: Dict[int, List[int]] = {}
+        self._user_row_arrays: Dict[int, np.ndarray] = {}
+        self._free: List[int] = []
+        self._generation = 0
+        self._journal_ops = 0
+        self._allocate(self.INITIAL_CAPACITY)
+        if self.path and os.path.exists(self._file("meta.json")):
+            self._load()
+        elif self.path:
+            # no compaction yet: everything written so far lives in the generation 0 journal
+            self._replay_journal()
+
+    def _allocate(self, capacity: int):
+        self._vectors = np.zeros((capacity, self.profile.dimensions), dtype=np.float32)
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._keywords = {key: _KeywordColumn(capacity) for key in KEYWORD_COLUMNS}
+        self._integers = {key: np.full(capacity, _MISSING_INT, dtype=np.int64) for key in INTEGER_COLUMNS}
+
+    def _grow(self, needed: int):
+        capacity = len(self._alive)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        vectors = np.zeros((capacity, self.profile.dimensions), dtype=np.float32)
+        vectors[:self._count] = self._vectors[:self._count]
+        self._vectors = vectors
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self._count] = self._alive[:self._count]
+        self._alive = alive
+        for column in self._keywords.values():
+            column.grow(capacity)
+        for key, values in self._integers.items():
+            grown = np.full(capacity, _MISSING_INT, dtype=np.int64)
+            grown[:self._count] = values[:self._count]
+            self._integers[key] = grown
+
+    def _normalise(self, vector: List[float]) -> np.ndarray:
+        array = np.asarray(self.profile.prepare_vector(vector), dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else array
+
+    def _index_user(self, row: int, user_code: int):
+        self._user_rows.setdefault(user_code, []).append(row)
+        self._user_row_arrays.pop(user_code, None)
+
+    def _unindex_user(self, row: int, user_code: int):
+        rows = self._user_rows.get(user_code)
+        if rows and row in rows:
+            rows.remove(row)
+            self._user_row_arrays.pop(user_code, None)
+
+    def _row_for(self, point_id: str) -> int:
+        row = self._row_of.get(point_id)
+        if row is not None:
+            self._unindex_user(row, int(self._keywords["user_id"].codes[row]))
+            return row
+        if self._free:
+            row = self._free.pop()
+            self._ids[row] = point_id
+        else:
+            self._grow(self._count + 1)
+            row = self._count
+            self._count += 1
+            self._ids.append(point_id)
+            self._payloads.append({})
+        self._row_of[point_id] = row
+        return row
+
+    def _write_row(self, point_id: str, vector, payload: dict, normalised: bool = False) -> int:
+        point_id = str(point_id)
+        row = self._row_for(point_id)
+        self._vectors[row] = vector if normalised else self._normalise(vector)
+        self._alive[row] = True
+        for key, column in self._keywords.items():
+            column.codes[row] = column.encode(payload.get(key))
+        for key, values in self._integers.items():
+            value = payload.get(key)
+            values[row] = int(value) if value is not None else _MISSING_INT
+        self._payloads[row] = {
+                key: value for key, value in payload.items()
+                if key not in KEYWORD_COLUMNS and key not in INTEGER_COLUMNS
+                }
+        self._index_user(row, int(self._keywords["user_id"].codes[row]))
+        return row
+
+    def _payload(self, row: int) -> dict:
+        payload = dict(self._payloads[row])
+        for key, column in self._keywords.items():
+            value = column.decode(int(column.codes[row]))
+            if value is not None:
+                payload[key] = value
+        for key, values in self._integers.items():
+            if values[row] != _MISSING_INT:
+                payload[key] = int(values[row])
+        return payload
+
+    def _user_row_array(self, user_code: int) -> np.ndarray:
+        rows = self._user_row_arrays.get(user_code)
+        if rows is None:
+            rows = np.asarray(self._user_rows.get(user_code, []), dtype=np.intp)
+            self._user_row_arrays[user_code] = rows
+        return rows
+
+    def _candidate_rows(self, filter_: Filter | None) -> np.ndarray:
+        """Narrow to one user's rows when the filter pins user_id, then apply the full filter"""
+        rows = None
+        for condition in (filter_.must if filter_ and isinstance(filter_.must, list) else []):
+            if isinstance(condition, FieldCondition) and condition.key == "user_id" and isinstance(condition.match, MatchValue):
+                code = self._keywords["user_id"].dictionary.get(str(condition.match.value))
+                rows = self._user_row_array(code) if code is not None else np.empty(0, dtype=np.intp)
+                break
+        if rows is None:
+            rows = np.flatnonzero(self._alive[:self._count])
+        rows = rows[self._alive[rows]]
+        if filter_ is not None and len(rows):
+            rows = rows[self._filter_mask(rows, filter_)]
+        return rows
+
+    def _filter_mask(self, rows: np.ndarray, filter_: Filter) -> np.ndarray:
+        mask = np.ones(len(rows), dtype=bool)
+        must = filter_.must if isinstance(filter_.must, list) else ([filter_.must] if filter_.must else [])
+        should = filter_.should if isinstance(filter_.should, list) else ([filter_.should] if filter_.should else [])
+        must_not = filter_.must_not if isinstance(filter_.must_not, list) else ([filter_.must_not] if filter_.must_not else [])
+        for condition in must:
+            mask &= self._condition_mask(rows, condition)
+        if should:
+            any_mask = np.zeros(len(rows), dtype=bool)
+            for condition in should:
+                any_mask |= self._condition_mask(rows, condition)
+            mask &= any_mask
+        for condition in must_not:
+            mask &= ~self._condition_mask(rows, condition)
+        return mask
+
+    def _per_row(self, rows: np.ndarray, predicate: Callable[[dict], bool]) -> np.ndarray:
+        return np.fromiter((predicate(self._payload(int(row))) for row in rows), dtype=bool, count=len(rows))
+
+    def _condition_mask(self, rows: np.ndarray, condition) -> np.ndarray:
+        if isinstance(condition, Filter):
+            return self._filter_mask(rows, condition)
+        if isinstance(condition, HasIdCondition):
+            ids = {str(point_id) for point_id in condition.has_id}
+            return np.fromiter((self._ids[int(row)] in ids for row in rows), dtype=bool, count=len(rows))
+        if isinstance(condition, IsEmptyCondition):
+            key = condition.is_empty.key
+            return self._per_row(rows, lambda payload: payload.get(key) in (None, [], ""))
+        if not isinstance(condition, FieldCondition):
+            raise ValueError(f"Unsupported filter condition for the numpy store: {type(condition).__name__}")
+        key = condition.key
+        if condition.match is not None:
+            return self._match_mask(rows, key, condition.match)
+        if condition.range is not None:
+            return self._range_mask(rows, key, condition.range)
+        raise ValueError(f"Unsupported field condition for the numpy store on {key}")
+
+    def _match_mask(self, rows: np.ndarray, key: str, match) -> np.ndarray:
+        if isinstance(match, MatchValue):
+            accepted = [match.value]
+        elif isinstance(match, (MatchAny, MatchExcept)):
+            accepted = list(match.any if isinstance(match, MatchAny) else match.except_)
+        else:
+            raise ValueError(f"Unsupported match for the numpy store: {type(match).__name__}")
+        if key in self._keywords:
+            column = self._keywords[key]
+            codes = [column.dictionary[str(value)] for value in accepted if str(value) in column.dictionary]
+            mask = np.isin(column.codes[rows], codes)
+        elif key in self._integers:
+            mask = np.isin(self._integers[key][rows], [int(value) for value in accepted])
+        else:
+            mask = self._per_row(rows, lambda payload: payload.get(key) in accepted)
+        return ~mask if isinstance(match, MatchExcept) else mask
+
+    def _range_mask(self, rows: np.ndarray, key: str, range_) -> np.ndarray:
+        def bound(value):
+            if isinstance(range_, DatetimeRange) and value is not None:
+                return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+            return value
+
+        gt, gte, lt, lte = bound(range_.gt), bound(range_.gte), bound(range_.lt), bound(range_.lte)
+        if key in self._integers and isinstance(range_, Range):
+            values = self._integers[key][rows]
+            mask = values != _MISSING_INT
+            if gt is not None:
+                mask &= values > gt
+            if gte is not None:
+                mask &= values >= gte
+            if lt is not None:
+                mask &= values < lt
+            if lte is not None:
+                mask &= values <= lte
+            return mask
+
+        def in_range(payload: dict) -> bool:
+            value = payload.get(key)
+            if value is None:
+                return False
+            if isinstance(range_, DatetimeRange):
+                value = datetime.fromisoformat(value)
+            return ((gt is None or value > gt) and (gte is None or value >= gte)
+                    and (lt is None or value < lt) and (lte is None or value <= lte))
+
+        return self._per_row(rows, in_range)
+
+    def _record(self, row: int) -> Record:
+        return Record(id=self._ids[row], payload=self._payload(row), vector=None)
+
+    def add_vector(self, point_id: str, vector: list[float], payload: dict):
+        with self._lock:
+            row = self._write_row(point_id, vector, payload)
+            self._persist([row], [])
+
+    def add_vectors(self, point_ids: list[str], vectors: list[list[float]], payloads: list[dict]):
+        with self._lock:
+            rows = [self._write_row(point_id, vector, payload) for point_id, vector, payload in zip(point_ids, vectors, payloads)]
+            self._persist(rows, [])
+
+    def apply_batch(self, point_ids: list[str], vectors: list[list[float]], payloads: list[dict], delete_ids: list[str], wait: bool = True):
+        """Same contract as VectorStore.apply_batch; applied under one lock, so always completed"""
+        with self._lock:
+            for point_id in delete_ids:
+                self._delete_row(point_id)
+            rows = [self._write_row(point_id, vector, payload) for point_id, vector, payload in zip(point_ids, vectors, payloads)]
+            self._persist(rows, delete_ids)
+        return (
+                [VectorOperationOutcome(point_id=str(point_id), action="delete", status="completed") for point_id in delete_ids]
+                + [VectorOperationOutcome(point_id=str(point_id), action="upsert", status="completed") for point_id in point_ids]
+                )
+
+    def confirm_batch(self, outcomes: list[VectorOperationOutcome]) -> list[VectorOperationOutcome]:
+        return outcomes
+
+    def _top_k(self, rows: np.ndarray, scores: np.ndarray, limit: int, score_threshold: float | None) -> List[ScoredPoint]:
+        k = min(limit, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        if score_threshold is not None:
+            top = top[scores[top] >= score_threshold]
+        return [
+                ScoredPoint(id=self._ids[int(rows[i])], version=0, score=float(scores[i]), payload=self._payload(int(rows[i])))
+                for i in top
+                ]
+
+    def search(self, vector: list[float], filter_: Filter, limit: int = 5):
+        with self._lock:
+            rows = self._candidate_rows(filter_)
+            if not len(rows):
+                return []
+            return self._top_k(rows, self._vectors[rows] @ self._normalise(vector), limit, None)
+
+    def search_batch(self, vectors: list[list[float]], filter_: Filter, limit: int = 5, score_threshold: float | None = None):
+        """All queries share one filter, so candidates are resolved once and scored in a single matmul"""
+        with self._lock:
+            rows = self._candidate_rows(filter_)
+            if not len(rows):
+                return [[] for _ in vectors]
+            queries = np.stack([self._normalise(vector) for vector in vectors]) if vectors else np.empty((0, self.profile.dimensions), dtype=np.float32)
+            scores = self._vectors[rows] @ queries.T
+            return [self._top_k(rows, scores[:, i], limit, score_threshold) for i in range(len(vectors))]
+
+    def _delete_row(self, point_id: str):
+        row = self._row_of.pop(str(point_id), None)
+        if row is None:
+            return
+        self._alive[row] = False
+        self._unindex_user(row, int(self._keywords["user_id"].codes[row]))
+        self._payloads[row] = {}
+        self._free.append(row)
+
+    def delete(self, point_id: str):
+        with self._lock:
+            self._delete_row(point_id)
+            self._persist([], [point_id])
+
+    def _sorted_matches(self, filter_: Filter) -> List[int]:
+        rows = self._candidate_rows(filter_)
+        # Qdrant scrolls in point-id order; matching it keeps cursors interchangeable between backends
+        return sorted((int(row) for row in rows), key=lambda row: self._ids[row])
+
+    def vector_scroll(self, filter_: Filter, limit: int = 5):
+        points, _ = self.scroll_page(filter_, limit)
+        return points
+
+    def scroll_page(self, filter_: Filter, limit: int, offset: str | None = None):
+        with self._lock:
+            rows = self._sorted_matches(filter_)
+            if offset is not None:
+                rows = [row for row in rows if self._ids[row] >= str(offset)]
+            page = [self._record(row) for row in rows[:limit]]
+            next_offset = self._ids[rows[limit]] if len(rows) > limit else None
+            return page, next_offset
+
+    def get_by_id(self, point_id: str):
+        with self._lock:
+            row = self._row_of.get(str(point_id))
+            return self._record(row) if row is not None else None
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _snapshot_file(self, generation: int) -> str:
+        # generation 0 is the layout written before journaling existed
+        return self._file("vectors.npy" if generation == 0 else f"vectors-{generation}.npy")
+
+    def _journal_files(self, generation: int):
+        return self._file(f"journal-{generation}.bin"), self._file(f"journal-{generation}.jsonl")
+
+    def _persist(self, rows: List[int], delete_ids: List[str]):
+        """Append one batch to the journal; vectors go first so every logged upsert has its row on disk"""
+        if not self.path or not (rows or delete_ids):
+            return
+        os.makedirs(self.path, exist_ok=True)
+        vectors_path, log_path = self._journal_files(self._generation)
+        entries = [{"op": "delete", "id": str(point_id)} for point_id in delete_ids]
+        entries += [{"op": "upsert", "id": self._ids[row], "payload": self._payload(row)} for row in rows]
+        if rows:
+            with open(vectors_path, "ab") as f:
+                f.write(np.ascontiguousarray(self._vectors[rows]).tobytes())
+        with open(log_path, "a") as f:
+            f.write("".join(json.dumps(entry) + "\n" for entry in entries))
+        self._journal_ops += len(entries)
+        if self._journal_ops > max(settings.NUMPY_STORE_COMPACT_MIN_OPS, int(self._alive[:self._count].sum())):
+            self._compact()
+
+    def _compact(self):
+        """Fold the journal into a new snapshot generation; meta.json is replaced last, so a crash leaves the old one valid"""
+        previous = self._generation
+        generation = previous + 1
+        live = np.flatnonzero(self._alive[:self._count])
+        np.save(self._snapshot_file(generation), self._vectors[live])
+        meta = {
+                "profile": self.profile.model_dump(),
+                "generation": generation,
+                "ids": [self._ids[row] for row in live],
+                "payloads": [self._payload(int(row)) for row in live]
+                }
+        tmp_path = self._file("meta.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._file("meta.json"))
+        self._generation = generation
+        self._journal_ops = 0
+        for stale in (self._snapshot_file(previous), *self._journal_files(previous)):
+            if os.path.exists(stale):
+                os.remove(stale)
+
+    def _load(self):
+        with open(self._file("meta.json")) as f:
+            meta = json.load(f)
+        self.profile = StorageProfile.model_validate(meta["profile"])
+        self._generation = meta.get("generation", 0)
+        snapshot = np.load(self._snapshot_file(self._generation))
+        self._allocate(max(self.INITIAL_CAPACITY, len(meta["ids"])))
+        # rows on disk are already prepared and normalised, so they are copied as they are
+        for point_id, vector, payload in zip(meta["ids"], snapshot, meta["payloads"]):
+            self._write_row(point_id, vector, payload, normalised=True)
+        self._replay_journal()
+
+    def _replay_journal(self):
+        vectors_path, log_path = self._journal_files(self._generation)
+        if not os.path.exists(log_path):
+            return
+        vectors = np.fromfile(vectors_path, dtype=np.float32).reshape(-1, self.profile.dimensions) if os.path.exists(vectors_path) else np.empty((0, self.profile.dimensions), dtype=np.float32)
+        upserts = 0
+        with open(log_path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # a torn last line from a crash mid-append
+                    break
+                if entry["op"] == "delete":
+                    self._delete_row(entry["id"])
+                else:
+                    if upserts >= len(vectors):
+                        break
+                    self._write_row(entry["id"], vectors[upserts], entry["payload"], normalised=True)
+                    upserts += 1
+                self._journal_ops += 1
+
+
+class AsyncNumpyVectorStore:
+    """Awaitable view over a NumpyVectorStore; work is in-process so nothing actually blocks on I/O"""
+    def __init__(self, store: NumpyVectorStore):
+        self.store = store
+
+    @property
+    def profile(self) -> StorageProfile:
+        return self.store.profile
+
+    async def ensure_collection(self):
+        return None
+
+    async def add_vector(self, point_id: str, vector: list[float], payload: dict):
+        self.store.add_vector(point_id, vector, payload)
+
+    async def add_vectors(self, point_ids: list[str], vectors: list[list[float]], payloads: list[dict]):
+        self.store.add_vectors(point_ids, vectors, payloads)
+
+    async def apply_batch(self, point_ids: list[str], vectors: list[list[float]], payloads: list[dict], delete_ids: list[str], wait: bool = True):
+        return self.store.apply_batch(point_ids, vectors, payloads, delete_ids, wait)
+
+    async def confirm_batch(self, outcomes: list[VectorOperationOutcome]) -> list[VectorOperationOutcome]:
+        return self.store.confirm_batch(outcomes)
+
+    async def search(self, vector: list[float], filter_: Filter, limit: int = 5):
+        return self.store.search(vector, filter_, limit)
+
+    async def search_batch(self, vectors: list[list[float]], filter_: Filter, limit: int = 5, score_threshold: float | None = None):
+        return self.store.search_batch(vectors, filter_, limit, score_threshold)
+
+    async def delete(self, point_id: str):
+        self.store.delete(point_id)
+
+    async def vector_scroll(self, filter_: Filter, limit: int = 5):
+        return self.store.vector_scroll(filter_, limit)
+
+    async def scroll_page(self, filter_: Filter, limit: int, offset: str | None = None):
+        return self.store.scroll_page(filter_, limit, offset)
+
+    async def get_by_id(self, point_id: str):
+        return self.store.get_by_id(point_id)
+
+
+_numpy_stores: Dict[str, NumpyVectorStore] = {}
+_numpy_stores_lock = threading.Lock()
+
+
+def get_numpy_store(collection_name: str = "memories") -> NumpyVectorStore:
+    """One store per collection, shared by the sync and async views"""
+    with _numpy_stores_lock:
+        store = _numpy_stores.get(collection_name)
+        if store is None:
+            store = NumpyVectorStore(collection_name, path=settings.NUMPY_STORE_PATH or None)
+            _numpy_stores[collection_name] = store
+        return store
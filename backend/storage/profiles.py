@@ -0,0 +1,77 @@
+from typing import List, Literal
+import numpy as np
+from pydantic import BaseModel
+from qdrant_client.models import (
+        BinaryQuantization, BinaryQuantizationConfig, CollectionConfig, Distance, QuantizationSearchParams,
+        ScalarQuantization, ScalarQuantizationConfig, ScalarType, SearchParams, VectorParams
+        )
+from config.settings import settings
+
+
+class StorageProfile(BaseModel):
+    """How memory vectors are laid out in the collection; persisted in the collection metadata"""
+    dimensions: int
+    quantization: Literal["none", "scalar", "binary"] = "none"
+    on_disk: bool = False
+    oversampling: float = 2.0
+    rescore: bool = True
+
+    @classmethod
+    def from_settings(cls, full_dimensions: int) -> "StorageProfile":
+        dimensions = settings.VECTOR_DIMENSIONS or full_dimensions
+        if dimensions > full_dimensions:
+            raise ValueError(f"VECTOR_DIMENSIONS ({dimensions}) exceeds the embedding size ({full_dimensions})")
+        return cls(
+                dimensions=dimensions,
+                quantization=settings.VECTOR_QUANTIZATION,
+                on_disk=settings.VECTOR_ON_DISK,
+                oversampling=settings.VECTOR_OVERSAMPLING,
+                rescore=settings.VECTOR_RESCORE
+                )
+
+    def vectors_config(self) -> VectorParams:
+        return VectorParams(size=self.dimensions, distance=Distance.COSINE, on_disk=self.on_disk)
+
+    def quantization_config(self):
+        if self.quantization == "scalar":
+            return ScalarQuantization(scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True))
+        if self.quantization == "binary":
+            return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+        return None
+
+    def search_params(self) -> SearchParams | None:
+        if self.quantization == "none":
+            return None
+        return SearchParams(
+                quantization=QuantizationSearchParams(rescore=self.rescore, oversampling=self.oversampling)
+                )
+
+    def prepare_vector(self, vector: List[float]) -> List[float]:
+        """Matryoshka truncation: keep the leading dimensions and re-normalise"""
+        if len(vector) == self.dimensions:
+            return vector
+        truncated = np.asarray(vector[:self.dimensions], dtype=np.float32)
+        norm = np.linalg.norm(truncated)
+        if norm:
+            truncated /= norm
+        return truncated.tolist()
+
+    def to_metadata(self) -> dict:
+        return {"storage_profile": self.model_dump()}
+
+    @classmethod
+    def from_metadata(cls, metadata: dict | None) -> "StorageProfile | None":
+        if not metadata or "storage_profile" not in metadata:
+            return None
+        return cls.model_validate(metadata["storage_profile"])
+
+    @classmethod
+    def from_collection(cls, config: CollectionConfig, default: "StorageProfile") -> "StorageProfile":
+        """The profile recorded at creation wins over settings, so vectors stay compatible"""
+        profile = cls.from_metadata(config.metadata)
+        if profile:
+            return profile
+        params = config.params.vectors
+        if isinstance(params, VectorParams):
+            return cls(dimensions=params.size)
+        return default
@@ -1,39 +1,184 @@
-from exports.qdrant_client import client
-from qdrant_client.models import Distance, Filter, VectorParams, PointStruct, PointIdsList
+import asyncio
+from config.settings import settings
+from exports.qdrant_client import async_client, client
+from utils.embedding_backends import get_embedding_backend
+from qdrant_client.models import (
+        DeleteOperation, Filter, IntegerIndexParams, KeywordIndexParams, PayloadSchemaType, PointStruct, PointIdsList,
+        PointsList, QueryRequest, UpdateStatus, UpsertOperation
+        )
+from exports.types import VectorOperationOutcome
+from storage.profiles import StorageProfile
+from storage.numpy_store import AsyncNumpyVectorStore, get_numpy_store
+
+# user_id is the tenant key: Qdrant co-locates each user's points and skips the others on filtered queries
+PAYLOAD_INDEXES = {
+        "user_id": KeywordIndexParams(type=PayloadSchemaType.KEYWORD, is_tenant=True),
+        "memory_type": KeywordIndexParams(type=PayloadSchemaType.KEYWORD),
+        "content_hash": KeywordIndexParams(type=PayloadSchemaType.KEYWORD),
+        "timestamp_epoch": IntegerIndexParams(type=PayloadSchemaType.INTEGER, lookup=False, range=True, is_principal=True)
+        }
+
+
+def _batch_operations(profile: StorageProfile, point_ids: list[str], vectors: list[list[float]], payloads: list[dict], delete_ids: list[str]):
+    """Deletes run first so an id that is both deleted and rewritten ends up written"""
+    operations = []
+    actions = []
+    if delete_ids:
+        operations.append(DeleteOperation(delete=PointIdsList(points=list(delete_ids))))
+        actions.append(("delete", list(delete_ids)))
+    if point_ids:
+        operations.append(UpsertOperation(upsert=PointsList(points=[
+            PointStruct(id=point_id, vector=profile.prepare_vector(vector), payload=payload)
+            for point_id, vector, payload in zip(point_ids, vectors, payloads)
+            ])))
+        actions.append(("upsert", list(point_ids)))
+    return operations, actions
+
+
+def _batch_outcomes(actions, results=None, error: Exception | None = None) -> list[VectorOperationOutcome]:
+    outcomes = []
+    for index, (action, ids) in enumerate(actions):
+        result = results[index] if results else None
+        if error is not None:
+            status = "failed"
+        elif result is not None and result.status == UpdateStatus.COMPLETED:
+            status = "completed"
+        else:
+            status = "acknowledged"
+        outcomes.extend(
+                VectorOperationOutcome(
+                    point_id=str(point_id),
+                    action=action,
+                    status=status,
+                    operation_id=result.operation_id if result is not None else None,
+                    error=str(error) if error is not None else None
+                    )
+                for point_id in ids
+                )
+    return outcomes
+
+
+def _query_requests(profile: StorageProfile, vectors: list[list[float]], filter_: Filter, limit: int, score_threshold: float | None):
+    return [
+            QueryRequest(
+                query=profile.prepare_vector(vector),
+                filter=filter_,
+                params=profile.search_params(),
+                score_threshold=score_threshold,
+                with_payload=True,
+                limit=limit
+                )
+            for vector in vectors
+            ]
+
+
+def _confirm_outcomes(outcomes: list[VectorOperationOutcome], present: set[str]) -> list[VectorOperationOutcome]:
+    confirmed = []
+    for outcome in outcomes:
+        if outcome.status in ("acknowledged", "pending"):
+            applied = (outcome.point_id in present) == (outcome.action == "upsert")
+            outcome = outcome.model_copy(update={"status": "confirmed" if applied else "pending"})
+        confirmed.append(outcome)
+    return confirmed
+
 
 class VectorStore:
-    def __init__(self, collection_name: str = "memories", vector_size: int = 768):
+    def __init__(self, collection_name: str = "memories", vector_size: int | None = None):
         self.client = client
         self.collection_name = collection_name
-        self.vector_size = vector_size
+        self.vector_size = vector_size or get_embedding_backend().dimensions
+        self.profile = StorageProfile.from_settings(self.vector_size)
         self._create_collection()
 
     def _create_collection(self):
         if self.client.collection_exists(self.collection_name):
+            info = self.client.get_collection(self.collection_name)
+            self.profile = StorageProfile.from_collection(info.config, self.profile)
+            self._create_payload_indexes(info.payload_schema)
             return 
         try:
             self.client.create_collection(
                     collection_name=self.collection_name,
-                    vectors_config=VectorParams(size=self.vector_size, distance=Distance.COSINE)
+                    vectors_config=self.profile.vectors_config(),
+                    quantization_config=self.profile.quantization_config(),
+                    metadata=self.profile.to_metadata()
                     )
+            self._create_payload_indexes({})
         except Exception as e:
             print(f"Error while creating the collection: {str(e)}")
 
+    def _create_payload_indexes(self, existing: dict):
+        for field_name, field_schema in PAYLOAD_INDEXES.items():
+            if field_name in existing:
+                continue
+            try:
+                self.client.create_payload_index(
+                        collection_name=self.collection_name,
+                        field_name=field_name,
+                        field_schema=field_schema
+                        )
+            except Exception as e:
+                print(f"Error while creating payload index on {field_name}: {str(e)}")
+
     def add_vector(self, point_id: str, vector: list[float], payload: dict):
         self.client.upsert(collection_name=self.collection_name, wait=True, points=[
-            PointStruct(id=point_id, vector=vector, payload=payload)
+            PointStruct(id=point_id, vector=self.profile.prepare_vector(vector), payload=payload)
             ])
 
+    def add_vectors(self, point_ids: list[str], vectors: list[list[float]], payloads: list[dict]):
+        self.client.upsert(collection_name=self.collection_name, wait=True, points=[
+            PointStruct(id=point_id, vector=self.profile.prepare_vector(vector), payload=payload)
+            for point_id, vector, payload in zip(point_ids, vectors, payloads)
+            ])
+
+    def apply_batch(self, point_ids: list[str], vectors: list[list[float]], payloads: list[dict], delete_ids: list[str], wait: bool = True):
+        """Apply upserts and deletes in one batch_update_points request.
+
+        With wait=False Qdrant only acknowledges the batch; pass the outcomes to confirm_batch later.
+        """
+        operations, actions = _batch_operations(self.profile, point_ids, vectors, payloads, delete_ids)
+        if not operations:
+            return []
+        try:
+            results = self.client.batch_update_points(
+                    collection_name=self.collection_name,
+                    update_operations=operations,
+                    wait=wait
+                    )
+        except Exception as e:
+            return _batch_outcomes(actions, error=e)
+        return _batch_outcomes(actions, results)
+
+    def confirm_batch(self, outcomes: list[VectorOperationOutcome]) -> list[VectorOperationOutcome]:
+        ids = [outcome.point_id for outcome in outcomes if outcome.status in ("acknowledged", "pending")]
+        if not ids:
+            return outcomes
+        present = {str(point.id) for point in self.client.retrieve(
+            collection_name=self.collection_name, ids=ids, with_payload=False
+            )}
+        return _confirm_outcomes(outcomes, present)
+
     def search(self, vector: list[float], filter_: Filter, limit: int = 5):
         results = self.client.query_points(
                 collection_name=self.collection_name,
-                query=vector,
+                query=self.profile.prepare_vector(vector),
                 query_filter=filter_,
+                search_params=self.profile.search_params(),
                 with_payload=True,
                 limit=limit
                 )
         return results.points
 
+    def search_batch(self, vectors: list[list[float]], filter_: Filter, limit: int = 5, score_threshold: float | None = None):
+        """One query_batch_points request for many query vectors; results keep the input order"""
+        if not vectors:
+            return []
+        responses = self.client.query_batch_points(
+                collection_name=self.collection_name,
+                requests=_query_requests(self.profile, vectors, filter_, limit, score_threshold)
+                )
+        return [response.points for response in responses]
+
     def delete(self, point_id: str):
         self.client.delete(
                 collection_name=self.collection_name,
@@ -48,9 +193,175 @@ class VectorStore:
                 )
         return points
 
+    def scroll_page(self, filter_: Filter, limit: int, offset: str | None = None):
+        points, next_offset = self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=filter_,
+                limit=limit,
+                offset=offset
+                )
+        return points, (str(next_offset) if next_offset is not None else None)
+
     def get_by_id(self, point_id: str):
         results = self.client.retrieve(
                 collection_name=self.collection_name,
                 ids=[point_id]
                 )
         return results[0] if results else None
+
+
+class AsyncVectorStore:
+    """Non-blocking counterpart of VectorStore on the shared AsyncQdrantClient"""
+    def __init__(self, collection_name: str = "memories", vector_size: int | None = None):
+        self.client = async_client
+        self.collection_name = collection_name
+        self.vector_size = vector_size or get_embedding_backend().dimensions
+        self.profile = StorageProfile.from_settings(self.vector_size)
+        self._ready = False
+        self._ready_lock: asyncio.Lock | None = None
+
+    async def ensure_collection(self):
+        if self._ready:
+            return
+        if self._ready_lock is None:
+            self._ready_lock = asyncio.Lock()
+        async with self._ready_lock:
+            if self._ready:
+                return
+            await self._create_collection()
+            self._ready = True
+
+    async def _create_collection(self):
+        if await self.client.collection_exists(self.collection_name):
+            info = await self.client.get_collection(self.collection_name)
+            self.profile = StorageProfile.from_collection(info.config, self.profile)
+            await self._create_payload_indexes(info.payload_schema)
+            return
+        try:
+            await self.client.create_collection(
+                    collection_name=self.collection_name,
+                    vectors_config=self.profile.vectors_config(),
+                    quantization_config=self.profile.quantization_config(),
+                    metadata=self.profile.to_metadata()
+                    )
+            await self._create_payload_indexes({})
+        except Exception as e:
+            print(f"Error while creating the collection: {str(e)}")
+
+    async def _create_payload_indexes(self, existing: dict):
+        for field_name, field_schema in PAYLOAD_INDEXES.items():
+            if field_name in existing:
+                continue
+            try:
+                await self.client.create_payload_index(
+                        collection_name=self.collection_name,
+                        field_name=field_name,
+                        field_schema=field_schema
+                        )
+            except Exception as e:
+                print(f"Error while creating payload index on {field_name}: {str(e)}")
+
+    async def add_vector(self, point_id: str, vector: list[float], payload: dict):
+        await self.ensure_collection()
+        await self.client.upsert(collection_name=self.collection_name, wait=True, points=[
+            PointStruct(id=point_id, vector=self.profile.prepare_vector(vector), payload=payload)
+            ])
+
+    async def add_vectors(self, point_ids: list[str], vectors: list[list[float]], payloads: list[dict]):
+        await self.ensure_collection()
+        await self.client.upsert(collection_name=self.collection_name, wait=True, points=[
+            PointStruct(id=point_id, vector=self.profile.prepare_vector(vector), payload=payload)
+            for point_id, vector, payload in zip(point_ids, vectors, payloads)
+            ])
+
+    async def apply_batch(self, point_ids: list[str], vectors: list[list[float]], payloads: list[dict], delete_ids: list[str], wait: bool = True):
+        await self.ensure_collection()
+        operations, actions = _batch_operations(self.profile, point_ids, vectors, payloads, delete_ids)
+        if not operations:
+            return []
+        try:
+            results = await self.client.batch_update_points(
+                    collection_name=self.collection_name,
+                    update_operations=operations,
+                    wait=wait
+                    )
+        except Exception as e:
+            return _batch_outcomes(actions, error=e)
+        return _batch_outcomes(actions, results)
+
+    async def confirm_batch(self, outcomes: list[VectorOperationOutcome]) -> list[VectorOperationOutcome]:
+        ids = [outcome.point_id for outcome in outcomes if outcome.status in ("acknowledged", "pending")]
+        if not ids:
+            return outcomes
+        await self.ensure_collection()
+        points = await self.client.retrieve(collection_name=self.collection_name, ids=ids, with_payload=False)
+        return _confirm_outcomes(outcomes, {str(point.id) for point in points})
+
+    async def search(self, vector: list[float], filter_: Filter, limit: int = 5):
+        await self.ensure_collection()
+        results = await self.client.query_points(
+                collection_name=self.collection_name,
+                query=self.profile.prepare_vector(vector),
+                query_filter=filter_,
+                search_params=self.profile.search_params(),
+                with_payload=True,
+                limit=limit
+                )
+        return results.points
+
+    async def search_batch(self, vectors: list[list[float]], filter_: Filter, limit: int = 5, score_threshold: float | None = None):
+        if not vectors:
+            return []
+        await self.ensure_collection()
+        responses = await self.client.query_batch_points(
+                collection_name=self.collection_name,
+                requests=_query_requests(self.profile, vectors, filter_, limit, score_threshold)
+                )
+        return [response.points for response in responses]
+
+    async def delete(self, point_id: str):
+        await self.ensure_collection()
+        await self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=PointIdsList(points=[point_id])
+                )
+
+    async def vector_scroll(self, filter_: Filter, limit: int = 5):
+        await self.ensure_collection()
+        points, _ = await self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=filter_,
+                limit=limit
+                )
+        return points
+
+    async def scroll_page(self, filter_: Filter, limit: int, offset: str | None = None):
+        await self.ensure_collection()
+        points, next_offset = await self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=filter_,
+                limit=limit,
+                offset=offset
+                )
+        return points, (str(next_offset) if next_offset is not None else None)
+
+    async def get_by_id(self, point_id: str):
+        await self.ensure_collection()
+        results = await self.client.retrieve(
+                collection_name=self.collection_name,
+                ids=[point_id]
+                )
+        return results[0] if results else None
+
+
+def create_vector_store(collection_name: str = "memories"):
+    """VECTOR_BACKEND picks Qdrant or the in-process NumPy store; both expose the same API"""
+    if settings.VECTOR_BACKEND == "numpy":
+        return get_numpy_store(collection_name)
+    return VectorStore(collection_name)
+
+
+def create_async_vector_store(collection_name: str = "memories"):
+    if settings.VECTOR_BACKEND == "numpy":
+        return AsyncNumpyVectorStore(get_numpy_store(collection_name))
+    return AsyncVectorStore(collection_name)
@@ -0,0 +1,176 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+from config.settings import settings
+from exports.types import LLMProvider
+from llm.gateway import CircuitBreaker, CircuitOpenError, ProviderGateway
+
+
+class ProviderError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"provider error ({status_code})")
+        self.status_code = status_code
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def test_opens_after_threshold(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60)
+        breaker.failure()
+        self.assertEqual(breaker.state, "closed")
+        breaker.failure()
+        self.assertEqual(breaker.state, "open")
+        self.assertFalse(breaker.allow())
+        self.assertEqual(breaker.trips, 1)
+
+    def test_success_resets_failures(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60)
+        breaker.failure()
+        breaker.success()
+        breaker.failure()
+        self.assertEqual(breaker.state, "closed")
+
+    def test_half_open_admits_one_trial(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0)
+        breaker.failure()
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.state, "half_open")
+        self.assertFalse(breaker.allow())
+
+    def test_trial_success_closes(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0)
+        breaker.failure()
+        breaker.allow()
+        breaker.success()
+        self.assertEqual(breaker.state, "closed")
+        self.assertTrue(breaker.allow())
+
+    def test_trial_failure_reopens(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=60)
+        breaker.failure()
+        breaker.opened_at -= 60
+        breaker.allow()
+        breaker.failure()
+        self.assertEqual(breaker.state, "open")
+        self.assertFalse(breaker.allow())
+        self.assertEqual(breaker.trips, 2)
+
+    def test_released_trial_hands_over_to_next_call(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0)
+        breaker.failure()
+        breaker.allow()
+        breaker.release()
+        self.assertEqual(breaker.state, "open")
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.state, "half_open")
+
+    def test_release_outside_trial_is_noop(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0)
+        breaker.release()
+        self.assertEqual(breaker.state, "closed")
+
+
+class ProviderGatewayBreakerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        patcher = patch.object(settings, "LLM_MAX_RETRIES", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.gateway = ProviderGateway()
+        self.gate = self.gateway.gate(LLMProvider.OPENAI)
+        self.gate.breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0)
+
+    async def trip(self):
+        async def fail():
+            raise ProviderError(503)
+
+        with self.assertRaises(ProviderError):
+            await self.gateway.call(LLMProvider.OPENAI, 1, fail)
+        self.assertEqual(self.gate.breaker.state, "open")
+
+    async def ok(self):
+        return "ok"
+
+    async def test_non_retryable_trial_does_not_stick(self):
+        await self.trip()
+
+        async def bad_request():
+            raise ValueError("content filtered")
+
+        with self.assertRaises(ValueError):
+            await self.gateway.call(LLMProvider.OPENAI, 1, bad_request)
+        self.assertNotEqual(self.gate.breaker.state, "half_open")
+        self.assertEqual(await self.gateway.call(LLMProvider.OPENAI, 1, self.ok), "ok")
+        self.assertEqual(self.gate.breaker.state, "closed")
+
+    async def test_cancelled_trial_does_not_stick(self):
+        await self.trip()
+        started = asyncio.Event()
+
+        async def hang():
+            started.set()
+            await asyncio.sleep(60)
+
+        task = asyncio.create_task(self.gateway.call(LLMProvider.OPENAI, 1, hang))
+        await started.wait()
+        self.assertEqual(self.gate.breaker.state, "half_open")
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertEqual(self.gate.in_flight, 0)
+        self.assertEqual(await self.gateway.call(LLMProvider.OPENAI, 1, self.ok), "ok")
+        self.assertEqual(self.gate.breaker.state, "closed")
+
+    async def test_concurrent_call_rejected_during_trial(self):
+        await self.trip()
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await release.wait()
+            return "trial"
+
+        task = asyncio.create_task(self.gateway.call(LLMProvider.OPENAI, 1, slow))
+        await started.wait()
+        with self.assertRaises(CircuitOpenError):
+            await self.gateway.call(LLMProvider.OPENAI, 1, self.ok)
+        release.set()
+        self.assertEqual(await task, "trial")
+        self.assertEqual(self.gate.breaker.state, "closed")
+
+    async def test_closed_stream_trial_does_not_stick(self):
+        await self.trip()
+
+        async def chunks():
+            yield "a"
+            yield "b"
+
+        stream = self.gateway.stream(LLMProvider.OPENAI, 1, chunks)
+        self.assertEqual(await stream.__anext__(), "a")
+        await stream.aclose()
+        self.assertEqual(self.gate.breaker.state, "closed")
+        self.assertEqual(self.gate.in_flight, 0)
+
+    async def test_stream_cancelled_before_first_chunk_does_not_stick(self):
+        await self.trip()
+        started = asyncio.Event()
+
+        async def hang():
+            started.set()
+            await asyncio.sleep(60)
+            yield "never"
+
+        async def consume():
+            async for _ in self.gateway.stream(LLMProvider.OPENAI, 1, hang):
+                pass
+
+        task = asyncio.create_task(consume())
+        await started.wait()
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertEqual(self.gate.breaker.state, "open")
+        self.assertEqual(await self.gateway.call(LLMProvider.OPENAI, 1, self.ok), "ok")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+from config.settings import settings
+from exports.types import LLMProvider
+from llm.gateway import CircuitBreaker, ProviderGateway
+from llm.hedging import HedgeStats, hedged_call, hedged_stream
+
+
+class ProviderError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"provider error ({status_code})")
+        self.status_code = status_code
+
+
+class HedgedStreamTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        patcher = patch.object(settings, "LLM_MAX_RETRIES", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.gateway = ProviderGateway()
+        self.stats = HedgeStats()
+
+    def attempt(self, provider: LLMProvider, delay: float, chunks):
+        async def chunks_after_delay():
+            await asyncio.sleep(delay)
+            for chunk in chunks:
+                yield chunk
+
+        return provider.value, lambda: self.gateway.stream(provider, 1, chunks_after_delay)
+
+    async def collect(self, attempts, delay_seconds: float):
+        return [chunk async for chunk in hedged_stream(attempts, delay_seconds, "final_answer", self.stats)]
+
+    async def test_hedge_wins_when_primary_is_slow(self):
+        attempts = [self.attempt(LLMProvider.GEMINI, 1.0, ["slow"]), self.attempt(LLMProvider.OPENAI, 0.0, ["fast", "er"])]
+        self.assertEqual(await self.collect(attempts, 0.01), ["fast", "er"])
+        stats = self.stats.stats()["final_answer"]
+        self.assertEqual((stats["hedged"], stats["secondary_wins"]), (1, 1))
+
+    async def test_failover_on_error(self):
+        async def fail():
+            raise ProviderError(400)
+            yield
+
+        attempts = [("gemini", lambda: self.gateway.stream(LLMProvider.GEMINI, 1, fail)), self.attempt(LLMProvider.OPENAI, 0.0, ["ok"])]
+        self.assertEqual(await self.collect(attempts, 10), ["ok"])
+        self.assertEqual(self.stats.stats()["final_answer"]["failovers"], 1)
+
+    async def test_cancelled_half_open_loser_does_not_stick(self):
+        gate = self.gateway.gate(LLMProvider.GEMINI)
+        gate.breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0)
+        gate.breaker.failure()
+        # the slow primary is the breaker's trial and gets cancelled when the hedge wins
+        attempts = [self.attempt(LLMProvider.GEMINI, 1.0, ["slow"]), self.attempt(LLMProvider.OPENAI, 0.0, ["fast"])]
+        self.assertEqual(await self.collect(attempts, 0.01), ["fast"])
+        await asyncio.sleep(0)
+        self.assertEqual(gate.in_flight, 0)
+        self.assertNotEqual(gate.breaker.state, "half_open")
+        attempts = [self.attempt(LLMProvider.GEMINI, 0.0, ["recovered"])]
+        self.assertEqual(await self.collect(attempts, 10), ["recovered"])
+        self.assertEqual(gate.breaker.state, "closed")
+
+    async def test_hedged_call_returns_first_value(self):
+        async def value(result: str, delay: float):
+            await asyncio.sleep(delay)
+            yield result
+
+        attempts = [("slow", lambda: value("slow", 1.0)), ("fast", lambda: value("fast", 0.0))]
+        self.assertEqual(await hedged_call(attempts, 0.01, "final_answer", self.stats), "fast")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from db.models.user import Base, MemoryJob
+from memory.jobs import MemoryJobQueue
+
+
+async def noop(user_id, payloads):
+    return None
+
+
+class MemoryJobQueueTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(engine)
+        self.session_factory = sessionmaker(bind=engine)
+
+    def queue(self, handlers=None, **options) -> MemoryJobQueue:
+        options = {"workers": 2, "max_attempts": 2, "backoff_seconds": 0, "poll_seconds": 0.01, "lease_seconds": 60, "coalesce_window": 0, "coalesce_max_jobs": 10, **options}
+        return MemoryJobQueue(self.session_factory, handlers or {"extract": noop, "forget": noop}, **options)
+
+    def job(self, job_id: int) -> MemoryJob:
+        with self.session_factory() as db:
+            return db.get(MemoryJob, job_id)
+
+    def expire_lease(self, job_id: int):
+        with self.session_factory() as db:
+            db.execute(update(MemoryJob).where(MemoryJob.id == job_id).values(available_at=datetime.now() - timedelta(seconds=1)))
+            db.commit()
+
+    def test_claim_coalesces_a_users_run_of_same_kind_jobs(self):
+        queue = self.queue()
+        first = queue._insert("a", "extract", {"turn": 1})
+        second = queue._insert("a", "extract", {"turn": 2})
+        forget = queue._insert("a", "forget", {})
+        other = queue._insert("b", "extract", {"turn": 1})
+        claimed = {job.user_id: job for job in queue._claim(set(), 10)}
+        self.assertEqual(claimed["a"].ids, [first, second])
+        self.assertEqual(claimed["a"].payloads, [{"turn": 1}, {"turn": 2}])
+        self.assertEqual(claimed["b"].ids, [other])
+        self.assertEqual(self.job(forget).status, "pending")
+        # the user's run is still running, so nothing behind it is claimable
+        self.assertEqual(queue._claim(set(), 10), [])
+        queue._finish(claimed["a"])
+        self.assertEqual([job.ids for job in queue._claim(set(), 10)], [[forget]])
+
+    def test_claim_skips_busy_users_and_waits_out_the_window(self):
+        queue = self.queue(coalesce_window=60, coalesce_max_jobs=2)
+        queue._insert("a", "extract", {})
+        self.assertEqual(queue._claim(set(), 10), [])
+        queue._insert("a", "extract", {})
+        self.assertEqual(queue._claim({"a"}, 10), [])
+        self.assertEqual(len(queue._claim(set(), 10)[0].ids), 2)
+
+    def test_failure_backs_off_then_fails_for_good(self):
+        queue = self.queue(backoff_seconds=60)
+        job_id = queue._insert("a", "extract", {})
+        job = queue._claim(set(), 10)[0]
+        self.assertTrue(queue._fail(job, "boom"))
+        self.assertEqual(self.job(job_id).status, "pending")
+        self.assertGreater(self.job(job_id).available_at, datetime.now())
+        self.assertEqual(queue._claim(set(), 10), [])
+
+        self.expire_lease(job_id)
+        job = queue._claim(set(), 10)[0]
+        self.assertEqual(job.attempts, 1)
+        self.assertFalse(queue._fail(job, "boom again"))
+        self.assertEqual(self.job(job_id).status, "failed")
+        self.assertEqual(self.job(job_id).last_error, "boom again")
+
+    def test_expired_lease_is_reclaimed_as_an_attempt(self):
+        queue = self.queue()
+        job_id = queue._insert("a", "extract", {})
+        queue._claim(set(), 10)
+        self.expire_lease(job_id)
+        self.assertEqual(queue._claim(set(), 10)[0].attempts, 1)
+        self.expire_lease(job_id)
+        self.assertEqual(queue._claim(set(), 10), [])
+        self.assertEqual(self.job(job_id).status, "failed")
+        self.assertEqual(queue.counters["failed"], 1)
+
+    async def test_workers_retry_and_coalesce(self):
+        calls = []
+
+        async def flaky(user_id, payloads):
+            calls.append((user_id, [payload["turn"] for payload in payloads]))
+            if len(calls) == 1:
+                raise RuntimeError("provider down")
+
+        queue = self.queue({"extract": flaky}, coalesce_window=0.05)
+        for turn in range(3):
+            await queue.enqueue("a", "extract", {"turn": turn})
+        await queue.start()
+        try:
+            for _ in range(200):
+                if queue.counters["completed"] == 3:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await queue.stop(timeout=1)
+        self.assertEqual(calls, [("a", [0, 1, 2]), ("a", [0, 1, 2])])
+        self.assertEqual({key: queue.counters[key] for key in ("retried", "completed", "batches", "coalesced")}, {"retried": 1, "completed": 3, "batches": 1, "coalesced": 2})
+
+    async def test_unknown_kind_is_rejected(self):
+        with self.assertRaises(ValueError):
+            await self.queue().enqueue("a", "unknown", {})
+
+
+if __name__ == "__main__":
+    unittest.main()
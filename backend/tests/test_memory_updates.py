@@ -0,0 +1,79 @@
+import asyncio
+import unittest
+import uuid
+from datetime import datetime
+from unittest.mock import patch
+from config.settings import settings
+from exports.types import Memory, MemoryType
+from storage.memory_store import MemoryStore
+from update.updater import IncrementalApplier
+from utils.embedding_backends import LocalHashingEmbeddingBackend
+from utils.embedding_cache import EmbeddingCache
+from utils.embeddings import EmbeddingGenerator
+
+
+def memory(content: str, point_id: str | None = None) -> Memory:
+    return Memory(
+            id=point_id or str(uuid.uuid4()),
+            user_id="u",
+            content=content,
+            memory_type=MemoryType.SEMANTIC,
+            metadata={},
+            timestamp=datetime.now()
+            )
+
+
+class MemoryUpdateWriteTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        for name, value in (("VECTOR_BACKEND", "numpy"), ("EMBEDDING_BACKEND", "local"), ("NUMPY_STORE_PATH", ""), ("MEMORY_DETERMINISTIC_IDS", False)):
+            patcher = patch.object(settings, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        embed = EmbeddingGenerator(cache=EmbeddingCache(1024 * 1024), backend=LocalHashingEmbeddingBackend())
+        self.store = MemoryStore(f"test-{uuid.uuid4()}", embed=embed)
+
+    async def contents(self):
+        return sorted(stored.content for stored in await self.store.auser_memories("u"))
+
+    async def ids_by_content(self):
+        return {stored.content: stored.id for stored in await self.store.auser_memories("u")}
+
+    async def test_update_onto_other_stored_content_removes_the_old_point(self):
+        await self.store.astore_memories([memory("lives in Paris"), memory("lives in Berlin")])
+        paris = (await self.ids_by_content())["lives in Paris"]
+        outcomes = await self.store.aapply_memory_updates([memory("lives in Berlin", paris)], [])
+        self.assertEqual(await self.contents(), ["lives in Berlin"])
+        self.assertIn(("delete", paris), [(outcome.action, outcome.point_id) for outcome in outcomes])
+
+    async def test_rewrite_to_own_content_is_skipped(self):
+        await self.store.astore_memories([memory("likes tea")])
+        tea = (await self.ids_by_content())["likes tea"]
+        outcomes = await self.store.aapply_memory_updates([memory("likes tea", tea)], [])
+        self.assertEqual([(outcome.action, outcome.status) for outcome in outcomes], [("upsert", "skipped")])
+        self.assertEqual(await self.ids_by_content(), {"likes tea": tea})
+
+    async def test_add_of_stored_content_is_not_written_again(self):
+        await self.store.astore_memories([memory("likes tea")])
+        await self.store.aapply_memory_updates([memory("likes tea"), memory("likes coffee"), memory("likes coffee")], [])
+        self.assertEqual(await self.contents(), ["likes coffee", "likes tea"])
+
+    async def test_applier_batches_with_the_same_content_store_it_once(self):
+        embed_batch = self.store.embed.agenerate_embeddings_batch
+
+        async def slow_embed_batch(texts):
+            # widen the gap between the duplicate check and the write, as a real embedding call does
+            await asyncio.sleep(0.01)
+            return await embed_batch(texts)
+
+        self.store.embed.agenerate_embeddings_batch = slow_embed_batch
+        applier = IncrementalApplier(self.store)
+        applier.submit([memory("plays chess")], [])
+        # a later event-loop turn, so this becomes a second batch
+        await asyncio.sleep(0)
+        applier.submit([memory("plays chess")], [])
+        await applier.finish()
+        self.assertEqual(await self.contents(), ["plays chess"])
+
+
+if __name__ == "__main__":
+    unittest.main()
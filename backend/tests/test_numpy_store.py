@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from qdrant_client.models import FieldCondition, Filter, MatchValue
+from config.settings import settings
+from storage.numpy_store import NumpyVectorStore
+
+DIMENSIONS = 8
+
+
+def vector(seed: int):
+    return [float((seed * 7 + i) % 5 + 1) for i in range(DIMENSIONS)]
+
+
+def payload(content: str, user_id: str = "u"):
+    return {"user_id": user_id, "content": content}
+
+
+class NumpyStorePersistenceTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.user = Filter(must=[FieldCondition(key="user_id", match=MatchValue(value="u"))])
+
+    def open(self) -> NumpyVectorStore:
+        return NumpyVectorStore("memories", vector_size=DIMENSIONS, path=self.tmp.name)
+
+    def files(self):
+        return sorted(os.listdir(os.path.join(self.tmp.name, "memories")))
+
+    def test_journaled_writes_survive_restart(self):
+        store = self.open()
+        store.add_vector("a", vector(1), payload("first"))
+        store.add_vectors(["b", "c"], [vector(2), vector(3)], [payload("second"), payload("third")])
+        store.apply_batch(["b"], [vector(4)], [payload("second, rewritten")], delete_ids=["c"])
+        self.assertNotIn("meta.json", self.files())
+
+        reopened = self.open()
+        self.assertEqual(reopened.get_by_id("a").payload["content"], "first")
+        self.assertEqual(reopened.get_by_id("b").payload["content"], "second, rewritten")
+        self.assertIsNone(reopened.get_by_id("c"))
+        query = vector(4)
+        self.assertEqual(
+                [(point.id, round(point.score, 5)) for point in store.search(query, self.user, 10)],
+                [(point.id, round(point.score, 5)) for point in reopened.search(query, self.user, 10)]
+                )
+
+    def test_compaction_folds_journal_into_snapshot(self):
+        with patch.object(settings, "NUMPY_STORE_COMPACT_MIN_OPS", 4):
+            store = self.open()
+            for i in range(6):
+                store.add_vector(f"p{i}", vector(i), payload(f"memory {i}"))
+            store.delete("p0")
+        self.assertGreaterEqual(store._generation, 1)
+        self.assertIn("meta.json", self.files())
+        self.assertNotIn("journal-0.jsonl", self.files())
+
+        reopened = self.open()
+        self.assertIsNone(reopened.get_by_id("p0"))
+        self.assertEqual(
+                sorted(record.id for record in reopened.scroll_page(self.user, 10)[0]),
+                [f"p{i}" for i in range(1, 6)]
+                )
+        reopened.add_vector("p6", vector(6), payload("after compaction"))
+        self.assertEqual(self.open().get_by_id("p6").payload["content"], "after compaction")
+
+    def test_deleted_rows_are_reused(self):
+        store = self.open()
+        store.add_vectors(["a", "b"], [vector(1), vector(2)], [payload("a"), payload("b")])
+        store.delete("a")
+        store.add_vector("c", vector(3), payload("c"))
+        self.assertEqual(store._count, 2)
+        self.assertEqual(store.get_by_id("c").payload["content"], "c")
+        self.assertEqual(self.open().get_by_id("c").payload["content"], "c")
+
+    def test_torn_journal_line_is_ignored(self):
+        store = self.open()
+        store.add_vector("a", vector(1), payload("kept"))
+        with open(os.path.join(self.tmp.name, "memories", "journal-0.jsonl"), "a") as f:
+            f.write('{"op": "ups')
+        self.assertEqual(self.open().get_by_id("a").payload["content"], "kept")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+from exports.parser import JsonArrayItemParser, extract_json
+
+RESPONSE = '```json\n{"memory": [{"text": "likes {braces}", "tags": ["a]"]}, {"text": "quote \\" inside"}], "other": [{"x": 1}]}\n```'
+
+
+def parse(chunks, key: str = "memory"):
+    parser = JsonArrayItemParser(key)
+    items = [item for chunk in chunks for item in parser.feed(chunk)]
+    return items, parser
+
+
+class JsonArrayItemParserTest(unittest.TestCase):
+    def test_whole_response(self):
+        items, parser = parse([RESPONSE])
+        self.assertEqual(items, [{"text": "likes {braces}", "tags": ["a]"]}, {"text": 'quote " inside'}])
+        self.assertEqual(parser.malformed, 0)
+
+    def test_every_split_point_gives_the_same_items(self):
+        expected, _ = parse([RESPONSE])
+        for split in range(1, len(RESPONSE)):
+            with self.subTest(split=split):
+                self.assertEqual(parse([RESPONSE[:split], RESPONSE[split:]])[0], expected)
+
+    def test_single_character_chunks(self):
+        self.assertEqual(parse(list(RESPONSE))[0], parse([RESPONSE])[0])
+
+    def test_items_are_yielded_as_they_close(self):
+        parser = JsonArrayItemParser("memory")
+        self.assertEqual(list(parser.feed('{"memory": [{"text": "one"}, {"te')), [{"text": "one"}])
+        self.assertEqual(list(parser.feed('xt": "two"}')), [{"text": "two"}])
+        # a truncated response yields nothing for the unfinished item
+        self.assertEqual(list(parser.feed(', {"text": "thr')), [])
+
+    def test_malformed_item_is_skipped(self):
+        items, parser = parse(['{"memory": [{"text": "ok"}, {"text": nope}, {"text": "fine"}]}'])
+        self.assertEqual(items, [{"text": "ok"}, {"text": "fine"}])
+        self.assertEqual(parser.malformed, 1)
+
+    def test_other_keys_are_ignored(self):
+        self.assertEqual(parse([RESPONSE], key="other")[0], [{"x": 1}])
+        self.assertEqual(parse([RESPONSE], key="missing")[0], [])
+
+
+class ExtractJsonTest(unittest.TestCase):
+    def test_skips_prose_and_trailing_objects(self):
+        self.assertEqual(extract_json('Sure! {not json} then {"a": 1} and {"b": 2}'), {"a": 1})
+
+    def test_empty_response_uses_default(self):
+        self.assertEqual(extract_json("  ", {"memory": []}), {"memory": []})
+
+    def test_no_object_raises(self):
+        with self.assertRaises(ValueError):
+            extract_json("no json here")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,7 @@
 from typing import Sequence, Union
 from langchain.tools import tool
 from exports.types import Memory
-from memory.episodic_mem import EpisodicMemory
+from exports.container import container
 from datetime import datetime
 
 def format_memories_for_llm(memories: Sequence[Memory]) -> str:
@@ -16,7 +16,7 @@ def format_memories_for_llm(memories: Sequence[Memory]) -> str:
     return "\n".join(formatted)
 
 @tool
-def get_recent_memories(user_id: str, days: Union[int, str] = 7) -> str:
+async def get_recent_memories(user_id: str, days: Union[int, str] = 7) -> str:
     """Get recent memories from last N days
 
     Use this tool when the user asks about:
@@ -31,13 +31,13 @@ def get_recent_memories(user_id: str, days: Union[int, str] = 7) -> str:
     Returns:
         Formatted string of recent memories
     """
-    episodic = EpisodicMemory()
-    memories = episodic.get_recent_memory(user_id, int(days))
+    episodic = container.episodic_memory()
+    memories = await episodic.aget_recent_memory(user_id, int(days))
     return format_memories_for_llm(memories)
 
 
 @tool
-def get_memories_by_date_range(user_id: str, start_date: str, end_date: str) -> str:
+async def get_memories_by_date_range(user_id: str, start_date: str, end_date: str) -> str:
     """Get memories between specific dates.
 
     Use this tool when the user mentions specific dates or time periods:
@@ -53,15 +53,15 @@ def get_memories_by_date_range(user_id: str, start_date: str, end_date: str) ->
     Returns:
         Formatted string of memories in the date range
     """
-    episodic = EpisodicMemory()
+    episodic = container.episodic_memory()
     start = datetime.fromisoformat(start_date)
     end = datetime.fromisoformat(end_date)
-    memories = episodic.get_by_date_range(user_id, start, end)
+    memories = await episodic.aget_by_date_range(user_id, start, end)
     return format_memories_for_llm(memories)
 
 
 @tool
-def search_memories_with_recency(user_id: str, query: str) -> str:
+async def search_memories_with_recency(user_id: str, query: str) -> str:
     """Search memories semantically with recency boost.
 
     Use this tool for general topic searches where recent memories
@@ -77,6 +77,6 @@ def search_memories_with_recency(user_id: str, query: str) -> str:
     Returns:
         Formatted string of relevant memories (recent ones ranked higher)
     """
-    episodic = EpisodicMemory()
-    memories = episodic.search_with_recency_score(user_id, query)
+    episodic = container.episodic_memory()
+    memories = await episodic.asearch_with_recency_score(user_id, query)
     return format_memories_for_llm(memories)
@@ -0,0 +1,94 @@
+import threading
+from collections import Counter
+from typing import Dict, List
+import numpy as np
+from pydantic import BaseModel, Field
+from config.settings import settings
+from exports.types import Memory, MemorySearchResult
+from update.dedup import MemoryDeduplicator
+
+_counters: Counter = Counter()
+_counters_lock = threading.Lock()
+
+
+class Arbitration(BaseModel):
+    """Local decisions for a batch of new facts; only `ambiguous` still needs the LLM"""
+    add: List[Memory] = Field(default_factory=list)
+    unchanged: List[MemorySearchResult] = Field(default_factory=list)
+    ambiguous: List[Memory] = Field(default_factory=list)
+    candidates: List[MemorySearchResult] = Field(default_factory=list)
+
+
+class PreArbiter:
+    """Settles clear-cut facts from the fact x candidate similarity matrix before any LLM call.
+
+    A fact whose best candidate scores at or above `none_threshold` is already known (NONE); one
+    whose best score is below `add_threshold` is novel (ADD). Candidates are the dedup matches, so
+    anything under the deduplicator's threshold counts as no match at all.
+    """
+    def __init__(self, none_threshold: float | None = None, add_threshold: float | None = None, enabled: bool | None = None):
+        self.none_threshold = none_threshold if none_threshold is not None else settings.UPDATE_NONE_THRESHOLD
+        self.add_threshold = add_threshold if add_threshold is not None else settings.UPDATE_ADD_THRESHOLD
+        self.enabled = enabled if enabled is not None else settings.UPDATE_ARBITRATION_ENABLED
+        if self.add_threshold > self.none_threshold:
+            raise ValueError(f"UPDATE_ADD_THRESHOLD ({self.add_threshold}) exceeds UPDATE_NONE_THRESHOLD ({self.none_threshold})")
+
+    def similarity_matrix(self, groups: List[List[MemorySearchResult]]):
+        candidates = MemoryDeduplicator.collapse_matches(groups)
+        column = {memory.id: index for index, memory in enumerate(candidates)}
+        matrix = np.zeros((len(groups), len(candidates)), dtype=np.float32)
+        for row, matches in enumerate(groups):
+            for memory in matches:
+                matrix[row, column[memory.id]] = max(matrix[row, column[memory.id]], memory.score)
+        return matrix, candidates
+
+    def _batch_duplicates(self, vectors: List[List[float]] | None) -> np.ndarray:
+        """Facts repeating an earlier fact of the same batch; otherwise both would be ADDed"""
+        if not vectors or len(vectors) < 2:
+            return np.zeros(len(vectors or []), dtype=bool)
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms == 0, 1, norms)
+        return np.triu(matrix @ matrix.T >= self.none_threshold, k=1).any(axis=0)
+
+    def arbitrate(self, new_memories: List[Memory], groups: List[List[MemorySearchResult]], vectors: List[List[float]] | None = None) -> Arbitration:
+        if not self.enabled:
+            with _counters_lock:
+                _counters["ambiguous"] += len(new_memories)
+                _counters["llm_calls"] += 1
+            return Arbitration(ambiguous=list(new_memories), candidates=MemoryDeduplicator.collapse_matches(groups))
+        matrix, candidates = self.similarity_matrix(groups)
+        if matrix.shape[1]:
+            best = matrix.max(axis=1)
+            best_column = matrix.argmax(axis=1)
+        else:
+            best = np.zeros(len(new_memories), dtype=np.float32)
+            best_column = np.zeros(len(new_memories), dtype=np.intp)
+        duplicate = self._batch_duplicates(vectors)
+        known = (best >= self.none_threshold) & ~duplicate
+        novel = (best < self.add_threshold) & ~duplicate
+        ambiguous = ~(known | novel | duplicate)
+
+        arbitration = Arbitration(
+                add=[new_memories[i] for i in np.flatnonzero(novel)],
+                ambiguous=[new_memories[i] for i in np.flatnonzero(ambiguous)],
+                candidates=MemoryDeduplicator.collapse_matches([groups[i] for i in np.flatnonzero(ambiguous)])
+                )
+        seen = set()
+        for i in np.flatnonzero(known):
+            match = candidates[int(best_column[i])]
+            if match.id not in seen:
+                seen.add(match.id)
+                arbitration.unchanged.append(match)
+        with _counters_lock:
+            _counters["none"] += int(known.sum())
+            _counters["add"] += int(novel.sum())
+            _counters["batch_duplicate"] += int(duplicate.sum())
+            _counters["ambiguous"] += int(ambiguous.sum())
+            _counters["llm_calls" if arbitration.ambiguous else "llm_skipped"] += 1
+        return arbitration
+
+
+def arbitration_stats() -> Dict[str, int]:
+    with _counters_lock:
+        return dict(_counters)
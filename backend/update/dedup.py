@@ -1,12 +1,12 @@
 from typing import List
-from exports.types import Memory
+from exports.types import Memory, MemorySearchResult
 from storage.memory_store import MemoryStore
 
 
 class MemoryDeduplicator:
-    def __init__(self, similarity_threshold: float = 0.8):
+    def __init__(self, similarity_threshold: float = 0.8, memory_store: MemoryStore | None = None):
         self.similarity_threshold = similarity_threshold
-        self.memory_store = MemoryStore()
+        self.memory_store = memory_store or MemoryStore()
 
     def find_similar_memories(self, new_memory: Memory, user_id: str):
         results = self.memory_store.search_memories_with_scores(query=new_memory.content, user_id=user_id)
@@ -15,3 +15,30 @@ class MemoryDeduplicator:
             if memory.score >= self.similarity_threshold:
                 similarity.append(memory)
         return similarity
+
+    def find_similar_memories_batch(self, new_memories: List[Memory], user_id: str) -> List[List[MemorySearchResult]]:
+        """Matches grouped per new memory: one embedding batch and one batched vector search"""
+        if not new_memories:
+            return []
+        vectors = self.memory_store.embed.generate_embeddings_batch([memory.content for memory in new_memories])
+        return self.memory_store.search_by_vectors_with_scores(vectors, user_id=user_id, score_threshold=self.similarity_threshold)
+
+    @staticmethod
+    def collapse_matches(groups: List[List[MemorySearchResult]]) -> List[MemorySearchResult]:
+        """The same old memory is often matched by several new facts; keep it once, at its best score"""
+        best: dict[str, MemorySearchResult] = {}
+        for matches in groups:
+            for memory in matches:
+                if memory.id not in best or memory.score > best[memory.id].score:
+                    best[memory.id] = memory
+        return sorted(best.values(), key=lambda memory: memory.score, reverse=True)
+
+    async def afind_similar_memories(self, new_memory: Memory, user_id: str):
+        results = await self.memory_store.asearch_memories_with_scores(query=new_memory.content, user_id=user_id)
+        return [memory for memory in results if memory.score >= self.similarity_threshold]
+
+    async def afind_similar_memories_batch(self, new_memories: List[Memory], user_id: str) -> List[List[MemorySearchResult]]:
+        if not new_memories:
+            return []
+        vectors = await self.memory_store.embed.agenerate_embeddings_batch([memory.content for memory in new_memories])
+        return await self.memory_store.asearch_by_vectors_with_scores(vectors, user_id=user_id, score_threshold=self.similarity_threshold)
@@ -1,36 +1,90 @@
-from typing import List
-from exports.parser import normalize_llm_response
-from exports.types import Memory, MemoryType
+from typing import AsyncIterator, List, Set
+from exports.types import Memory, MemorySearchResult, MemoryType, MemoryUpdateItem, MemoryUpdateOutput, VectorOperationOutcome
 from llm.orchestrator import LLMOrchestrator
-from llm.prompts import DEFAULT_UPDATE_MEMORY_PROMPT
+from llm.structured import stream_items
 from storage.memory_store import MemoryStore
 from datetime import datetime
+from update.arbiter import PreArbiter
 from update.dedup import MemoryDeduplicator
+import asyncio
 import json
-import re
 
-class MemoryUpdater():
-    def __init__(self):
-        self.llm_orchestrator = LLMOrchestrator()
-        self.deduplicator = MemoryDeduplicator()
-        self.memory_store = MemoryStore()
+class IncrementalApplier():
+    """Writes memory operations as soon as they are decided, in the order they were decided.
+
+    Operations submitted in the same event-loop turn (e.g. every item parsed out of one streamed chunk)
+    are coalesced into a single embedding call and batch write. Batches run one after another: the
+    store's duplicate-content check reads before it writes, so two concurrent batches carrying the
+    same text would both pass it.
+    """
+    def __init__(self, memory_store: MemoryStore):
+        self.memory_store = memory_store
+        self._last: asyncio.Task | None = None
+        self._tasks: List[asyncio.Task] = []
+        self._upserts: List[Memory] = []
+        self._delete_ids: List[str] = []
+        self._pending_ids: Set[str] = set()
+        self._flush_handle: asyncio.Handle | None = None
+
+    def submit(self, upserts: List[Memory], delete_ids: List[str]):
+        if not upserts and not delete_ids:
+            return
+        ids = [memory.id for memory in upserts] + delete_ids
+        # a second operation on an id already waiting must land after the first, so it starts a new batch
+        if not self._pending_ids.isdisjoint(ids):
+            self._flush()
+        self._upserts.extend(upserts)
+        self._delete_ids.extend(delete_ids)
+        self._pending_ids.update(ids)
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_soon(self._flush)
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending_ids:
+            return
+        upserts, delete_ids, ids = self._upserts, self._delete_ids, self._pending_ids
+        self._upserts, self._delete_ids, self._pending_ids = [], [], set()
+        task = asyncio.create_task(self._apply(self._last, upserts, delete_ids))
+        self._last = task
+        self._tasks.append(task)
+
+    async def _apply(self, previous: asyncio.Task | None, upserts: List[Memory], delete_ids: List[str]) -> List[VectorOperationOutcome]:
+        if previous is not None:
+            # a failed batch already logged its error; later ones still run
+            await asyncio.gather(previous, return_exceptions=True)
+        return await self.memory_store.aapply_memory_updates(upserts, delete_ids)
+
+    async def finish(self) -> List[VectorOperationOutcome]:
+        self._flush()
+        results = await asyncio.gather(*self._tasks)
+        return [outcome for outcomes in results for outcome in outcomes]
 
-    def _extract_json_from_response(self, response: str) -> dict:
-        """Extract JSON from response, handling markdown code blocks."""
-        if not response or not response.strip():
-            return {"memory": []}
+class MemoryUpdater():
+    def __init__(self, llm_orchestrator: LLMOrchestrator | None = None, deduplicator: MemoryDeduplicator | None = None, memory_store: MemoryStore | None = None, arbiter: PreArbiter | None = None):
+        self.llm_orchestrator = llm_orchestrator or LLMOrchestrator()
+        self.memory_store = memory_store or MemoryStore()
+        self.deduplicator = deduplicator or MemoryDeduplicator(memory_store=self.memory_store)
+        self.arbiter = arbiter or PreArbiter()
 
-        # Try markdown code block first
-        markdown_match = re.search(r"```(?:json)?\s*(\{.*?\})\s*```", response, re.DOTALL)
-        if markdown_match:
-            return json.loads(markdown_match.group(1))
+    async def _llm_memory_updates(self, new_memories: List[Memory], similar: List[MemorySearchResult]) -> AsyncIterator[MemoryUpdateItem]:
+        old_memory = [
+                {"id": memory.id, "content": memory.content}
+                for memory in similar
+                ]
+        new_facts = [memory.content for memory in new_memories]
+        prompt = f"""Old Memory:
+        {json.dumps(old_memory, indent=2)}
 
-        # Try raw JSON
-        raw_match = re.search(r"(\{.*\})", response, re.DOTALL)
-        if raw_match:
-            return json.loads(raw_match.group(1))
+        Retrieved Facts: {json.dumps(new_facts)}
 
-        return {"memory": []}
+        Return updated memory:
+        """
+        chunks = self.llm_orchestrator.ai_stream(prompt, task="memory_update", cache=True, system="memory_update", schema=MemoryUpdateOutput)
+        async for item in stream_items(chunks, "memory", MemoryUpdateItem):
+            yield item
 
     async def update_memories(self, new_memories: List[Memory], user_id: str):
         if not new_memories:
@@ -40,101 +94,75 @@ class MemoryUpdater():
                     "deleted": [],
                     "unchanged": []
                     }
-        existing_memories = self.memory_store.user_memories(user_id)        
+        existing_memories = await self.memory_store.auser_memories(user_id)        
         if not existing_memories:
-            for memory in new_memories:
-                self.memory_store.store_memory(memory)
+            await self.memory_store.astore_memories(new_memories)
             return {
                     "added": new_memories,
                     "updated": [],
                     "deleted": [],
                     "unchanged": []
                     }
-        similar = []
-        for new_mem in new_memories:
-            similar.extend(self.deduplicator.find_similar_memories(new_mem, user_id))
-        old_memory = [
-                {"id": memory.id, "content": memory.content}
-                for memory in similar
+        groups = await self.deduplicator.afind_similar_memories_batch(new_memories, user_id)
+        # already in the embedding cache from the dedup lookup
+        vectors = await self.memory_store.embed.agenerate_embeddings_batch([memory.content for memory in new_memories])
+        arbitration = self.arbiter.arbitrate(new_memories, groups, vectors)
+        # ids come from the LLM: only ones that are really this user's memories may be rewritten or deleted
+        existing_by_id = {mem.id: mem for mem in existing_memories}
+        added = [
+                memory.model_copy(update={"id": self.memory_store.new_point_id(user_id, memory.content)})
+                for memory in arbitration.add
                 ]
-        new_facts = [memory.content for memory in new_memories]
-        prompt = f"""{DEFAULT_UPDATE_MEMORY_PROMPT}
-
-        Old Memory:
-        {json.dumps(old_memory, indent=2)}
-
-        Retrieved Facts: {json.dumps(new_facts)}
-
-        Return updated memory:
-        """
-        llm_response = await self.llm_orchestrator.ai_invoke(prompt)
-        normalized_response = normalize_llm_response(llm_response)
-
-        if not normalized_response or not normalized_response.strip():
-            print("LLM returned empty response for memory update")
-            return {"added": [], "updated": [], "deleted": [], "unchanged": []}
-
-        try:
-            parsed = self._extract_json_from_response(normalized_response)
-        except (json.JSONDecodeError, Exception) as e:
-            print(f"Failed to parse LLM response as JSON: {e}")
-            print(f"Raw response: {normalized_response[:200]}...")
-            return {"added": [], "updated": [], "deleted": [], "unchanged": []}
-
-        memory_updates = parsed.get("memory", [])
-
-        added = []
         updated = []
         deleted = []
-        unchanged = []
-        for item in memory_updates:
-            event = item["event"]
-            if event == "ADD":
-                new_mem = Memory(
-                        id=item["id"],
-                        user_id=user_id,
-                        timestamp=datetime.now(),
-                        content=item["text"],
-                        memory_type=MemoryType.SEMANTIC,
-                        metadata={}
-                        )
-                self.memory_store.store_memory(new_mem)
-                added.append(new_mem)
-
-            elif event == "UPDATE":
-                memory_id = item.get["id"]
-                if memory_id:
-                    self.memory_store.delete_user_memory(memory_id)
-                updated_mem = Memory(
-                        id=item["id"],
-                        user_id=user_id,
-                        timestamp=datetime.now(),
-                        content=item["text"],
-                        memory_type=MemoryType.SEMANTIC,
-                        metadata={}
-                        )
-                self.memory_store.store_memory(updated_mem)
-                updated.append(updated_mem)
-
-            elif event == "DELETE":
-                memory_id = item["id"]
-                deleted_memory = None
-                for mem in existing_memories:
-                    if mem.id == memory_id:
-                        deleted_memory = mem
-                self.memory_store.delete_user_memory(item["id"])
-                if deleted_memory:
-                    deleted.append(deleted_memory)
-
-            elif event == "NONE":
-                memory_id = item["id"]
-                for mem in existing_memories:
-                    if mem.id == memory_id:
-                        unchanged.append(mem)
-                        break
+        unchanged = [existing_by_id[match.id] for match in arbitration.unchanged if match.id in existing_by_id]
+        applier = IncrementalApplier(self.memory_store)
+        # the arbiter's ADDs are final already; write them while the LLM is still deciding the rest
+        applier.submit(added, [])
+        try:
+            if arbitration.ambiguous:
+                async for item in self._llm_memory_updates(arbitration.ambiguous, arbitration.candidates):
+                    if item.event == "ADD":
+                        new_mem = Memory(
+                                id=self.memory_store.new_point_id(user_id, item.text),
+                                user_id=user_id,
+                                timestamp=datetime.now(),
+                                content=item.text,
+                                memory_type=MemoryType.SEMANTIC,
+                                metadata={}
+                                )
+                        applier.submit([new_mem], [])
+                        added.append(new_mem)
+
+                    elif item.event == "UPDATE":
+                        updated_mem = Memory(
+                                id=item.id if item.id in existing_by_id else self.memory_store.new_point_id(user_id, item.text),
+                                user_id=user_id,
+                                timestamp=datetime.now(),
+                                content=item.text,
+                                memory_type=MemoryType.SEMANTIC,
+                                metadata={}
+                                )
+                        applier.submit([updated_mem], [])
+                        updated.append(updated_mem)
+
+                    elif item.event == "DELETE":
+                        deleted_memory = existing_by_id.get(item.id)
+                        if deleted_memory:
+                            applier.submit([], [deleted_memory.id])
+                            deleted.append(deleted_memory)
+
+                    elif item.event == "NONE":
+                        unchanged_memory = existing_by_id.get(item.id)
+                        if unchanged_memory:
+                            unchanged.append(unchanged_memory)
+        finally:
+            # let writes already in flight land even if the stream failed, so a retry sees them
+            operations = await applier.finish()
         return {
                 "added": added,
                 "updated": updated,
                 "deleted": deleted,
-                "unchanged": unchanged
+                "unchanged": unchanged,
+                "operations": operations
                 }
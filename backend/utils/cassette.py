@@ -0,0 +1,63 @@
+import hashlib
+import json
+import os
+import random
+import threading
+from typing import Dict, Optional
+
+
+def request_key(payload) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def sample_latency_ms(median_ms: float, sigma: float) -> float:
+    """Log-normal latency: `median_ms` at the middle with a right tail whose width is set by `sigma`"""
+    if median_ms <= 0:
+        return 0.0
+    return random.lognormvariate(0.0, sigma) * median_ms if sigma > 0 else median_ms
+
+
+class Cassette:
+    """Append-only JSONL file of recorded request/response pairs, loaded fully into memory for replay.
+
+    The last recording of a key wins, so re-recording a scenario simply appends.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                for line in file:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[entry["key"]] = entry
+
+    def get(self, key: str) -> Optional[Dict]:
+        return self._entries.get(key)
+
+    def record(self, entry: Dict):
+        with self._lock:
+            self._entries[entry["key"]] = entry
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(json.dumps(entry, default=str) + "\n")
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_cassettes: Dict[str, Cassette] = {}
+_cassettes_lock = threading.Lock()
+
+
+def get_cassette(path: str) -> Cassette:
+    """Shared per path, so every client recording to one file appends through the same lock"""
+    with _cassettes_lock:
+        cassette = _cassettes.get(path)
+        if cassette is None:
+            cassette = Cassette(path)
+            _cassettes[path] = cassette
+        return cassette
@@ -0,0 +1,22 @@
+import hashlib
+import re
+import unicodedata
+import uuid
+
+# fixed namespace so deterministic point ids are stable across processes and deployments
+MEMORY_ID_NAMESPACE = uuid.UUID("8f0c2d4e-6b1a-4f3e-9c57-2a8d1e6b4f90")
+
+
+def normalize_content(text: str) -> str:
+    """Case, unicode form, whitespace and trailing punctuation do not make a fact different"""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.rstrip(".!;, ")
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(normalize_content(text).encode("utf-8")).hexdigest()
+
+
+def deterministic_point_id(user_id: str, digest: str) -> str:
+    return str(uuid.uuid5(MEMORY_ID_NAMESPACE, f"{user_id}:{digest}"))
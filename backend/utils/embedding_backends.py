@@ -0,0 +1,267 @@
+import asyncio
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Dict, List, Tuple
+import numpy as np
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from langchain_openai import OpenAIEmbeddings
+from config.settings import settings
+from utils.cassette import get_cassette, request_key, sample_latency_ms
+
+if settings.GEMINI_API_KEY:
+    os.environ["GOOGLE_API_KEY"] = settings.GEMINI_API_KEY.get_secret_value()
+
+
+class EmbeddingBackend(ABC):
+    """Interface every embedding provider implements; async methods default to the sync ones"""
+    name = ""
+    default_model = ""
+
+    def __init__(self, model: str | None = None, dimensions: int | None = None):
+        self.model = model or self.default_model
+        self.dimensions = dimensions or settings.EMBEDDING_DIMENSIONS
+
+    @property
+    def cache_namespace(self) -> str:
+        return f"{self.name}:{self.model}"
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    @abstractmethod
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        ...
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return self.embed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_documents(texts)
+
+
+class GeminiEmbeddingBackend(EmbeddingBackend):
+    name = "gemini"
+    default_model = "models/gemini-embedding-001"
+
+    def __init__(self, model: str | None = None, dimensions: int | None = None):
+        super().__init__(model, dimensions)
+        self.client = GoogleGenerativeAIEmbeddings(
+                model=self.model,
+                output_dimensionality=self.dimensions,
+                )
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.client.embed_query(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        # RETRIEVAL_QUERY keeps batch vectors identical to embed_query
+        return self.client.embed_documents(texts, task_type="RETRIEVAL_QUERY")
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.client.aembed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.client.aembed_documents(texts, task_type="RETRIEVAL_QUERY")
+
+
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    name = "openai"
+    default_model = "text-embedding-3-small"
+
+    def __init__(self, model: str | None = None, dimensions: int | None = None):
+        super().__init__(model, dimensions)
+        self.client = OpenAIEmbeddings(
+                model=self.model,
+                dimensions=self.dimensions,
+                api_key=settings.OPENAI_API_KEY
+                )
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.client.embed_query(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.client.embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.client.aembed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.client.aembed_documents(texts)
+
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=65536)
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class LocalHashingEmbeddingBackend(EmbeddingBackend):
+    """In-process, network-free embeddings from signed feature hashing of words and character trigrams"""
+    name = "local"
+    default_model = "hashing-v1"
+    trigram_weight = 0.5
+
+    def _features(self, text: str) -> Tuple[List[int], List[float]]:
+        indices: List[int] = []
+        weights: List[float] = []
+        for token in _TOKEN_PATTERN.findall(text.lower()):
+            features = [(f"w:{token}", 1.0)]
+            padded = f"<{token}>"
+            features.extend(
+                    (f"c:{padded[i:i + 3]}", self.trigram_weight)
+                    for i in range(len(padded) - 2)
+                    )
+            for feature, weight in features:
+                hashed = _feature_hash(feature)
+                indices.append(hashed % self.dimensions)
+                weights.append(weight if (hashed >> 63) & 1 else -weight)
+        return indices, weights
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        rows: List[int] = []
+        columns: List[int] = []
+        values: List[float] = []
+        for row, text in enumerate(texts):
+            indices, weights = self._features(text)
+            rows.extend([row] * len(indices))
+            columns.extend(indices)
+            values.extend(weights)
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        np.add.at(matrix, (np.asarray(rows, dtype=np.intp), np.asarray(columns, dtype=np.intp)), np.asarray(values, dtype=np.float32))
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1.0, norms)
+        return matrix.tolist()
+
+
+_fake_counters = {"calls": 0, "replay_hits": 0, "replay_misses": 0, "recorded": 0, "injected_errors": 0}
+_fake_lock = threading.Lock()
+
+
+def fake_embedding_stats() -> Dict:
+    with _fake_lock:
+        return dict(_fake_counters)
+
+
+class FakeEmbeddingBackend(EmbeddingBackend):
+    """Offline embeddings for load tests, selected by EMBEDDING_FAKE_MODE.
+
+    synthetic: local hashing vectors behind a log-normal latency and an injected error rate.
+    replay: vectors recorded earlier, keyed by text hash; misses fall back to synthetic.
+    record: embeds through EMBEDDING_FAKE_RECORD_BACKEND and appends every vector to the cassette.
+    """
+    name = "fake"
+    default_model = "fake-v1"
+
+    def __init__(self, model: str | None = None, dimensions: int | None = None):
+        super().__init__(model, dimensions)
+        self.mode = settings.EMBEDDING_FAKE_MODE
+        self.synthetic = LocalHashingEmbeddingBackend(dimensions=self.dimensions)
+        self.cassette = get_cassette(settings.EMBEDDING_FAKE_CASSETTE) if self.mode in ("replay", "record") else None
+        # built directly: this constructor already runs under the registry lock
+        self.recorded_from = EMBEDDING_BACKENDS[settings.EMBEDDING_FAKE_RECORD_BACKEND](dimensions=self.dimensions) if self.mode == "record" else None
+
+    def _count(self, outcome: str, amount: int = 1):
+        with _fake_lock:
+            _fake_counters[outcome] += amount
+
+    def _key(self, text: str) -> str:
+        return request_key([self.dimensions, text])
+
+    def _latency(self) -> float:
+        self._count("calls")
+        delay = sample_latency_ms(settings.EMBEDDING_FAKE_LATENCY_MS, settings.EMBEDDING_FAKE_LATENCY_SIGMA) / 1000
+        if random.random() < settings.EMBEDDING_FAKE_ERROR_RATE:
+            self._count("injected_errors")
+            raise ConnectionError("Injected embedding error")
+        return delay
+
+    def _replay(self, texts: List[str]) -> List[List[float]]:
+        vectors: List[List[float] | None] = [None] * len(texts)
+        if self.mode == "replay":
+            for i, text in enumerate(texts):
+                entry = self.cassette.get(self._key(text))
+                if entry is not None:
+                    vectors[i] = entry["vector"]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if self.mode == "replay":
+            self._count("replay_hits", len(texts) - len(missing))
+            self._count("replay_misses", len(missing))
+        for i, vector in zip(missing, self.synthetic.embed_documents([texts[i] for i in missing])):
+            vectors[i] = vector
+        return vectors
+
+    def _record(self, texts: List[str], vectors: List[List[float]]) -> List[List[float]]:
+        for text, vector in zip(texts, vectors):
+            self.cassette.record({"key": self._key(text), "backend": self.recorded_from.cache_namespace, "vector": vector})
+        self._count("recorded", len(texts))
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.mode == "record":
+            return self._record(texts, self.recorded_from.embed_documents(texts))
+        time.sleep(self._latency())
+        return self._replay(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.mode == "record":
+            return self._record(texts, await self.recorded_from.aembed_documents(texts))
+        await asyncio.sleep(self._latency())
+        return self._replay(texts)
+
+
+EMBEDDING_BACKENDS: Dict[str, type[EmbeddingBackend]] = {
+        GeminiEmbeddingBackend.name: GeminiEmbeddingBackend,
+        OpenAIEmbeddingBackend.name: OpenAIEmbeddingBackend,
+        LocalHashingEmbeddingBackend.name: LocalHashingEmbeddingBackend,
+        FakeEmbeddingBackend.name: FakeEmbeddingBackend,
+        }
+
+
+class EmbeddingBackendRegistry:
+    """Process-wide embedding backends, created once per (backend, model, dimensionality) and reused"""
+    def __init__(self):
+        self._backends: Dict[Tuple[str, str, int], EmbeddingBackend] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str | None = None, model: str | None = None, dimensions: int | None = None) -> EmbeddingBackend:
+        name = name or settings.EMBEDDING_BACKEND
+        if name not in EMBEDDING_BACKENDS:
+            raise ValueError(f"Unsupported embedding backend: {name}")
+        backend_cls = EMBEDDING_BACKENDS[name]
+        model = model or settings.EMBEDDING_MODEL or backend_cls.default_model
+        dimensions = dimensions or settings.EMBEDDING_DIMENSIONS
+        key = (name, model, dimensions)
+        backend = self._backends.get(key)
+        if backend is not None:
+            return backend
+        with self._lock:
+            backend = self._backends.get(key)
+            if backend is None:
+                backend = backend_cls(model=model, dimensions=dimensions)
+                self._backends[key] = backend
+            return backend
+
+    def clear(self):
+        with self._lock:
+            self._backends.clear()
+
+
+embedding_backends = EmbeddingBackendRegistry()
+
+
+def get_embedding_backend() -> EmbeddingBackend:
+    return embedding_backends.get()
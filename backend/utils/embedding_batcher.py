@@ -0,0 +1,113 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Set, Tuple
+from config.settings import settings
+from utils.embedding_backends import EmbeddingBackend
+from utils.metrics import LATENCY_MS_BUCKETS, SIZE_BUCKETS, Histogram
+
+
+class EmbeddingMicroBatcher:
+    """Coalesces concurrent single-text embedding requests into one backend batch call.
+
+    Requests are collected for up to max_wait_ms or until max_batch_size distinct texts are
+    pending; identical texts inside a window share a single slot in the batch.
+    """
+    def __init__(self, embed_batch: Callable[[List[str]], Awaitable[List[List[float]]]], max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.embed_batch = embed_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._pending: Dict[str, List[Tuple[asyncio.Future, float]]] = {}
+        self._timer: asyncio.TimerHandle | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        # the loop only keeps weak references to tasks; an unreferenced batch could be collected mid-flight
+        self._tasks: Set[asyncio.Task] = set()
+        self.batch_sizes = Histogram(SIZE_BUCKETS)
+        self.queue_wait_ms = Histogram(LATENCY_MS_BUCKETS)
+        self.requests = 0
+        self.deduplicated = 0
+        self.batches = 0
+
+    async def embed(self, text: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # pending futures belong to a previous event loop that is gone
+            self._pending = {}
+            self._timer = None
+            self._tasks = set()
+            self._loop = loop
+        future = loop.create_future()
+        self.requests += 1
+        if text in self._pending:
+            self.deduplicated += 1
+        self._pending.setdefault(text, []).append((future, time.perf_counter()))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: Dict[str, List[Tuple[asyncio.Future, float]]]):
+        started = time.perf_counter()
+        for waiters in batch.values():
+            for _, enqueued_at in waiters:
+                self.queue_wait_ms.observe((started - enqueued_at) * 1000)
+        texts = list(batch)
+        self.batches += 1
+        self.batch_sizes.observe(len(texts))
+        error: Exception | None = None
+        try:
+            vectors = await self.embed_batch(texts)
+            if len(vectors) != len(texts):
+                raise ValueError(f"Embedding backend returned {len(vectors)} vectors for {len(texts)} texts")
+            for text, vector in zip(texts, vectors):
+                for future, _ in batch[text]:
+                    if not future.done():
+                        future.set_result(vector)
+        except Exception as e:
+            error = e
+        finally:
+            # whatever went wrong, including cancellation, no caller may be left waiting
+            for waiters in batch.values():
+                for future, _ in waiters:
+                    if not future.done():
+                        future.set_exception(error or RuntimeError("Embedding batch was interrupted"))
+
+    def stats(self) -> Dict:
+        return {
+                "requests": self.requests,
+                "deduplicated": self.deduplicated,
+                "batches": self.batches,
+                "batch_size": self.batch_sizes.snapshot(),
+                "queue_wait_ms": self.queue_wait_ms.snapshot()
+                }
+
+
+_batchers: Dict[str, EmbeddingMicroBatcher] = {}
+
+
+def get_embedding_batcher(backend: EmbeddingBackend) -> EmbeddingMicroBatcher:
+    key = f"{backend.cache_namespace}:{backend.dimensions}"
+    batcher = _batchers.get(key)
+    if batcher is None:
+        batcher = EmbeddingMicroBatcher(
+                backend.aembed_documents,
+                max_batch_size=settings.EMBEDDING_MICROBATCH_MAX_SIZE,
+                max_wait_ms=settings.EMBEDDING_MICROBATCH_WAIT_MS
+                )
+        _batchers[key] = batcher
+    return batcher
+
+
+def batcher_stats() -> Dict[str, Dict]:
+    return {key: batcher.stats() for key, batcher in _batchers.items()}
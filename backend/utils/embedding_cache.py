@@ -0,0 +1,190 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import numpy as np
+from config.settings import settings
+
+
+def embedding_cache_key(text: str, model: str, dimensions: int) -> str:
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{model}:{dimensions}:{digest}"
+
+
+class LRUEmbeddingCache:
+    """In-process LRU of embedding vectors bounded by their total size in bytes"""
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+            return vector
+
+    def set(self, key: str, vector: np.ndarray):
+        if vector.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous.nbytes
+            self._entries[key] = vector
+            self.current_bytes += vector.nbytes
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.nbytes
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DiskEmbeddingCache:
+    """Persistent tier: one memory-mapped matrix per dimensionality, indexed by sqlite"""
+    GROWTH_ROWS = 1024
+
+    def __init__(self, directory: str, dtype: str = "float32"):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.dtype = np.dtype(dtype)
+        self._lock = threading.Lock()
+        self._matrices: Dict[int, np.memmap] = {}
+        self._rows: Dict[int, int] = {}
+        self._db = sqlite3.connect(os.path.join(directory, "index.sqlite3"), check_same_thread=False)
+        self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, dimensions INTEGER NOT NULL, row INTEGER NOT NULL)"
+                )
+        self._db.commit()
+
+    def _matrix_path(self, dimensions: int) -> str:
+        return os.path.join(self.directory, f"vectors_{dimensions}_{self.dtype.name}.bin")
+
+    def _open_matrix(self, dimensions: int, min_rows: int = 0) -> np.memmap:
+        matrix = self._matrices.get(dimensions)
+        if matrix is not None and matrix.shape[0] >= min_rows:
+            return matrix
+        path = self._matrix_path(dimensions)
+        row_bytes = dimensions * self.dtype.itemsize
+        current_rows = os.path.getsize(path) // row_bytes if os.path.exists(path) else 0
+        capacity = max(current_rows, min_rows)
+        if capacity > current_rows:
+            capacity = max(capacity, current_rows + self.GROWTH_ROWS)
+            with open(path, "ab") as f:
+                f.truncate(capacity * row_bytes)
+        if matrix is not None:
+            matrix.flush()
+        matrix = np.memmap(path, dtype=self.dtype, mode="r+", shape=(capacity, dimensions))
+        self._matrices[dimensions] = matrix
+        return matrix
+
+    def _next_row(self, dimensions: int) -> int:
+        if dimensions not in self._rows:
+            row = self._db.execute(
+                    "SELECT COALESCE(MAX(row) + 1, 0) FROM embeddings WHERE dimensions = ?",
+                    (dimensions,)
+                    ).fetchone()
+            self._rows[dimensions] = row[0]
+        return self._rows[dimensions]
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            found = self._db.execute(
+                    "SELECT dimensions, row FROM embeddings WHERE key = ?", (key,)
+                    ).fetchone()
+            if not found:
+                return None
+            dimensions, row = found
+            matrix = self._open_matrix(dimensions, min_rows=row + 1)
+            return np.asarray(matrix[row], dtype=np.float32)
+
+    def set(self, key: str, vector: np.ndarray):
+        dimensions = int(vector.shape[0])
+        with self._lock:
+            exists = self._db.execute("SELECT 1 FROM embeddings WHERE key = ?", (key,)).fetchone()
+            if exists:
+                return
+            row = self._next_row(dimensions)
+            matrix = self._open_matrix(dimensions, min_rows=row + 1)
+            matrix[row] = vector.astype(self.dtype)
+            matrix.flush()
+            self._db.execute(
+                    "INSERT INTO embeddings (key, dimensions, row) VALUES (?, ?, ?)",
+                    (key, dimensions, row)
+                    )
+            self._db.commit()
+            self._rows[dimensions] = row + 1
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+class EmbeddingCache:
+    """Two-tier embedding cache: LRU in memory, optionally backed by the disk tier"""
+    def __init__(self, max_bytes: int, directory: str = "", dtype: str = "float32"):
+        self.memory = LRUEmbeddingCache(max_bytes)
+        self.disk = DiskEmbeddingCache(directory, dtype) if directory else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        # the tiers lock themselves; this one keeps the counters exact across embedding threads
+        self._lock = threading.Lock()
+
+    def _count(self, hit: bool, disk: bool = False):
+        with self._lock:
+            if hit:
+                self.hits += 1
+                if disk:
+                    self.disk_hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key: str) -> Optional[List[float]]:
+        vector = self.memory.get(key)
+        if vector is not None:
+            self._count(hit=True)
+            return vector.tolist()
+        if self.disk is not None:
+            vector = self.disk.get(key)
+            if vector is not None:
+                self._count(hit=True, disk=True)
+                self.memory.set(key, vector)
+                return vector.tolist()
+        self._count(hit=False)
+        return None
+
+    def set(self, key: str, vector: List[float]):
+        array = np.asarray(vector, dtype=np.float32)
+        self.memory.set(key, array)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, array)
+            except Exception as e:
+                print(f"Error while persisting embedding: {str(e)}")
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            hits, disk_hits, misses = self.hits, self.disk_hits, self.misses
+        lookups = hits + misses
+        return {
+                "hits": hits,
+                "disk_hits": disk_hits,
+                "misses": misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self.memory),
+                "memory_bytes": self.memory.current_bytes,
+                "disk_entries": len(self.disk) if self.disk is not None else 0
+                }
+
+
+embedding_cache = EmbeddingCache(
+        max_bytes=settings.EMBEDDING_CACHE_MAX_BYTES,
+        directory=settings.EMBEDDING_CACHE_DIR,
+        dtype=settings.EMBEDDING_CACHE_DTYPE
+        )
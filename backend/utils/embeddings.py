@@ -1,23 +1,77 @@
-import os
-from langchain_openai import OpenAIEmbeddings
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from config.settings import settings
-from typing import List
+from utils.embedding_backends import EmbeddingBackend, get_embedding_backend
+from utils.embedding_batcher import get_embedding_batcher
+from utils.embedding_cache import EmbeddingCache, embedding_cache, embedding_cache_key
+from typing import Dict, List, cast
 
-if settings.GEMINI_API_KEY:
-    os.environ["GOOGLE_API_KEY"] = settings.GEMINI_API_KEY.get_secret_value()
 
 class EmbeddingGenerator:
+    def __init__(self, cache: EmbeddingCache | None = None, batch_size: int | None = None, backend: EmbeddingBackend | None = None):
+        self.cache = cache or embedding_cache
+        self.batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+        self.backend = backend or get_embedding_backend()
+
+    @property
+    def model(self) -> str:
+        return self.backend.model
+
+    @property
+    def dimensions(self) -> int:
+        return self.backend.dimensions
+
+    def _cache_key(self, text: str) -> str:
+        return embedding_cache_key(text, self.backend.cache_namespace, self.dimensions)
+
+    def _lookup(self, texts: List[str]):
+        vectors: List[List[float] | None] = [None] * len(texts)
+        missing: Dict[str, List[int]] = {}
+        for i, text in enumerate(texts):
+            cached = self.cache.get(self._cache_key(text))
+            if cached is not None:
+                vectors[i] = cached
+            else:
+                missing.setdefault(text, []).append(i)
+        return vectors, missing
+
+    def _fill(self, vectors: List[List[float] | None], missing: Dict[str, List[int]], chunk: List[str], embedded: List[List[float]]):
+        for text, vector in zip(chunk, embedded):
+            self.cache.set(self._cache_key(text), vector)
+            for i in missing[text]:
+                vectors[i] = vector
+
+    def _chunks(self, texts: List[str]):
+        for start in range(0, len(texts), self.batch_size):
+            yield texts[start:start + self.batch_size]
+
     def generate_embeddings(self, text: str) -> List[float]:
-        gemini_embeddings = GoogleGenerativeAIEmbeddings(
-                model="models/gemini-embedding-001",
-                output_dimensionality=768,
-                )
-        vectors = gemini_embeddings.embed_query(text)
-        # openai_embeddings = OpenAIEmbeddings(
-        #         model="text-embedding-3-small",
-        #         dimensions=1536,
-        #         api_key=settings.OPENAI_API_KEY
-        #         )
-        # vectors = openai_embeddings.embed_query(text)
+        key = self._cache_key(text)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        vectors = self.backend.embed_query(text)
+        self.cache.set(key, vectors)
         return vectors
+
+    def generate_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
+        vectors, missing = self._lookup(texts)
+        for chunk in self._chunks(list(missing)):
+            self._fill(vectors, missing, chunk, self.backend.embed_documents(chunk))
+        return cast(List[List[float]], vectors)
+
+    async def agenerate_embeddings(self, text: str) -> List[float]:
+        key = self._cache_key(text)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        if settings.EMBEDDING_MICROBATCH_ENABLED:
+            vectors = await get_embedding_batcher(self.backend).embed(text)
+        else:
+            vectors = await self.backend.aembed_query(text)
+        self.cache.set(key, vectors)
+        return vectors
+
+    async def agenerate_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
+        vectors, missing = self._lookup(texts)
+        for chunk in self._chunks(list(missing)):
+            self._fill(vectors, missing, chunk, await self.backend.aembed_documents(chunk))
+        return cast(List[List[float]], vectors)
@@ -1,14 +1,14 @@
 from exports.parser import normalize_llm_response
-from exports.types import Memory, MemoryExtractionWithTypes, MemoryType
+from exports.types import Memory, MemoryExtractionItem, MemoryExtractionWithTypes, MemoryType
 from llm.orchestrator import LLMOrchestrator
-from llm.prompts import MEMORY_EXTRACTION_WITH_TYPES_PROMPT
+from llm.structured import parse_items
 from datetime import datetime
 from typing import Dict, List
-import uuid, json, re
+import uuid
 
 class MemoryExtractor:
-    def __init__(self):
-        self.llm_orchestrator = LLMOrchestrator()
+    def __init__(self, llm_orchestrator: LLMOrchestrator | None = None):
+        self.llm_orchestrator = llm_orchestrator or LLMOrchestrator()
 
     def _format_conversation(self, messages: List[Dict]):
         text_format: str = ''
@@ -42,28 +42,13 @@ class MemoryExtractor:
         return memories
 
 
-    def _extract_json_from_response(self, response: str) -> dict:
-        if not response or not response.strip():
-            return {"memories": []}
-
-        markdown_match = re.search(r"```(?:json)?\s*(\{.*?\})\s*```", response, re.DOTALL)
-        if markdown_match:
-            return json.loads(markdown_match.group(1))
-
-        raw_match = re.search(r"(\{.*\})", response, re.DOTALL)
-        if raw_match:
-            return json.loads(raw_match.group(1))
-
-        return {"memories": []}
-
     async def extract_from_conversation(self, messages, user_id):
         conversation_text = self._format_conversation(messages)
-        full_prompt = f"{MEMORY_EXTRACTION_WITH_TYPES_PROMPT}\n\n{conversation_text}"
-        llm_response = await self.llm_orchestrator.ai_invoke(full_prompt)
+        llm_response = await self.llm_orchestrator.ai_invoke(conversation_text, task="extraction", cache=True, system="memory_extraction", schema=MemoryExtractionWithTypes)
         normalized_response = normalize_llm_response(llm_response)
         try:
-            parsed = self._extract_json_from_response(normalized_response)
-            extraction = MemoryExtractionWithTypes.model_validate(parsed)
+            # item by item, so one malformed entry does not cost the rest of the batch
+            extraction = MemoryExtractionWithTypes(memories=parse_items(normalized_response, "memories", MemoryExtractionItem))
             memories = self._extraction_to_memories(extraction, user_id)
             return memories
         except Exception as e: